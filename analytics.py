@@ -0,0 +1,133 @@
+"""Vectorized analytics over a user's transaction totals.
+
+The functions here take plain rows or arrays and return NumPy arrays;
+app.py turns the results back into the dicts its templates and widgets
+expect. Month series are always ordered oldest to newest.
+
+Closed years can also be kept on disk as compact .npy files, one per user
+and year, and read back memory-mapped by save_year()/load_year().
+"""
+import json
+import os
+from collections import namedtuple
+
+import numpy as np
+
+# Income/expense per month plus a (category x month) expense matrix
+MonthlyTotals = namedtuple('MonthlyTotals', 'month_keys income expense categories category_expense')
+# One year of monthly totals: income has 12 entries, category_expense is (category x 12)
+YearColumns = namedtuple('YearColumns', 'year categories income category_expense')
+YEAR_FILE_VERSION = 1
+
+
+def monthly_totals(rows, month_keys):
+    """Bucket (year_month, category, type, total) rows into arrays aligned with month_keys"""
+    rows = list(rows)
+    column = {key: i for i, key in enumerate(month_keys)}
+    categories = sorted({category for _, category, type_, _ in rows if type_ == 'expense'})
+    row_of = {category: i for i, category in enumerate(categories)}
+
+    months = np.fromiter((column[key] for key, _, _, _ in rows), dtype=np.intp, count=len(rows))
+    amounts = np.fromiter((total for _, _, _, total in rows), dtype=float, count=len(rows))
+    is_expense = np.fromiter((type_ == 'expense' for _, _, type_, _ in rows), dtype=bool, count=len(rows))
+
+    income = np.bincount(months[~is_expense], weights=amounts[~is_expense], minlength=len(month_keys))
+    expense = np.bincount(months[is_expense], weights=amounts[is_expense], minlength=len(month_keys))
+    category_expense = np.zeros((len(categories), len(month_keys)))
+    category_rows = np.fromiter((row_of[category] for _, category, type_, _ in rows if type_ == 'expense'),
+                                dtype=np.intp, count=int(is_expense.sum()))
+    np.add.at(category_expense, (category_rows, months[is_expense]), amounts[is_expense])
+    return MonthlyTotals(list(month_keys), income, expense, categories, category_expense)
+
+
+def daily_totals(days, types, totals, num_days):
+    """Income and expense per day of month (1-based `days`) as two arrays of length num_days"""
+    days = np.asarray(days, dtype=np.intp) - 1
+    totals = np.asarray(totals, dtype=float)
+    is_income = np.asarray(types) == 'income'
+    income = np.bincount(days[is_income], weights=totals[is_income], minlength=num_days)
+    expense = np.bincount(days[~is_income], weights=totals[~is_income], minlength=num_days)
+    return income, expense
+
+
+def savings_rates(income, expense):
+    """Percentage of income kept each month; zero where there was no income"""
+    income = np.asarray(income, dtype=float)
+    saved = income - np.asarray(expense, dtype=float)
+    return np.divide(saved * 100, income, out=np.zeros_like(income), where=income > 0)
+
+
+def rolling_mean(values, window):
+    """Trailing mean over the last axis; early points average whatever history exists"""
+    values = np.asarray(values, dtype=float)
+    cumulative = np.cumsum(values, axis=-1)
+    shifted = np.zeros_like(cumulative)
+    shifted[..., window:] = cumulative[..., :-window]
+    counts = np.minimum(np.arange(1, values.shape[-1] + 1), window)
+    return (cumulative - shifted) / counts
+
+
+def shares(amounts):
+    """Each amount as a percentage of the total"""
+    amounts = np.asarray(amounts, dtype=float)
+    total = amounts.sum()
+    return amounts * 100 / total if total > 0 else np.zeros_like(amounts)
+
+
+def top_indices(values, n):
+    """Indices of the n largest values, largest first (ties keep their order)"""
+    return np.argsort(-np.asarray(values, dtype=float), kind='stable')[:n]
+
+
+def save_year(directory, columns):
+    """Write a YearColumns as <year>.npy (income row on top of the expense rows) plus <year>.json.
+
+    Both files are written under temporary names and renamed into place,
+    the array last, so a reader never sees a half-written year.
+    """
+    os.makedirs(directory, exist_ok=True)
+    data = np.vstack([np.asarray(columns.income, dtype=float)[None, :],
+                      np.asarray(columns.category_expense, dtype=float).reshape(-1, 12)])
+    base = os.path.join(directory, str(columns.year))
+    with open(base + '.json.tmp', 'w') as f:
+        json.dump({'version': YEAR_FILE_VERSION, 'categories': list(columns.categories)}, f)
+    with open(base + '.npy.tmp', 'wb') as f:
+        np.save(f, data)
+    os.replace(base + '.json.tmp', base + '.json')
+    os.replace(base + '.npy.tmp', base + '.npy')
+
+
+def load_year(directory, year):
+    """Memory-map a year written by save_year(), or return None if it is missing or outdated"""
+    base = os.path.join(directory, str(year))
+    try:
+        with open(base + '.json') as f:
+            meta = json.load(f)
+        data = np.load(base + '.npy', mmap_mode='r')
+    except (OSError, ValueError):
+        return None
+    if meta.get('version') != YEAR_FILE_VERSION or data.shape != (len(meta['categories']) + 1, 12):
+        return None
+    return YearColumns(year, meta['categories'], data[0], data[1:])
+
+
+def year_over_year(values):
+    """Relative change of each entry against the one before it along the last axis; NaN where undefined"""
+    values = np.asarray(values, dtype=float)
+    change = np.full(values.shape, np.nan)
+    previous = values[..., :-1]
+    np.divide(values[..., 1:] - previous, previous, out=change[..., 1:], where=previous > 0)
+    return change
+
+
+def yearly_totals(years):
+    """Stack YearColumns into (income, expense, categories, category x year expense) arrays"""
+    categories = sorted({category for columns in years for category in columns.categories})
+    row_of = {category: i for i, category in enumerate(categories)}
+    income = np.array([float(np.sum(columns.income)) for columns in years])
+    category_expense = np.zeros((len(categories), len(years)))
+    for j, columns in enumerate(years):
+        rows = np.fromiter((row_of[category] for category in columns.categories), dtype=np.intp,
+                           count=len(columns.categories))
+        category_expense[rows, j] = np.sum(columns.category_expense, axis=1)
+    return income, category_expense.sum(axis=0), categories, category_expense
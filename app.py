@@ -1,20 +1,197 @@
-from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify
+from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify, abort, Response, stream_with_context, g, has_app_context, has_request_context
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session as FlaskSession
 from flask_migrate import Migrate
+from sqlalchemy import Delete, Insert, Update, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import IntegrityError, TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from werkzeug.security import generate_password_hash, check_password_hash
+from collections import OrderedDict, namedtuple
 from datetime import datetime, timedelta
+from email.message import EmailMessage
 from functools import wraps
+import asyncio
+import click
+import base64
+import binascii
+import copy
+import csv
+import hashlib
+import io
+import itertools
 import json
 import os
+import math
+import re
+import smtplib
+import socket
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+import weakref
 import random
 import calendar
+import cProfile
+import analytics
+import assistant
+import forecasting
+import nlquery
+import numpy as np
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'your_secret_key'
 app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'mysql+pymysql://root:@localhost/finance_tracker')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-db = SQLAlchemy(app)
+app.config['DB_POOL_SIZE'] = int(os.getenv('DB_POOL_SIZE', 5))  # connections kept open per worker process
+app.config['DB_MAX_OVERFLOW'] = int(os.getenv('DB_MAX_OVERFLOW', 10))  # extra connections opened under load, closed when returned
+app.config['DB_POOL_TIMEOUT'] = float(os.getenv('DB_POOL_TIMEOUT', 30))  # seconds to wait for a free connection
+app.config['DB_POOL_RECYCLE'] = int(os.getenv('DB_POOL_RECYCLE', 1800))  # seconds; keep below MySQL's wait_timeout
+app.config['DB_POOL_PRE_PING'] = os.getenv('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes')
+# Comma-separated replica URLs; the read-only views (dashboard, reports, budget, ai_query) query one of them
+app.config['DATABASE_REPLICA_URLS'] = [url.strip() for url in os.getenv('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+app.config['REPLICA_STICKY_SECONDS'] = float(os.getenv('REPLICA_STICKY_SECONDS', 10))  # reads stay on the primary after a user's write
+app.config['TRANSACTIONS_PAGE_SIZE'] = int(os.getenv('TRANSACTIONS_PAGE_SIZE', 50))
+app.config['IMPORT_BATCH_SIZE'] = int(os.getenv('IMPORT_BATCH_SIZE', 5000))
+app.config['DASHBOARD_WIDGET_MAX_AGE'] = int(os.getenv('DASHBOARD_WIDGET_MAX_AGE', 0))
+app.config['SPENDING_ANOMALY_WINDOW_MONTHS'] = int(os.getenv('SPENDING_ANOMALY_WINDOW_MONTHS', 6))
+app.config['SPENDING_ANOMALY_MIN_MONTHS'] = int(os.getenv('SPENDING_ANOMALY_MIN_MONTHS', 3))
+app.config['SPENDING_ANOMALY_Z_THRESHOLD'] = float(os.getenv('SPENDING_ANOMALY_Z_THRESHOLD', 2.0))
+app.config['INSIGHT_CACHE_BACKEND'] = os.getenv('INSIGHT_CACHE_BACKEND', 'memory')  # 'memory' or 'redis'
+app.config['INSIGHT_CACHE_URL'] = os.getenv('INSIGHT_CACHE_URL', 'redis://localhost:6379/0')
+app.config['INSIGHT_CACHE_TTL'] = int(os.getenv('INSIGHT_CACHE_TTL', 300))
+app.config['INSIGHT_CACHE_MAX_ENTRIES'] = int(os.getenv('INSIGHT_CACHE_MAX_ENTRIES', 10000))
+app.config['FORECAST_HORIZON_MONTHS'] = int(os.getenv('FORECAST_HORIZON_MONTHS', 6))
+app.config['FORECAST_HISTORY_MONTHS'] = int(os.getenv('FORECAST_HISTORY_MONTHS', 24))
+app.config['FORECAST_CONFIDENCE_Z'] = float(os.getenv('FORECAST_CONFIDENCE_Z', 1.28))  # 80% band
+app.config['FORECAST_MODEL_TTL'] = int(os.getenv('FORECAST_MODEL_TTL', 7 * 24 * 3600))  # full refit at least this often
+app.config['RECURRING_DETECTION_MONTHS'] = int(os.getenv('RECURRING_DETECTION_MONTHS', 12))
+app.config['RECURRING_BATCH_SIZE'] = int(os.getenv('RECURRING_BATCH_SIZE', 500))  # rules materialized per commit
+app.config['JOB_MAX_ATTEMPTS'] = int(os.getenv('JOB_MAX_ATTEMPTS', 3))
+app.config['JOB_RETRY_DELAY'] = int(os.getenv('JOB_RETRY_DELAY', 30))  # seconds, doubled on each retry
+app.config['JOB_LOCK_TIMEOUT'] = int(os.getenv('JOB_LOCK_TIMEOUT', 15 * 60))  # running jobs older than this are requeued
+app.config['JOB_EMBEDDED_WORKERS'] = int(os.getenv('JOB_EMBEDDED_WORKERS', 0))  # worker threads inside the web process
+app.config['JOB_UPLOAD_DIR'] = os.getenv('JOB_UPLOAD_DIR', 'uploads')
+app.config['IMPORT_ASYNC_MIN_BYTES'] = int(os.getenv('IMPORT_ASYNC_MIN_BYTES', 2 * 1024 * 1024))  # larger uploads run as jobs
+# Queue an insight/forecast refresh after each write; needs a shared cache backend or embedded workers to pay off
+app.config['PRECOMPUTE_INSIGHTS'] = os.getenv('PRECOMPUTE_INSIGHTS', '').lower() in ('1', 'true', 'yes')
+# Serve /dashboard, its widgets, /reports, /budget and /ai_query from async views (see asgi.py)
+app.config['ASYNC_VIEWS'] = os.getenv('ASYNC_VIEWS', '').lower() in ('1', 'true', 'yes')
+app.config['ASYNC_DATABASE_URL'] = os.getenv('ASYNC_DATABASE_URL')  # derived from DATABASE_URL when unset
+app.config['QUERY_PLAN_CACHE_SIZE'] = int(os.getenv('QUERY_PLAN_CACHE_SIZE', 1000))  # compiled /ai_query question shapes
+app.config['ANALYTICS_CACHE_DIR'] = os.getenv('ANALYTICS_CACHE_DIR', 'analytics_cache')  # per-user yearly .npy files
+app.config['BUDGET_HISTORY_MONTHS'] = int(os.getenv('BUDGET_HISTORY_MONTHS', 12))  # closed periods shown on /budget, by start month
+app.config['ALERT_SENDER'] = os.getenv('ALERT_SENDER', 'file')  # 'file' or 'smtp'
+app.config['ALERT_FILE_PATH'] = os.getenv('ALERT_FILE_PATH', 'alerts.log')
+app.config['ALERT_SMTP_HOST'] = os.getenv('ALERT_SMTP_HOST', 'localhost')
+app.config['ALERT_SMTP_PORT'] = int(os.getenv('ALERT_SMTP_PORT', 1025))  # the default port of a local SMTP debugging server
+app.config['ALERT_FROM'] = os.getenv('ALERT_FROM', 'alerts@finance-tracker.local')
+app.config['ALERT_BUDGET_THRESHOLDS'] = [int(p) for p in os.getenv('ALERT_BUDGET_THRESHOLDS', '80,100').split(',')]  # % of limit
+app.config['ALERT_GOAL_THRESHOLDS'] = [int(p) for p in os.getenv('ALERT_GOAL_THRESHOLDS', '50,100').split(',')]  # % of target
+app.config['ALERT_DELIVERY_DELAY'] = int(os.getenv('ALERT_DELIVERY_DELAY', 60))  # seconds to collect alerts before sending
+app.config['ALERT_DIGEST_MIN'] = int(os.getenv('ALERT_DIGEST_MIN', 3))  # pending alerts sent as one digest email
+app.config['INSTRUMENTATION_ENABLED'] = os.getenv('INSTRUMENTATION_ENABLED', '').lower() in ('1', 'true', 'yes')
+app.config['QUERY_BUDGET'] = int(os.getenv('QUERY_BUDGET', 20))  # SQL statements per request before a warning is logged
+app.config['PROFILE_SAMPLE_RATE'] = float(os.getenv('PROFILE_SAMPLE_RATE', 0.0))  # fraction of requests to profile
+app.config['PROFILE_DIR'] = os.getenv('PROFILE_DIR', 'profiles')
+class CheckoutTimingMixin:
+    """Reports how long each checkout waited for a connection to pool_metrics"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            pool_metrics.observe_checkout(self, time.perf_counter() - start, timed_out=True)
+            raise
+        pool_metrics.observe_checkout(self, time.perf_counter() - start)
+        return connection
+
+class TimedQueuePool(CheckoutTimingMixin, QueuePool):
+    pass
+
+class TimedAsyncQueuePool(CheckoutTimingMixin, AsyncAdaptedQueuePool):
+    pass
+
+def engine_options(url, asyncio=False):
+    """create_engine() keyword arguments for the DB_POOL_* settings"""
+    url = make_url(url)
+    options = {'pool_pre_ping': app.config['DB_POOL_PRE_PING'], 'pool_recycle': app.config['DB_POOL_RECYCLE']}
+    # An in-memory SQLite database lives in a single connection and cannot be pooled
+    if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+        return options
+    options.update(
+        poolclass=TimedAsyncQueuePool if asyncio else TimedQueuePool,
+        pool_size=app.config['DB_POOL_SIZE'],
+        max_overflow=app.config['DB_MAX_OVERFLOW'],
+        pool_timeout=app.config['DB_POOL_TIMEOUT']
+    )
+    return options
+
+def watch_pool(engine):
+    """Count the connections an engine's pool opens and discards; listening on the engine
+    rather than the pool keeps counting after dispose() replaces the pool"""
+    event.listen(engine, 'connect', lambda *_: pool_metrics.count(engine.pool, 'connects'))
+    # Stale connections found by pre-ping or dropped mid-query end up here
+    event.listen(engine, 'invalidate', lambda *_: pool_metrics.count(engine.pool, 'invalidations'))
+
+# Read replicas: each replica is a bind of its own ('replica_0', 'replica_1', ...). No model
+# is bound to them; RoutingSession sends a request's reads there when its view asks for it.
+REPLICA_BIND_KEYS = [f'replica_{i}' for i in range(len(app.config['DATABASE_REPLICA_URLS']))]
+
+class RoutingSession(FlaskSession):
+    """Reads go to the request's replica, if use_replica() picked one; writes always go to the primary"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            if self._flushing or isinstance(clause, (Insert, Update, Delete)):
+                stick_to_primary()
+            elif has_app_context() and g.get('db_replica'):
+                return self._db.engines[g.db_replica]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+def use_replica():
+    """Send this request's reads to a replica, unless the user wrote within REPLICA_STICKY_SECONDS"""
+    if REPLICA_BIND_KEYS and session.get('primary_until', 0) <= time.time():
+        g.db_replica = random.choice(REPLICA_BIND_KEYS)
+
+def use_primary():
+    """Read from the primary for the rest of the request, for work whose result is stored on the
+    primary (snapshots). Writes that follow are derived from the primary's own data, so they
+    don't make the user's later requests stick to it."""
+    if has_request_context():
+        g.pop('db_replica', None)
+        g.db_derived_writes = True
+
+def stick_to_primary():
+    """After a write, read from the primary for the rest of the request and, so the user
+    sees their own writes despite replication lag, for REPLICA_STICKY_SECONDS after it"""
+    if not has_request_context() or g.get('db_derived_writes'):
+        return
+    g.pop('db_replica', None)
+    if REPLICA_BIND_KEYS and 'user_id' in session:
+        session['primary_until'] = time.time() + app.config['REPLICA_STICKY_SECONDS']
+
+def read_replica(view):
+    """For read-only views; any write they do still goes to the primary"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        use_replica()
+        return view(*args, **kwargs)
+    return wrapper
+
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
+app.config['SQLALCHEMY_BINDS'] = {
+    key: dict(engine_options(url), url=url) for key, url in zip(REPLICA_BIND_KEYS, app.config['DATABASE_REPLICA_URLS'])
+}
+db = SQLAlchemy(app, session_options={'class_': RoutingSession})
 migrate = Migrate(app, db)
+with app.app_context():
+    for engine in db.engines.values():
+        watch_pool(engine)
 
 # Login required decorator
 def login_required(f):
@@ -26,6 +203,369 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+class LRUCacheBackend:
+    """In-process cache backend: a thread-safe LRU with per-entry expiry"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl if ttl else None)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def incr(self, key):
+        with self._lock:
+            value, expires_at = self._entries.get(key, (0, None))
+            self._entries[key] = (value + 1, expires_at)
+            self._entries.move_to_end(key)
+            return value + 1
+
+class SharedCacheBackend:
+    """Cache backend shared between workers, wrapping a Redis-style client (get/set/incr)"""
+
+    def __init__(self, client, prefix='finance_tracker:'):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key, value, ttl=None):
+        self.client.set(self.prefix + key, json.dumps(value), ex=ttl)
+
+    def incr(self, key):
+        return self.client.incr(self.prefix + key)
+
+class InsightCache:
+    """Per-user cache of computed insights.
+
+    Keys embed a per-user generation number; invalidate() bumps it so every
+    entry cached for that user is skipped at once, whatever the backend.
+    Cached values must be JSON-serializable.
+    """
+
+    def __init__(self, backend, ttl):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.invalidation_listeners = []
+        self._lock = threading.Lock()
+
+    def _key(self, user_id, name):
+        generation = self.backend.get(f'generation:{user_id}') or 0
+        return f'insights:{user_id}:{generation}:{name}'
+
+    def get_or_compute(self, user_id, name, compute, ttl=None):
+        key = self._key(user_id, name)
+        value = self.backend.get(key)
+        with self._lock:
+            if value is not None:
+                self.hits += 1
+                return value
+            self.misses += 1
+        value = compute()
+        self.backend.set(key, value, ttl or self.ttl)
+        return value
+
+    async def get_or_compute_async(self, user_id, name, compute, ttl=None):
+        """get_or_compute() for a coroutine function `compute`"""
+        key = self._key(user_id, name)
+        value = self.backend.get(key)
+        with self._lock:
+            if value is not None:
+                self.hits += 1
+                return value
+            self.misses += 1
+        value = await compute()
+        self.backend.set(key, value, ttl or self.ttl)
+        return value
+
+    def invalidate(self, user_id):
+        self.backend.incr(f'generation:{user_id}')
+        with self._lock:
+            self.invalidations += 1
+        for listener in self.invalidation_listeners:
+            listener(user_id)
+
+    def get_model(self, user_id, name):
+        """Fitted models outlive invalidate(); their owners decide when to refresh them"""
+        return self.backend.get(f'models:{user_id}:{name}')
+
+    def set_model(self, user_id, name, value, ttl=None):
+        self.backend.set(f'models:{user_id}:{name}', value, ttl)
+
+    def discard_model(self, user_id, name):
+        self.backend.set(f'models:{user_id}:{name}', None, 1)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'backend': type(self.backend).__name__,
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations,
+                'hit_ratio': self.hits / lookups if lookups else 0.0
+            }
+
+def create_insight_cache():
+    if app.config['INSIGHT_CACHE_BACKEND'] == 'redis':
+        import redis  # optional dependency, only needed for the shared backend
+        backend = SharedCacheBackend(redis.Redis.from_url(app.config['INSIGHT_CACHE_URL']))
+    else:
+        backend = LRUCacheBackend(app.config['INSIGHT_CACHE_MAX_ENTRIES'])
+    return InsightCache(backend, app.config['INSIGHT_CACHE_TTL'])
+
+insight_cache = create_insight_cache()
+
+class RequestMetrics:
+    """Per-route request and SQL counters, rendered in the Prometheus text format"""
+
+    DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self):
+        self._routes = {}
+        self._lock = threading.Lock()
+
+    def record(self, route, method, duration, statements, sql_time, rows, over_budget):
+        with self._lock:
+            entry = self._routes.setdefault((route, method), {
+                'requests': 0,
+                'duration_sum': 0.0,
+                'buckets': [0] * len(self.DURATION_BUCKETS),
+                'statements': 0,
+                'sql_time': 0.0,
+                'rows': 0,
+                'over_budget': 0
+            })
+            entry['requests'] += 1
+            entry['duration_sum'] += duration
+            for i, bound in enumerate(self.DURATION_BUCKETS):
+                if duration <= bound:
+                    entry['buckets'][i] += 1
+            entry['statements'] += statements
+            entry['sql_time'] += sql_time
+            entry['rows'] += rows
+            entry['over_budget'] += int(over_budget)
+
+    def render(self):
+        with self._lock:
+            routes = {key: dict(entry, buckets=list(entry['buckets'])) for key, entry in sorted(self._routes.items())}
+
+        lines = []
+        def metric(name, kind, help_text, samples):
+            lines.append(f'# HELP finance_tracker_{name} {help_text}')
+            lines.append(f'# TYPE finance_tracker_{name} {kind}')
+            for suffix, labels, value in samples:
+                label_text = ','.join(f'{k}="{v}"' for k, v in labels)
+                lines.append(f'finance_tracker_{name}{suffix}{{{label_text}}} {value}' if label_text
+                             else f'finance_tracker_{name}{suffix} {value}')
+
+        def per_route(field):
+            return [('', (('route', route), ('method', method)), entry[field]) for (route, method), entry in routes.items()]
+
+        histogram = []
+        for (route, method), entry in routes.items():
+            labels = (('route', route), ('method', method))
+            for bound, count in zip(self.DURATION_BUCKETS, entry['buckets']):
+                histogram.append(('_bucket', labels + (('le', bound),), count))
+            histogram.append(('_bucket', labels + (('le', '+Inf'),), entry['requests']))
+            histogram.append(('_sum', labels, round(entry['duration_sum'], 6)))
+            histogram.append(('_count', labels, entry['requests']))
+
+        metric('http_requests_total', 'counter', 'Requests handled per route.', per_route('requests'))
+        metric('http_request_duration_seconds', 'histogram', 'Wall time spent in the view per route.', histogram)
+        metric('sql_statements_total', 'counter', 'SQL statements executed per route.', per_route('statements'))
+        metric('sql_duration_seconds_total', 'counter', 'Time spent executing SQL per route.',
+               [(suffix, labels, round(value, 6)) for suffix, labels, value in per_route('sql_time')])
+        metric('sql_rows_total', 'counter', 'Rows reported by the DB driver per route.', per_route('rows'))
+        metric('query_budget_exceeded_total', 'counter', 'Requests that ran more SQL statements than QUERY_BUDGET.',
+               per_route('over_budget'))
+
+        pools = pool_metrics.snapshot(pool_metrics.pool_names())
+        def per_pool(field):
+            return [('', (('pool', name),), entry[field]) for name, entry in sorted(pools.items())]
+        wait_histogram = []
+        for name, entry in sorted(pools.items()):
+            for bound, count in zip(pool_metrics.WAIT_BUCKETS, entry['buckets']):
+                wait_histogram.append(('_bucket', (('pool', name), ('le', bound)), count))
+            wait_histogram.append(('_bucket', (('pool', name), ('le', '+Inf')), entry['checkouts']))
+            wait_histogram.append(('_sum', (('pool', name),), round(entry['wait_sum'], 6)))
+            wait_histogram.append(('_count', (('pool', name),), entry['checkouts']))
+        metric('db_pool_checkout_wait_seconds', 'histogram', 'Time spent waiting for a pooled connection.', wait_histogram)
+        metric('db_pool_checkout_timeouts_total', 'counter', 'Checkouts that gave up after DB_POOL_TIMEOUT.',
+               per_pool('timeouts'))
+        metric('db_pool_connects_total', 'counter', 'New DB connections opened by the pool.', per_pool('connects'))
+        metric('db_pool_invalidations_total', 'counter', 'Connections discarded as stale or broken.',
+               per_pool('invalidations'))
+        metric('db_pool_connections_in_use', 'gauge', 'Connections currently checked out.', per_pool('in_use'))
+        metric('db_pool_connections_idle', 'gauge', 'Open connections waiting in the pool.', per_pool('idle'))
+        metric('db_pool_overflow_connections', 'gauge', 'Connections open beyond DB_POOL_SIZE.', per_pool('overflow'))
+        metric('db_pool_size', 'gauge', 'Configured pool size.', per_pool('size'))
+
+        cache = insight_cache.stats()
+        metric('insight_cache_hits_total', 'counter', 'Insight cache hits.', [('', (), cache['hits'])])
+        metric('insight_cache_misses_total', 'counter', 'Insight cache misses.', [('', (), cache['misses'])])
+        metric('insight_cache_invalidations_total', 'counter', 'Insight cache invalidations.',
+               [('', (), cache['invalidations'])])
+        return '\n'.join(lines) + '\n'
+
+request_metrics = RequestMetrics()
+
+class PoolMetrics:
+    """Checkout waits, timeouts and connection churn per connection pool, plus each pool's live gauges"""
+
+    WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+    def __init__(self):
+        self._pools = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def _empty_entry(self):
+        return {
+            'checkouts': 0,
+            'wait_sum': 0.0,
+            'buckets': [0] * len(self.WAIT_BUCKETS),
+            'timeouts': 0,
+            'connects': 0,
+            'invalidations': 0
+        }
+
+    def _entry(self, pool):
+        entry = self._pools.get(pool)
+        if entry is None:
+            entry = self._pools[pool] = self._empty_entry()
+        return entry
+
+    def observe_checkout(self, pool, seconds, timed_out=False):
+        with self._lock:
+            entry = self._entry(pool)
+            if timed_out:
+                entry['timeouts'] += 1
+                return
+            entry['checkouts'] += 1
+            entry['wait_sum'] += seconds
+            for i, bound in enumerate(self.WAIT_BUCKETS):
+                if seconds <= bound:
+                    entry['buckets'][i] += 1
+
+    def count(self, pool, field):
+        with self._lock:
+            self._entry(pool)[field] += 1
+
+    def snapshot(self, names):
+        """{name: counters plus in_use/idle/overflow/size gauges}, pools named by `names` ({pool: name})"""
+        with self._lock:
+            pools = [(pool, dict(entry, buckets=list(entry['buckets']))) for pool, entry in self._pools.items()]
+        # Named pools nothing has happened on yet still get their gauges
+        seen = {pool for pool, _ in pools}
+        pools += [(pool, self._empty_entry()) for pool in names if pool not in seen]
+        result = {}
+        for pool, entry in pools:
+            total = result.setdefault(names.get(pool, 'other'), dict(
+                self._empty_entry(), in_use=0, idle=0, overflow=0, size=0
+            ))
+            for field in ('checkouts', 'wait_sum', 'timeouts', 'connects', 'invalidations'):
+                total[field] += entry[field]
+            total['buckets'] = [a + b for a, b in zip(total['buckets'], entry['buckets'])]
+            if isinstance(pool, QueuePool):
+                total['in_use'] += pool.checkedout()
+                total['idle'] += pool.checkedin()
+                # overflow() counts from -pool_size while the base connections are still unopened
+                total['overflow'] += max(pool.overflow(), 0)
+                total['size'] += pool.size()
+        return result
+
+    def pool_names(self):
+        """{pool: name} for the app's engines: 'default', each bind key, and 'async' or 'async:<bind key>'
+        for the asyncio engines"""
+        names = {engine.pool: key or 'default' for key, engine in db.engines.items()}
+        for engines in list(async_engines.values()):
+            names.update({engine.sync_engine.pool: f'async:{key}' if key else 'async' for key, engine in list(engines.items())})
+        return names
+
+pool_metrics = PoolMetrics()
+
+# SQL listeners are attached to every engine so binds added later are counted too;
+# they only record while a request has instrumentation state in `g`.
+@event.listens_for(Engine, 'before_cursor_execute')
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and 'sql_metrics' in g:
+        conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _record_query(conn, cursor, statement, parameters, context, executemany):
+    if not (has_request_context() and 'sql_metrics' in g and conn.info.get('query_start')):
+        return
+    metrics = g.sql_metrics
+    metrics['statements'] += 1
+    metrics['time'] += time.perf_counter() - conn.info['query_start'].pop()
+    # pymysql buffers result sets so SELECT rowcounts are exact there; sqlite only reports DML rows
+    if cursor.rowcount and cursor.rowcount > 0:
+        metrics['rows'] += cursor.rowcount
+
+@app.before_request
+def start_request_instrumentation():
+    if not app.config['INSTRUMENTATION_ENABLED'] or request.endpoint in ('metrics', 'static'):
+        return
+    g.sql_metrics = {'statements': 0, 'time': 0.0, 'rows': 0}
+    g.request_start = time.perf_counter()
+    if app.config['PROFILE_SAMPLE_RATE'] and random.random() < app.config['PROFILE_SAMPLE_RATE']:
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is already active on this interpreter
+            return
+        g.profiler = profiler
+
+@app.after_request
+def finish_request_instrumentation(response):
+    if 'request_start' not in g:
+        return response
+    duration = time.perf_counter() - g.request_start
+    metrics = g.sql_metrics
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    over_budget = metrics['statements'] > app.config['QUERY_BUDGET']
+    request_metrics.record(route, request.method, duration, metrics['statements'], metrics['time'], metrics['rows'], over_budget)
+    if over_budget:
+        app.logger.warning('%s %s ran %d SQL statements (budget %d) in %.1f ms, %.1f ms in SQL',
+                           request.method, request.path, metrics['statements'], app.config['QUERY_BUDGET'],
+                           duration * 1000, metrics['time'] * 1000)
+
+    if 'profiler' in g:
+        g.profiler.disable()
+        os.makedirs(app.config['PROFILE_DIR'], exist_ok=True)
+        filename = f"{request.endpoint or 'unmatched'}-{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}.prof"
+        g.profiler.dump_stats(os.path.join(app.config['PROFILE_DIR'], filename))
+    return response
+
+@app.route('/metrics')
+def metrics():
+    if not app.config['INSTRUMENTATION_ENABLED']:
+        abort(404)
+    return Response(request_metrics.render(), mimetype='text/plain; version=0.0.4')
+
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
@@ -53,6 +593,15 @@ class Transaction(db.Model):
     type = db.Column(db.String(10), nullable=False)  # 'income' or 'expense'
     date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    # Set on income that was contributed to a goal; Goal.current_amount includes it
+    goal_id = db.Column(db.Integer, db.ForeignKey('goal.id', name='fk_transaction_goal_id'), nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_transaction_user_date', 'user_id', 'date'),
+        db.Index('ix_transaction_user_type_date', 'user_id', 'type', 'date'),
+        db.Index('ix_transaction_user_type_amount', 'user_id', 'type', 'amount'),
+        db.Index('ix_transaction_user_category_type_date', 'user_id', 'category', 'type', 'date'),
+    )
 
 class Goal(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -62,14 +611,78 @@ class Goal(db.Model):
     target_date = db.Column(db.DateTime, nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
 
+    __table_args__ = (
+        db.Index('ix_goal_user_target_date', 'user_id', 'target_date'),
+    )
+
+def _one_month_later(context):
+    month = context.get_current_parameters()['month']
+    return datetime(month.year + month.month // 12, month.month % 12 + 1, 1)
+
 class Budget(db.Model):
+    """One budget period: spending in `category` from `month` up to (not including) `period_end`"""
     id = db.Column(db.Integer, primary_key=True)
     category = db.Column(db.String(50), nullable=False)
     limit = db.Column(db.Float, nullable=False)  # Changed from 'amount' to 'limit'
     spent = db.Column(db.Float, default=0)
-    month = db.Column(db.DateTime, nullable=False)
+    month = db.Column(db.DateTime, nullable=False)  # first month of the period
+    period_end = db.Column(db.DateTime, nullable=False, default=_one_month_later)
+    carried_over = db.Column(db.Float, nullable=False, default=0)  # unspent amount brought forward
+    template_id = db.Column(db.Integer, db.ForeignKey('budget_template.id'))
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
 
+    __table_args__ = (
+        db.Index('ix_budget_user_month_category', 'user_id', 'month', 'category'),
+        db.Index('ix_budget_user_period_end', 'user_id', 'period_end'),
+        db.UniqueConstraint('template_id', 'month', name='uq_budget_template_month'),
+    )
+
+    @property
+    def available(self):
+        return self.limit + (self.carried_over or 0)
+
+class BudgetTemplate(db.Model):
+    """A budget that rolls forward every `period_months`, optionally carrying over what was left unspent"""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    category = db.Column(db.String(50), nullable=False)
+    limit = db.Column(db.Float, nullable=False)
+    period_months = db.Column(db.Integer, nullable=False, default=1)  # 1, 3 or 12
+    carry_over = db.Column(db.Boolean, nullable=False, default=False)
+    start_month = db.Column(db.DateTime, nullable=False)  # periods are aligned to this month
+    active = db.Column(db.Boolean, nullable=False, default=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_budget_template_active_user', 'active', 'user_id'),
+    )
+
+    def period_start(self, when):
+        """Start of the period containing `when`"""
+        months = (when.year - self.start_month.year) * 12 + when.month - self.start_month.month
+        return add_months(self.start_month, months // self.period_months * self.period_months)
+
+class BudgetSnapshot(db.Model):
+    """The final figures of a closed budget period; backdated writes still adjust `spent`"""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    budget_id = db.Column(db.Integer, nullable=False, unique=True)
+    category = db.Column(db.String(50), nullable=False)
+    period_start = db.Column(db.DateTime, nullable=False)
+    period_end = db.Column(db.DateTime, nullable=False)
+    limit = db.Column(db.Float, nullable=False)
+    carried_over = db.Column(db.Float, nullable=False, default=0)
+    spent = db.Column(db.Float, nullable=False)
+    frozen_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_budget_snapshot_user_period_start', 'user_id', 'period_start'),
+    )
+
+    @property
+    def available(self):
+        return self.limit + self.carried_over
+
 class Debt(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -82,84 +695,599 @@ class Debt(db.Model):
     paid_amount = db.Column(db.Float, nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
 
-def get_spending_warnings(user_id):
+    __table_args__ = (
+        db.Index('ix_debt_user_next_payment_date', 'user_id', 'next_payment_date'),
+    )
+
+class MonthlyCategoryTotal(db.Model):
+    """Per-user monthly totals for each category and type, kept in step with Transaction"""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    year_month = db.Column(db.String(7), nullable=False)  # 'YYYY-MM'
+    category = db.Column(db.String(50), nullable=False)
+    type = db.Column(db.String(10), nullable=False)
+    total = db.Column(db.Float, nullable=False, default=0)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'year_month', 'category', 'type', name='uq_monthly_category_total'),
+    )
+
+class RecurringRule(db.Model):
+    """A repeating transaction, proposed by the detector and materialized once the user activates it"""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    category = db.Column(db.String(50), nullable=False)
+    type = db.Column(db.String(10), nullable=False)
+    amount = db.Column(db.Float, nullable=False)
+    interval_days = db.Column(db.Float, nullable=False)  # one of forecasting.PERIODS
+    day_of_month = db.Column(db.Integer, nullable=False)  # anchor for monthly/quarterly/yearly rules
+    next_due = db.Column(db.DateTime, nullable=False)
+    status = db.Column(db.String(10), nullable=False, default='proposed')  # 'proposed', 'active' or 'dismissed'
+    occurrences = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_recurring_rule_status_next_due', 'status', 'next_due'),
+        db.Index('ix_recurring_rule_user_status', 'user_id', 'status'),
+    )
+
+    @property
+    def frequency(self):
+        return {7.0: 'weekly', 14.0: 'fortnightly', 30.44: 'monthly', 91.31: 'quarterly', 365.25: 'yearly'}.get(
+            self.interval_days, f'every {self.interval_days:.0f} days')
+
+    @property
+    def last_due(self):
+        months = forecasting.CALENDAR_PERIODS.get(self.interval_days)
+        if months is None:
+            return self.next_due - timedelta(days=self.interval_days)
+        previous = add_months(self.next_due.replace(day=1), -months)
+        return previous.replace(day=min(self.day_of_month, calendar.monthrange(previous.year, previous.month)[1]))
+
+    def as_stream(self):
+        """The rule in the shape forecasting uses for detected streams"""
+        return {
+            'type': self.type,
+            'category': self.category,
+            'amount': self.amount,
+            'stddev': 0.0,
+            'interval': self.interval_days,
+            'day': self.day_of_month,
+            'last_date': self.last_due.isoformat(),
+            'occurrences': self.occurrences
+        }
+
+class Job(db.Model):
+    """A unit of background work, claimed and run by `flask worker` or the embedded worker threads"""
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.Text, nullable=False, default='{}')  # JSON
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    status = db.Column(db.String(10), nullable=False, default='queued')  # 'queued', 'running', 'succeeded' or 'failed'
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    run_after = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_by = db.Column(db.String(100))
+    locked_at = db.Column(db.DateTime)
+    result = db.Column(db.Text)  # JSON
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('ix_job_status_run_after', 'status', 'run_after'),
+        db.Index('ix_job_user_created_at', 'user_id', 'created_at'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'result': json.loads(self.result) if self.result else None,
+            'error': self.last_error.strip().splitlines()[-1] if self.last_error else None,
+            'created_at': self.created_at.isoformat(),
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+class ReportSnapshot(db.Model):
+    """The computed report of a closed period, served as-is until a backdated write invalidates it"""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    period_key = db.Column(db.String(40), nullable=False)  # e.g. 'month:2026-09' or 'custom:2026-01-10:2026-02-05'
+    start = db.Column(db.DateTime, nullable=False)
+    end = db.Column(db.DateTime, nullable=False)  # exclusive
+    payload = db.Column(db.Text, nullable=False)  # JSON
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'period_key', name='uq_report_snapshot_user_period'),
+        db.Index('ix_report_snapshot_user_start', 'user_id', 'start'),
+    )
+
+class AlertLog(db.Model):
+    """A budget or goal threshold crossed by a user; the unique key makes each one fire once per period"""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    kind = db.Column(db.String(10), nullable=False)  # 'budget' or 'goal'
+    subject_id = db.Column(db.Integer, nullable=False)  # Budget.id or Goal.id
+    period = db.Column(db.String(7), nullable=False)  # 'YYYY-MM' for budgets, '' for goals
+    threshold = db.Column(db.Integer, nullable=False)  # percent
+    message = db.Column(db.String(255), nullable=False)
+    status = db.Column(db.String(10), nullable=False, default='pending')  # 'pending', 'sent' or 'skipped'
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'kind', 'subject_id', 'period', 'threshold', name='uq_alert_log'),
+        db.Index('ix_alert_log_user_status', 'user_id', 'status'),
+    )
+
+def month_start(dt):
+    """Return midnight on the first day of the month containing dt"""
+    return dt.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+def add_months(dt, months):
+    """Shift a month-start datetime by a whole number of calendar months"""
+    month_index = dt.year * 12 + dt.month - 1 + months
+    return dt.replace(year=month_index // 12, month=month_index % 12 + 1)
+
+def apply_rollup_delta(user_id, date, category, type, amount, count=1):
+    """Add a transaction's amount to its monthly rollup row.
+
+    Runs inside the caller's DB transaction so the rollup commits (or rolls
+    back) together with the Transaction rows it summarizes.
+    """
+    table = MonthlyCategoryTotal.__table__
+    key = (
+        (table.c.user_id == user_id) &
+        (table.c.year_month == date.strftime('%Y-%m')) &
+        (table.c.category == category) &
+        (table.c.type == type)
+    )
+    increment = table.update().where(key).values(
+        total=table.c.total + amount,
+        count=table.c.count + count
+    )
+    if db.session.execute(increment).rowcount:
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.execute(table.insert().values(
+                user_id=user_id,
+                year_month=date.strftime('%Y-%m'),
+                category=category,
+                type=type,
+                total=amount,
+                count=count
+            ))
+    except IntegrityError:
+        # Another request created the row first
+        db.session.execute(increment)
+
+def apply_budget_delta(user_id, date, category, amount):
+    """Add an expense amount to Budget.spent for the period containing `date` with a SQL-side increment.
+
+    Like apply_rollup_delta(), this joins the caller's DB transaction, and
+    concurrent writers cannot lose each other's updates.
+    """
+    db.session.execute(Budget.__table__.update().where(
+        Budget.user_id == user_id,
+        Budget.category == category,
+        Budget.month <= date,
+        Budget.period_end > date
+    ).values(spent=db.func.coalesce(Budget.spent, 0) + amount))
+    # Periods end on a month boundary, so only a date before this month can be in a frozen one
+    if date < month_start(datetime.now()):
+        db.session.execute(BudgetSnapshot.__table__.update().where(
+            BudgetSnapshot.user_id == user_id,
+            BudgetSnapshot.category == category,
+            BudgetSnapshot.period_start <= date,
+            BudgetSnapshot.period_end > date
+        ).values(spent=BudgetSnapshot.spent + amount))
+
+def apply_transaction_totals(transaction, sign=1):
+    """Add (sign=1) or remove (sign=-1) one transaction's share of the rollup, budget and report totals"""
+    apply_rollup_delta(transaction.user_id, transaction.date, transaction.category, transaction.type,
+                       sign * transaction.amount, sign)
+    invalidate_report_snapshots(transaction.user_id, transaction.date, transaction.date)
+    invalidate_year_columns(transaction.user_id, transaction.date, transaction.date)
+    if transaction.type == 'expense':
+        apply_budget_delta(transaction.user_id, transaction.date, transaction.category, sign * transaction.amount)
+
+def reconcile_budget_spent(user_id=None, include_closed=False):
+    """Recompute Budget.spent from Transaction and fix the rows that drifted; returns how many were fixed.
+
+    Closed periods are frozen in BudgetSnapshot and skipped unless include_closed is set, in which
+    case their snapshots are corrected too.
+    """
+    budgets = db.session.query(Budget.id, Budget.user_id, Budget.month, Budget.period_end, Budget.category, Budget.spent)
+    if user_id is not None:
+        budgets = budgets.filter(Budget.user_id == user_id)
+    if not include_closed:
+        budgets = budgets.filter(Budget.period_end > datetime.now())
+    budgets = budgets.all()
+    if not budgets:
+        return 0
+
+    year_col = db.extract('year', Transaction.date)
+    month_col = db.extract('month', Transaction.date)
+    query = db.session.query(
+        Transaction.user_id, year_col, month_col, Transaction.category, db.func.sum(Transaction.amount)
+    ).filter(
+        Transaction.type == 'expense',
+        Transaction.date >= min(budget.month for budget in budgets)
+    ).group_by(Transaction.user_id, year_col, month_col, Transaction.category)
+    if user_id is not None:
+        query = query.filter(Transaction.user_id == user_id)
+    totals = {
+        (row_user_id, f'{int(year)}-{int(month):02d}', category): float(total or 0)
+        for row_user_id, year, month, category, total in query
+    }
+
+    fixes = []
+    for budget in budgets:
+        spent = 0.0
+        month = month_start(budget.month)
+        while month < budget.period_end:
+            spent += totals.get((budget.user_id, month.strftime('%Y-%m'), budget.category), 0.0)
+            month = add_months(month, 1)
+        spent = round(spent, 2)
+        if abs((budget.spent or 0) - spent) >= 0.005:
+            fixes.append({'budget_id': budget.id, 'new_spent': spent})
+    if fixes:
+        table = Budget.__table__
+        db.session.execute(
+            table.update().where(table.c.id == db.bindparam('budget_id')).values(spent=db.bindparam('new_spent')),
+            fixes
+        )
+        if include_closed:
+            snapshots = BudgetSnapshot.__table__
+            db.session.execute(
+                snapshots.update().where(snapshots.c.budget_id == db.bindparam('fixed_budget_id'))
+                .values(spent=db.bindparam('fixed_spent')),
+                [{'fixed_budget_id': fix['budget_id'], 'fixed_spent': fix['new_spent']} for fix in fixes]
+            )
+    return len(fixes)
+
+def format_budget_period(start, end):
+    """'October 2026' for a one-month period, 'Oct 2026 - Dec 2026' for longer ones"""
+    last_month = add_months(end, -1)
+    if last_month <= start:
+        return f'{start:%B %Y}'
+    return f'{start:%b %Y} - {last_month:%b %Y}'
+
+def open_budget_period(template, period_start, previous=None):
+    """Create the template's Budget for the period starting at period_start, carrying over from `previous`"""
+    period_end = add_months(period_start, template.period_months)
+    months = [add_months(period_start, i).strftime('%Y-%m') for i in range(template.period_months)]
+    # Spending already recorded in the period, e.g. when a budget is created mid-month
+    rollups = get_monthly_rollups(template.user_id, months, type='expense')
+    spent = sum(rollups.get((month, template.category, 'expense'), 0.0) for month in months)
+    carried_over = 0.0
+    if template.carry_over and previous is not None and previous.period_end == period_start:
+        carried_over = max(round(previous.available - (previous.spent or 0), 2), 0.0)
+    budget = Budget(
+        category=template.category,
+        limit=template.limit,
+        spent=spent,
+        month=period_start,
+        period_end=period_end,
+        carried_over=carried_over,
+        template_id=template.id,
+        user_id=template.user_id
+    )
+    try:
+        with db.session.begin_nested():
+            db.session.add(budget)
+    except IntegrityError:
+        # Another roll-forward opened this period first
+        return None
+    return budget
+
+def freeze_closed_budgets(now, user_id=None):
+    """Snapshot every budget period that has ended and has no snapshot yet; returns how many were frozen"""
+    closed = Budget.query.filter(
+        Budget.period_end <= now,
+        ~db.exists().where(BudgetSnapshot.budget_id == Budget.id)
+    )
+    if user_id is not None:
+        closed = closed.filter(Budget.user_id == user_id)
+    rows = [
+        {
+            'user_id': budget.user_id,
+            'budget_id': budget.id,
+            'category': budget.category,
+            'period_start': budget.month,
+            'period_end': budget.period_end,
+            'limit': budget.limit,
+            'carried_over': budget.carried_over or 0.0,
+            'spent': budget.spent or 0.0,
+            'frozen_at': datetime.utcnow()
+        }
+        for budget in closed
+    ]
+    if rows:
+        db.session.execute(BudgetSnapshot.__table__.insert(), rows)
+    return len(rows)
+
+def roll_budgets_forward(now=None, user_id=None):
+    """Freeze ended budget periods and open the current period for every active template.
+
+    Returns (periods frozen, periods opened). Safe to run repeatedly and
+    from several processes: each period is opened at most once per template.
+    """
+    now = now or datetime.now()
+    frozen = freeze_closed_budgets(now, user_id)
+
+    templates = BudgetTemplate.query.filter(BudgetTemplate.active.is_(True))
+    if user_id is not None:
+        templates = templates.filter(BudgetTemplate.user_id == user_id)
+    templates = {template.id: template for template in templates}
+    if not templates:
+        db.session.commit()
+        return frozen, 0
+
+    # Latest period of each template, in one query
+    latest_month = db.session.query(
+        Budget.template_id, db.func.max(Budget.month).label('month')
+    ).filter(Budget.template_id.in_(templates)).group_by(Budget.template_id).subquery()
+    latest = {
+        budget.template_id: budget
+        for budget in Budget.query.join(latest_month, db.and_(
+            Budget.template_id == latest_month.c.template_id,
+            Budget.month == latest_month.c.month
+        ))
+    }
+
+    opened = 0
+    for template_id, template in templates.items():
+        previous = latest.get(template_id)
+        if previous is not None and previous.period_end > now:
+            continue
+        if open_budget_period(template, template.period_start(now), previous) is not None:
+            opened += 1
+    db.session.commit()
+    return frozen, opened
+
+def rebuild_monthly_rollups(user_id=None):
+    """Regenerate MonthlyCategoryTotal rows from Transaction, for one user or everyone"""
+    delete = MonthlyCategoryTotal.__table__.delete()
+    if user_id is not None:
+        delete = delete.where(MonthlyCategoryTotal.user_id == user_id)
+    db.session.execute(delete)
+
+    year_col = db.extract('year', Transaction.date)
+    month_col = db.extract('month', Transaction.date)
+    query = db.session.query(
+        Transaction.user_id, year_col, month_col, Transaction.category, Transaction.type,
+        db.func.sum(Transaction.amount), db.func.count(Transaction.id)
+    ).group_by(Transaction.user_id, year_col, month_col, Transaction.category, Transaction.type)
+    if user_id is not None:
+        query = query.filter(Transaction.user_id == user_id)
+
+    rows = [
+        {
+            'user_id': row_user_id,
+            'year_month': f'{int(year)}-{int(month):02d}',
+            'category': category,
+            'type': type_,
+            'total': float(total or 0),
+            'count': count
+        }
+        for row_user_id, year, month, category, type_, total, count in query
+    ]
+    if rows:
+        db.session.execute(MonthlyCategoryTotal.__table__.insert(), rows)
+    return len(rows)
+
+def get_monthly_rollups(user_id, year_months, type=None):
+    """Return {(year_month, category, type): total} for the given months"""
+    query = MonthlyCategoryTotal.query.filter(
+        MonthlyCategoryTotal.user_id == user_id,
+        MonthlyCategoryTotal.year_month.in_(year_months)
+    )
+    if type is not None:
+        query = query.filter(MonthlyCategoryTotal.type == type)
+    return {(row.year_month, row.category, row.type): row.total for row in query}
+
+def get_category_spending_stats(user_id, current_month, window_months=None):
+    """Return {category: {'mean', 'stddev', 'months'}} of monthly expense totals before current_month.
+
+    One grouped query over the monthly rollup covers every category. Months
+    inside the window with no spending count as zero, and a category's
+    window starts no earlier than the first month it was ever used.
+    """
+    window_months = window_months or app.config['SPENDING_ANOMALY_WINDOW_MONTHS']
+    current_key = current_month.strftime('%Y-%m')
+    window_key = add_months(current_month, -window_months).strftime('%Y-%m')
+    in_window = MonthlyCategoryTotal.year_month >= window_key
+    rows = db.session.query(
+        MonthlyCategoryTotal.category,
+        db.func.min(MonthlyCategoryTotal.year_month),
+        db.func.sum(db.case((in_window, MonthlyCategoryTotal.total), else_=0)),
+        db.func.sum(db.case((in_window, MonthlyCategoryTotal.total * MonthlyCategoryTotal.total), else_=0))
+    ).filter(
+        MonthlyCategoryTotal.user_id == user_id,
+        MonthlyCategoryTotal.type == 'expense',
+        MonthlyCategoryTotal.year_month < current_key
+    ).group_by(MonthlyCategoryTotal.category)
+
+    stats = {}
+    for category, first_key, total, total_squared in rows:
+        first_month = datetime.strptime(first_key, '%Y-%m')
+        months = min(window_months, (current_month.year - first_month.year) * 12 + current_month.month - first_month.month)
+        mean = float(total or 0) / months
+        variance = max(float(total_squared or 0) / months - mean * mean, 0.0)
+        stats[category] = {'mean': mean, 'stddev': math.sqrt(variance), 'months': months}
+    return stats
+
+def get_spending_anomalies(category_totals, category_stats):
+    """Score this month's category totals against their history and return those above the z threshold"""
+    threshold = app.config['SPENDING_ANOMALY_Z_THRESHOLD']
+    anomalies = []
+    for category, amount in category_totals.items():
+        stats = category_stats.get(category)
+        if not stats or stats['months'] < app.config['SPENDING_ANOMALY_MIN_MONTHS'] or amount <= stats['mean']:
+            continue
+        # Floor the deviation so perfectly regular spending does not divide by zero
+        stddev = max(stats['stddev'], stats['mean'] * 0.05, 1.0)
+        z_score = (amount - stats['mean']) / stddev
+        if z_score >= threshold:
+            anomalies.append({'category': category, 'amount': amount, 'mean': stats['mean'], 'z_score': z_score})
+    return sorted(anomalies, key=lambda a: a['z_score'], reverse=True)
+
+def type_totals_statement(user_id):
+    return db.select(
+        MonthlyCategoryTotal.type, db.func.sum(MonthlyCategoryTotal.total)
+    ).where(MonthlyCategoryTotal.user_id == user_id).group_by(MonthlyCategoryTotal.type)
+
+def type_totals_from_rows(rows):
+    totals = {'income': 0.0, 'expense': 0.0}
+    for type_, total in rows:
+        totals[type_] = float(total or 0)
+    return totals
+
+def get_type_totals(user_id):
+    """All-time income and expense totals from the monthly rollup"""
+    return type_totals_from_rows(db.session.execute(type_totals_statement(user_id)))
+
+def get_monthly_aggregates(user_id, months=6):
+    """Per-month income/expense and per-category spend for the last `months` months, newest first.
+
+    'matrix' holds the same figures as analytics.MonthlyTotals arrays
+    (oldest first) for the vectorized trend, tip and forecast code.
+    """
+    current_month = month_start(datetime.now())
+    month_keys = [add_months(current_month, -i).strftime('%Y-%m') for i in range(months)]
+    rollups = get_monthly_rollups(user_id, month_keys)
+    matrix = analytics.monthly_totals(
+        ((key, category, type_, total) for (key, category, type_), total in rollups.items()),
+        month_keys[::-1]
+    )
+
+    monthly = {
+        key: {'income': float(income), 'expense': float(expense)}
+        for key, income, expense in zip(matrix.month_keys, matrix.income, matrix.expense)
+    }
+    category_months = {
+        category: dict(zip(matrix.month_keys, row.tolist()))
+        for category, row in zip(matrix.categories, matrix.category_expense)
+    }
+    current = matrix.category_expense[:, -1]
+    return {
+        'current_month': current_month,
+        'month_keys': month_keys,
+        'monthly': monthly,
+        'category_months': category_months,
+        'current_categories': {
+            matrix.categories[i]: float(current[i]) for i in np.flatnonzero(current)
+        },
+        'matrix': matrix
+    }
+
+def get_daily_series(user_id):
+    """Daily income/expense totals over the user's whole history, oldest first"""
+    daily = {}
+    day_col = db.func.date(Transaction.date)
+    day_rows = db.session.query(
+        day_col, Transaction.type, db.func.sum(Transaction.amount)
+    ).filter(Transaction.user_id == user_id).group_by(day_col, Transaction.type)
+    for day, type_, total in day_rows:
+        day_totals = daily.setdefault(str(day), {'income': 0, 'expense': 0})
+        day_totals[type_] = day_totals.get(type_, 0) + float(total or 0)
+    return dict(sorted(daily.items()))
+
+def current_budgets_statement(user_id, when=None):
+    when = when or datetime.now()
+    return db.select(Budget).where(
+        Budget.user_id == user_id,
+        Budget.period_end > when,
+        Budget.month <= when
+    )
+
+def get_current_budgets(user_id, when=None):
+    """Budgets whose period contains `when` (default now); Budget.spent is kept up to date on every write"""
+    return db.session.scalars(current_budgets_statement(user_id, when)).all()
+
+def get_dashboard_aggregates(user_id, months=6):
+    """Compute the figures behind the dashboard insights with a fixed number of GROUP BY queries.
+
+    The result feeds get_spending_warnings(), get_savings_advice(),
+    get_budget_tips() and get_ai_insights(), so computing insights never
+    scans the user's raw transactions in Python.
+    """
+    aggregates = get_monthly_aggregates(user_id, months)
+    aggregates.update({
+        'totals': get_type_totals(user_id),
+        'category_stats': get_category_spending_stats(user_id, aggregates['current_month']),
+        'budgets': get_current_budgets(user_id, aggregates['current_month']),
+        'goals': Goal.query.filter_by(user_id=user_id).all(),
+        'recurring_rules': RecurringRule.query.filter(
+            RecurringRule.user_id == user_id,
+            RecurringRule.status != 'dismissed'
+        ).all()
+    })
+    return aggregates
+
+def get_spending_warnings(user_id, aggregates=None):
     """Calculate spending warnings based on user's transaction patterns"""
     warnings = []
+    if aggregates is None:
+        aggregates = get_dashboard_aggregates(user_id)
     
-    # Get current month's transactions
-    current_month = datetime.now().replace(day=1)
-    monthly_transactions = Transaction.query.filter_by(
-        user_id=user_id,
-        type='expense'
-    ).filter(Transaction.date >= current_month).all()
-    
-    # Get user's budgets
-    budgets = Budget.query.filter_by(user_id=user_id).all()
+    # Current month's spending per category
+    category_totals = aggregates['current_categories']
     
-    # Check for overspending in budget categories
-    for budget in budgets:
-        spent = sum(t.amount for t in monthly_transactions if t.category == budget.category)
-        if spent > budget.limit:
+    # Check for overspending in budget categories (over the whole budget period)
+    for budget in aggregates['budgets']:
+        spent = budget.spent or 0
+        if spent > budget.available:
             warnings.append({
                 'type': 'budget_exceeded',
                 'category': budget.category,
-                'message': f'You have exceeded your {budget.category} budget by ${spent - budget.limit:.2f}',
+                'message': f'You have exceeded your {budget.category} budget by ${spent - budget.available:.2f}',
                 'severity': 'high'
             })
-        elif spent > budget.limit * 0.8:  # Warning at 80% of budget
+        elif spent > budget.available * 0.8:  # Warning at 80% of budget
             warnings.append({
                 'type': 'budget_warning',
                 'category': budget.category,
-                'message': f'You are close to exceeding your {budget.category} budget (${budget.limit - spent:.2f} remaining)',
+                'message': f'You are close to exceeding your {budget.category} budget (${budget.available - spent:.2f} remaining)',
                 'severity': 'medium'
             })
     
-    # Check for unusual spending patterns
-    category_totals = {}
-    for transaction in monthly_transactions:
-        category_totals[transaction.category] = category_totals.get(transaction.category, 0) + transaction.amount
-    
-    # Get average spending for each category from previous months
-    for category in category_totals:
-        prev_months_avg = db.session.query(db.func.avg(Transaction.amount)).filter(
-            Transaction.user_id == user_id,
-            Transaction.category == category,
-            Transaction.type == 'expense',
-            Transaction.date < current_month
-        ).scalar() or 0
-        
-        if category_totals[category] > prev_months_avg * 1.5:  # 50% increase
-            warnings.append({
-                'type': 'spending_increase',
-                'category': category,
-                'message': f'Unusual increase in {category} spending this month',
-                'severity': 'medium'
-            })
+    # Check for unusual spending compared with the category's monthly history
+    for anomaly in get_spending_anomalies(category_totals, aggregates['category_stats']):
+        warnings.append({
+            'type': 'spending_increase',
+            'category': anomaly['category'],
+            'message': f"Unusual increase in {anomaly['category']} spending this month: "
+                       f"${anomaly['amount']:.2f} vs a typical ${anomaly['mean']:.2f}",
+            'severity': 'high' if anomaly['z_score'] >= 3 else 'medium',
+            'z_score': round(anomaly['z_score'], 2)
+        })
     
     return warnings
 
-def get_savings_advice(user_id):
+def get_savings_advice(user_id, aggregates=None):
     """Generate personalized savings advice based on user's financial data"""
     advice = []
+    if aggregates is None:
+        aggregates = get_dashboard_aggregates(user_id)
     
     # Get user's goals and current savings
-    goals = Goal.query.filter_by(user_id=user_id).all()
+    goals = aggregates['goals']
     total_savings = sum(goal.current_amount for goal in goals)
     total_goals = sum(goal.target_amount for goal in goals)
     
     # Get monthly income and expenses
-    current_month = datetime.now().replace(day=1)
-    monthly_income = db.session.query(db.func.sum(Transaction.amount)).filter(
-        Transaction.user_id == user_id,
-        Transaction.type == 'income',
-        Transaction.date >= current_month
-    ).scalar() or 0
-    
-    monthly_expenses = db.session.query(db.func.sum(Transaction.amount)).filter(
-        Transaction.user_id == user_id,
-        Transaction.type == 'expense',
-        Transaction.date >= current_month
-    ).scalar() or 0
+    current_totals = aggregates['monthly'][aggregates['month_keys'][0]]
+    monthly_income = current_totals['income']
+    monthly_expenses = current_totals['expense']
     
     # Calculate savings rate
     if monthly_income > 0:
@@ -198,27 +1326,19 @@ def get_savings_advice(user_id):
     
     return advice
 
-def get_budget_tips(user_id):
+def get_budget_tips(user_id, aggregates=None):
     """Generate personalized budget tips based on spending patterns"""
     tips = []
+    if aggregates is None:
+        aggregates = get_dashboard_aggregates(user_id)
     
-    # Get spending patterns for the last 3 months
-    three_months_ago = datetime.now().replace(day=1) - timedelta(days=90)
-    recent_transactions = Transaction.query.filter_by(
-        user_id=user_id,
-        type='expense'
-    ).filter(Transaction.date >= three_months_ago).all()
-    
-    # Analyze category spending
-    category_totals = {}
-    for transaction in recent_transactions:
-        category_totals[transaction.category] = category_totals.get(transaction.category, 0) + transaction.amount
-    
-    # Identify highest spending categories
-    sorted_categories = sorted(category_totals.items(), key=lambda x: x[1], reverse=True)
+    # Analyze category spending for the current and previous 3 months
+    matrix = aggregates['matrix']
+    recent_totals = matrix.category_expense[:, -4:].sum(axis=1)
     
     # Generate tips based on spending patterns
-    for category, amount in sorted_categories[:3]:  # Top 3 spending categories
+    for i in analytics.top_indices(recent_totals, 3):  # Top 3 spending categories
+        category = matrix.categories[i]
         if category in ['Dining', 'Entertainment', 'Shopping']:
             tips.append({
                 'category': category,
@@ -232,141 +1352,31 @@ def get_budget_tips(user_id):
                 'suggestion': 'Compare service providers or consider carpooling'
             })
     
-    # Add general budget tips
-    tips.append({
-        'category': 'General',
-        'message': 'Review your subscriptions and recurring payments',
-        'suggestion': 'Cancel unused subscriptions to save money'
-    })
+    # Point at the user's actual recurring payments when we know them
+    recurring = [rule for rule in aggregates['recurring_rules'] if rule.type == 'expense']
+    if recurring:
+        monthly_cost = sum(rule.amount * 30.44 / rule.interval_days for rule in recurring)
+        largest = max(recurring, key=lambda rule: rule.amount * 30.44 / rule.interval_days)
+        tips.append({
+            'category': 'General',
+            'message': f'You have {len(recurring)} recurring payment{"s" if len(recurring) != 1 else ""} '
+                       f'costing about ${monthly_cost:.2f} a month',
+            'suggestion': f'Start with the largest, {largest.category} (${largest.amount:.2f} {largest.frequency}), '
+                          f'and cancel anything you no longer use'
+        })
+    else:
+        tips.append({
+            'category': 'General',
+            'message': 'Review your subscriptions and recurring payments',
+            'suggestion': 'Cancel unused subscriptions to save money'
+        })
     
     return tips
 
-@app.route('/dashboard')
-def dashboard():
-    if 'user_id' not in session:
-        return redirect(url_for('login'))
-    
-    user = User.query.get(session['user_id'])
-    transactions = Transaction.query.filter_by(user_id=session['user_id']).order_by(Transaction.date.desc()).limit(5).all()
-    
-    # Calculate totals and insights
-    all_transactions = Transaction.query.filter_by(user_id=session['user_id']).all()
-    total_income = sum(t.amount for t in all_transactions if t.type == 'income')
-    total_expenses = sum(t.amount for t in all_transactions if t.type == 'expense')
-    balance = total_income - total_expenses
-    
-    # Get biggest expense and highest income
-    biggest_expense = Transaction.query.filter_by(user_id=session['user_id'], type='expense').order_by(Transaction.amount.desc()).first()
-    highest_income = Transaction.query.filter_by(user_id=session['user_id'], type='income').order_by(Transaction.amount.desc()).first()
-    
-    # Get spending by category for the current month
-    current_month = datetime.now().replace(day=1)
-    expense_categories = {}
-    monthly_transactions = Transaction.query.filter_by(user_id=session['user_id']).filter(
-        Transaction.date >= current_month
-    ).all()
-    
-    for t in monthly_transactions:
-        if t.type == 'expense':
-            expense_categories[t.category] = expense_categories.get(t.category, 0) + t.amount
-    
-    # Spending Analysis
-    spending_analysis = {
-        'monthly_trend': {},
-        'category_trends': {},
-        'spending_patterns': []
-    }
-    
-    # Calculate monthly spending trends for the last 6 months
-    for i in range(6):
-        month = (current_month - timedelta(days=30*i)).replace(day=1)
-        month_transactions = Transaction.query.filter_by(user_id=session['user_id']).filter(
-            Transaction.date >= month,
-            Transaction.date < (month + timedelta(days=32)).replace(day=1)
-        ).all()
-        
-        month_expenses = sum(t.amount for t in month_transactions if t.type == 'expense')
-        month_income = sum(t.amount for t in month_transactions if t.type == 'income')
-        
-        spending_analysis['monthly_trend'][month.strftime('%Y-%m')] = {
-            'expenses': month_expenses,
-            'income': month_income,
-            'savings_rate': ((month_income - month_expenses) / month_income * 100) if month_income > 0 else 0
-        }
-    
-    # Calculate category trends
-    for category in expense_categories.keys():
-        category_trend = []
-        for i in range(6):
-            month = (current_month - timedelta(days=30*i)).replace(day=1)
-            month_amount = sum(t.amount for t in monthly_transactions 
-                             if t.category == category and t.date >= month and t.date < (month + timedelta(days=32)).replace(day=1))
-            category_trend.append(month_amount)
-        spending_analysis['category_trends'][category] = category_trend
-    
-    # Identify spending patterns
-    if expense_categories:
-        avg_monthly_spending = sum(expense_categories.values()) / len(expense_categories)
-        for category, amount in expense_categories.items():
-            if amount > avg_monthly_spending * 1.5:
-                spending_analysis['spending_patterns'].append({
-                    'category': category,
-                    'amount': amount,
-                    'message': f'High spending in {category} category'
-                })
-    
-    # Cashflow Forecasting
-    cashflow_forecast = {
-        'next_month': {
-            'projected_income': total_income,  # Assuming stable income
-            'projected_expenses': total_expenses,  # Assuming stable expenses
-            'projected_balance': balance
-        },
-        'three_months': {
-            'projected_income': total_income * 3,
-            'projected_expenses': total_expenses * 3,
-            'projected_balance': balance * 3
-        },
-        'six_months': {
-            'projected_income': total_income * 6,
-            'projected_expenses': total_expenses * 6,
-            'projected_balance': balance * 6
-        }
-    }
-    
-    # Add trend-based adjustments to forecasts
-    if len(spending_analysis['monthly_trend']) >= 2:
-        recent_months = list(spending_analysis['monthly_trend'].values())[:2]
-        expense_trend = recent_months[0]['expenses'] - recent_months[1]['expenses']
-        income_trend = recent_months[0]['income'] - recent_months[1]['income']
-        
-        # Adjust forecasts based on trends
-        for period in ['next_month', 'three_months', 'six_months']:
-            months = 1 if period == 'next_month' else (3 if period == 'three_months' else 6)
-            cashflow_forecast[period]['projected_expenses'] += expense_trend * months
-            cashflow_forecast[period]['projected_income'] += income_trend * months
-            cashflow_forecast[period]['projected_balance'] = (
-                cashflow_forecast[period]['projected_income'] - 
-                cashflow_forecast[period]['projected_expenses']
-            )
-    
-    # Check budget status
-    budget_alert = None
-    if total_expenses > total_income:
-        budget_alert = "Warning: You're over budget!"
-    
-    # Add budget status
-    budget_status = {
-        'type': 'warning' if total_expenses > total_income else 'success',
-        'icon': 'exclamation-triangle' if total_expenses > total_income else 'check-circle',
-        'title': 'Budget Alert' if total_expenses > total_income else 'Budget Status',
-        'message': 'You are currently over budget!' if total_expenses > total_income else 'You are within budget!'
-    }
-    
-    # Get savings goals
-    savings_goals = Goal.query.filter_by(user_id=session['user_id']).all()
-    
-    # Generate AI insights
+def get_ai_insights(aggregates):
+    """Short headline insights shown alongside the dashboard charts"""
+    balance = aggregates['totals']['income'] - aggregates['totals']['expense']
+    expense_categories = aggregates['current_categories']
     ai_insights = [
         {
             'icon': 'piggy-bank',
@@ -385,65 +1395,412 @@ def dashboard():
             'message': f'Your spending in {max(expense_categories, key=expense_categories.get)} '
                       f'category is higher than usual. Consider setting a budget.'
         })
+    return ai_insights
+
+def get_cached_insights(user_id, aggregates=None):
+    """Return spending warnings, savings advice, budget tips and headline insights from the per-user cache"""
+    def compute():
+        data = aggregates if aggregates is not None else get_dashboard_aggregates(user_id)
+        return {
+            'spending_warnings': get_spending_warnings(user_id, data),
+            'savings_advice': get_savings_advice(user_id, data),
+            'budget_tips': get_budget_tips(user_id, data),
+            'ai_insights': get_ai_insights(data)
+        }
+    return insight_cache.get_or_compute(user_id, 'dashboard', compute)
+
+def load_forecast_rows(user_id, since=None, after_id=None):
+    """(id, date, amount, category, type) rows for the forecasting engine, oldest first"""
+    query = db.session.query(
+        Transaction.id, Transaction.date, Transaction.amount, Transaction.category, Transaction.type
+    ).filter(Transaction.user_id == user_id)
+    if since is not None:
+        query = query.filter(Transaction.date >= since)
+    if after_id is not None:
+        query = query.filter(Transaction.id > after_id)
+    return query.order_by(Transaction.date, Transaction.id).all()
+
+def get_forecast_model(user_id):
+    """Return the user's fitted forecast model, refitting only when it cannot be updated in place.
+
+    The cached model records the highest transaction id and the row count it
+    has seen. New rows are folded in incrementally. A new month, a lower
+    count (deleted rows) or an expired model triggers a full refit.
+    """
+    now = datetime.now()
+    last_id, count = db.session.query(
+        db.func.max(Transaction.id), db.func.count(Transaction.id)
+    ).filter(Transaction.user_id == user_id).one()
+    last_id = last_id or 0
+
+    model = insight_cache.get_model(user_id, 'forecast')
+    if (model and model['version'] == forecasting.MODEL_VERSION
+            and model['fitted_month'] == forecasting.month_key(now) and last_id >= model['last_id']):
+        if last_id == model['last_id'] and count == model['count']:
+            return model
+        new_rows = load_forecast_rows(user_id, after_id=model['last_id'])
+        if model['count'] + len(new_rows) == count:
+            # The in-process backend hands out the cached dict itself; folding the rows into it
+            # would let a concurrent request fold the same rows in a second time
+            model = copy.deepcopy(model)
+            forecasting.update(model, new_rows)
+            model.update(last_id=last_id, count=count)
+            insight_cache.set_model(user_id, 'forecast', model, app.config['FORECAST_MODEL_TTL'])
+            return model
+
+    history_start = add_months(month_start(now), -app.config['FORECAST_HISTORY_MONTHS'])
+    totals = get_type_totals(user_id)
+    rules = RecurringRule.query.filter_by(user_id=user_id, status='active').all()
+    model = forecasting.fit(
+        load_forecast_rows(user_id, since=history_start), now, history_start, totals['income'] - totals['expense'],
+        rules=[rule.as_stream() for rule in rules]
+    )
+    model.update(last_id=last_id, count=count)
+    insight_cache.set_model(user_id, 'forecast', model, app.config['FORECAST_MODEL_TTL'])
+    return model
+
+def get_cashflow_forecast(user_id, horizon=None):
+    return forecasting.project(
+        get_forecast_model(user_id), datetime.now(),
+        horizon or app.config['FORECAST_HORIZON_MONTHS'], app.config['FORECAST_CONFIDENCE_Z']
+    )
+
+def serialize_transaction(transaction):
+    return {
+        'id': transaction.id,
+        'date': transaction.date.strftime('%Y-%m-%d'),
+        'category': transaction.category,
+        'type': transaction.type,
+        'amount': float(transaction.amount)
+    }
+
+def dashboard_summary_statements(user_id):
+    """The summary widget's independent queries: type totals, biggest expense, highest income, recent rows"""
+    transactions = Transaction.__table__
+    return (
+        type_totals_statement(user_id),
+        db.select(transactions).where(
+            transactions.c.user_id == user_id, transactions.c.type == 'expense'
+        ).order_by(transactions.c.amount.desc()).limit(1),
+        db.select(transactions).where(
+            transactions.c.user_id == user_id, transactions.c.type == 'income'
+        ).order_by(transactions.c.amount.desc()).limit(1),
+        db.select(transactions).where(transactions.c.user_id == user_id).order_by(transactions.c.date.desc()).limit(5)
+    )
+
+def dashboard_summary_widget(user_id):
+    return dashboard_summary_payload(*(db.session.execute(statement).all()
+                                       for statement in dashboard_summary_statements(user_id)))
+
+def dashboard_summary_payload(type_rows, expense_rows, income_rows, recent):
+    totals = type_totals_from_rows(type_rows)
+    total_income = totals['income']
+    total_expenses = totals['expense']
+    biggest_expense = expense_rows[0] if expense_rows else None
+    highest_income = income_rows[0] if income_rows else None
+    
+    return {
+        'income': total_income,
+        'expenses': total_expenses,
+        'savings': total_income - total_expenses,
+        'biggest_expense': serialize_transaction(biggest_expense) if biggest_expense else None,
+        'highest_income': serialize_transaction(highest_income) if highest_income else None,
+        'budget_status': {
+            'type': 'warning' if total_expenses > total_income else 'success',
+            'icon': 'exclamation-triangle' if total_expenses > total_income else 'check-circle',
+            'title': 'Budget Alert' if total_expenses > total_income else 'Budget Status',
+            'message': 'You are currently over budget!' if total_expenses > total_income else 'You are within budget!'
+        },
+        'recent_transactions': [serialize_transaction(t) for t in recent]
+    }
+
+def dashboard_daily_widget(user_id):
+    return {'daily': get_daily_series(user_id)}
+
+def dashboard_monthly_trend_widget(user_id):
+    matrix = get_monthly_aggregates(user_id)['matrix']
+    
+    # Monthly spending trends for the last 6 months
+    rates = analytics.savings_rates(matrix.income, matrix.expense)
+    average_expenses = analytics.rolling_mean(matrix.expense, 3)
+    monthly_trend = {
+        key: {
+            'expenses': float(matrix.expense[i]),
+            'income': float(matrix.income[i]),
+            'savings_rate': float(rates[i]),
+            'expenses_3m_avg': float(average_expenses[i])
+        } for i, key in enumerate(matrix.month_keys)
+    }
     
-    # Prepare daily data for the trend chart
-    daily_data = {}
-    for transaction in all_transactions:
-        day_key = transaction.date.strftime('%Y-%m-%d')
-        if day_key not in daily_data:
-            daily_data[day_key] = {'income': 0, 'expense': 0}
-        daily_data[day_key][transaction.type] += transaction.amount
+    # Identify spending patterns: categories this month well above the average category
+    spending_patterns = []
+    current = matrix.category_expense[:, -1]
+    active = current > 0
+    if active.any():
+        for i in np.flatnonzero(current > current[active].mean() * 1.5):
+            spending_patterns.append({
+                'category': matrix.categories[i],
+                'amount': float(current[i]),
+                'message': f'High spending in {matrix.categories[i]} category'
+            })
     
-    # Sort daily data by date
-    daily_data = dict(sorted(daily_data.items()))
+    # Cashflow Forecasting over the coming months, from the per-user forecast model
+    cashflow_forecast = {}
+    upcoming = get_cashflow_forecast(user_id, horizon=6)['months'][1:]
+    for period, months in [('next_month', 1), ('three_months', 3), ('six_months', 6)]:
+        income = sum(month['income'] for month in upcoming[:months])
+        expenses = sum(month['expenses'] for month in upcoming[:months])
+        cashflow_forecast[period] = {
+            'projected_income': income,
+            'projected_expenses': expenses,
+            'projected_balance': income - expenses
+        }
     
-    # Get current month's budgets
-    budgets = Budget.query.filter_by(
-        user_id=session['user_id'],
-        month=current_month
-    ).all()
+    return {
+        'months': matrix.month_keys,
+        'monthly_trend': monthly_trend,
+        'spending_patterns': spending_patterns,
+        'cashflow_forecast': cashflow_forecast
+    }
+
+def dashboard_category_trends_widget(user_id):
+    aggregates = get_monthly_aggregates(user_id)
+    matrix = aggregates['matrix']
+    return {
+        'months': matrix.month_keys,
+        'category_trends': {
+            category: row.tolist()
+            for category, row in zip(matrix.categories, matrix.category_expense) if row[-1]
+        },
+        'expense_categories': aggregates['current_categories']
+    }
+
+def dashboard_budgets_widget(user_id):
+    budgets = get_current_budgets(user_id)
+    return {
+        'budgets': [
+            {
+                'id': b.id,
+                'category': b.category,
+                'limit': float(b.limit),
+                'carried_over': float(b.carried_over or 0),
+                'spent': float(b.spent or 0),
+                'month': b.month.strftime('%Y-%m'),
+                'period_end': b.period_end.strftime('%Y-%m-%d')
+            } for b in budgets
+        ]
+    }
+
+def dashboard_goals_widget(user_id):
+    return {
+        'goals': [
+            {
+                'id': g.id,
+                'name': g.name,
+                'target_amount': float(g.target_amount),
+                'current_amount': float(g.current_amount or 0),
+                'target_date': g.target_date.strftime('%Y-%m-%d')
+            } for g in Goal.query.filter_by(user_id=user_id).all()
+        ]
+    }
+
+def dashboard_debts_widget(user_id):
+    return {
+        'debts': [
+            {
+                'id': d.id,
+                'name': d.name,
+                'type': d.type,
+                'balance': float(d.balance),
+                'original_amount': float(d.original_amount),
+                'paid_amount': float(d.paid_amount),
+                'interest_rate': float(d.interest_rate),
+                'minimum_payment': float(d.minimum_payment),
+                'next_payment_date': d.next_payment_date.strftime('%Y-%m-%d')
+            } for d in Debt.query.filter_by(user_id=user_id).all()
+        ]
+    }
+
+def dashboard_insights_widget(user_id):
+    return get_cached_insights(user_id)
+
+def dashboard_forecast_widget(user_id):
+    return get_cashflow_forecast(user_id)
+
+DASHBOARD_WIDGETS = {
+    'summary': dashboard_summary_widget,
+    'daily': dashboard_daily_widget,
+    'monthly_trend': dashboard_monthly_trend_widget,
+    'category_trends': dashboard_category_trends_widget,
+    'budgets': dashboard_budgets_widget,
+    'goals': dashboard_goals_widget,
+    'debts': dashboard_debts_widget,
+    'insights': dashboard_insights_widget,
+    'forecast': dashboard_forecast_widget
+}
+
+def widget_response(payload):
+    """JSON response with a content-hash ETag so unchanged widgets revalidate as 304s"""
+    body = json.dumps(payload, sort_keys=True)
+    response = app.response_class(body, mimetype='application/json')
+    response.set_etag(hashlib.sha1(body.encode()).hexdigest())
+    response.cache_control.private = True
+    response.cache_control.max_age = app.config['DASHBOARD_WIDGET_MAX_AGE']
+    response.cache_control.must_revalidate = True
+    return response.make_conditional(request)
+
+@app.route('/dashboard')
+@read_replica
+def dashboard():
+    if 'user_id' not in session:
+        return redirect(url_for('login'))
     
-    # Calculate spent amounts for each budget
-    for budget in budgets:
-        spent = Transaction.query.filter_by(
-            user_id=session['user_id'],
-            category=budget.category,
-            type='expense'
-        ).filter(
-            Transaction.date >= budget.month,
-            Transaction.date < budget.month.replace(month=budget.month.month + 1)
-        ).with_entities(db.func.sum(Transaction.amount)).scalar() or 0
-        
-        budget.spent = spent
+    # Only the page shell is rendered here; the widgets load from the JSON API in parallel
+    user = User.query.get(session['user_id'])
+    return render_template('dashboard.html', user=user)
 
-    # Get user's debts
-    debts = Debt.query.filter_by(user_id=session['user_id']).all()
+@app.route('/api/v1/dashboard/<widget>')
+@read_replica
+def dashboard_widget(widget):
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    if widget not in DASHBOARD_WIDGETS:
+        return jsonify({'error': f'Unknown widget {widget}'}), 404
     
-    # Get new insights
-    spending_warnings = get_spending_warnings(session['user_id'])
-    savings_advice = get_savings_advice(session['user_id'])
-    budget_tips = get_budget_tips(session['user_id'])
+    return widget_response(DASHBOARD_WIDGETS[widget](session['user_id']))
+
+# Yearly analytics: closed years are read from per-user .npy files written
+# from the monthly rollup; only the current year is queried live.
+def user_analytics_dir(user_id):
+    return os.path.join(app.config['ANALYTICS_CACHE_DIR'], str(user_id))
+
+def year_columns_from_rollup(user_id, year):
+    month_keys = [f'{year}-{month:02d}' for month in range(1, 13)]
+    rows = [(year_month, category, type_, total)
+            for (year_month, category, type_), total in get_monthly_rollups(user_id, month_keys).items()]
+    totals = analytics.monthly_totals(rows, month_keys)
+    return analytics.YearColumns(year, totals.categories, totals.income, totals.category_expense)
+
+def get_first_year(user_id):
+    """First year with data, remembered in the user's analytics directory after the first lookup"""
+    path = os.path.join(user_analytics_dir(user_id), 'index.json')
+    try:
+        with open(path) as f:
+            return json.load(f)['first_year']
+    except (OSError, ValueError, KeyError):
+        pass
+    first_month = db.session.query(db.func.min(MonthlyCategoryTotal.year_month)).filter(
+        MonthlyCategoryTotal.user_id == user_id
+    ).scalar()
+    first_year = int(first_month[:4]) if first_month else datetime.now().year
+    os.makedirs(user_analytics_dir(user_id), exist_ok=True)
+    with open(path + '.tmp', 'w') as f:
+        json.dump({'first_year': first_year}, f)
+    os.replace(path + '.tmp', path)
+    return first_year
+
+def export_year_columns(user_id, now=None, rewrite=False):
+    """Write the .npy file of every closed year that is missing (or all of them); returns how many were written"""
+    now = now or datetime.now()
+    written = 0
+    for year in range(get_first_year(user_id), now.year):
+        if rewrite or analytics.load_year(user_analytics_dir(user_id), year) is None:
+            analytics.save_year(user_analytics_dir(user_id), year_columns_from_rollup(user_id, year))
+            written += 1
+    return written
+
+def get_yearly_columns(user_id, now=None):
+    """YearColumns from the first year with data through the current one"""
+    now = now or datetime.now()
+    years = []
+    for year in range(get_first_year(user_id), now.year):
+        columns = analytics.load_year(user_analytics_dir(user_id), year)
+        if columns is None:
+            # Not exported yet, or dropped by a backdated write
+            columns = year_columns_from_rollup(user_id, year)
+            analytics.save_year(user_analytics_dir(user_id), columns)
+        years.append(columns)
+    years.append(year_columns_from_rollup(user_id, now.year))
+    return years
+
+def invalidate_year_columns(user_id, first_date, last_date):
+    """Delete the files of closed years that a backdated write falls into, once the write commits.
+
+    Deleting them any earlier would let a concurrent request rebuild a file
+    from the rollup as it was before the commit.
+    """
+    current_year = datetime.now().year
+    if first_date.year >= current_year or not os.path.isdir(user_analytics_dir(user_id)):
+        return
+    names = [f'{year}{suffix}' for year in range(first_date.year, min(last_date.year, current_year - 1) + 1)
+             for suffix in ('.npy', '.json')]
+    # A write before the first known year moves the start of the history
+    if first_date.year < get_first_year(user_id):
+        names.append('index.json')
+    db.session.info.setdefault('stale_year_files', set()).update(
+        os.path.join(user_analytics_dir(user_id), name) for name in names
+    )
+
+@event.listens_for(RoutingSession, 'after_commit')
+def remove_stale_year_files(session):
+    for path in session.info.pop('stale_year_files', ()):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+@event.listens_for(RoutingSession, 'after_transaction_end')
+def forget_stale_year_files(session, transaction):
+    # A rolled-back write leaves the files valid
+    if transaction.parent is None:
+        session.info.pop('stale_year_files', None)
+
+def _rounded(values):
+    """Floats rounded to cents for JSON, with None where a value is undefined"""
+    return [None if np.isnan(value) else round(float(value), 2) for value in values]
+
+@app.route('/api/v1/analytics/yearly')
+def yearly_analytics():
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
     
-    return render_template('dashboard.html',
-                         user=user,
-                         transactions=transactions,
-                         income=total_income,
-                         expenses=total_expenses,
-                         savings=balance,
-                         biggest_expense=biggest_expense,
-                         highest_income=highest_income,
-                         expense_categories=expense_categories,
-                         budget_status=budget_status,
-                         savings_goals=savings_goals,
-                         ai_insights=ai_insights,
-                         daily_data=daily_data,
-                         budgets=budgets,
-                         debts=debts,
-                         spending_analysis=spending_analysis,
-                         cashflow_forecast=cashflow_forecast,
-                         spending_warnings=spending_warnings,
-                         savings_advice=savings_advice,
-                         budget_tips=budget_tips)
+    years = get_yearly_columns(session['user_id'])
+    income, expense, _, _ = analytics.yearly_totals(years)
+    return widget_response({
+        'years': [columns.year for columns in years],
+        'income': _rounded(income),
+        'expenses': _rounded(expense),
+        'savings': _rounded(income - expense),
+        'savings_rate': _rounded(analytics.savings_rates(income, expense)),
+        'income_change_pct': _rounded(analytics.year_over_year(income) * 100),
+        'expenses_change_pct': _rounded(analytics.year_over_year(expense) * 100)
+    })
+
+@app.route('/api/v1/analytics/yearly/categories')
+def yearly_category_analytics():
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    
+    years = get_yearly_columns(session['user_id'])
+    _, _, categories, category_expense = analytics.yearly_totals(years)
+    change = analytics.year_over_year(category_expense) * 100
+    # Largest spend in the latest year first
+    order = analytics.top_indices(category_expense[:, -1], len(categories))
+    return widget_response({
+        'years': [columns.year for columns in years],
+        'categories': [
+            {
+                'name': categories[i],
+                'totals': _rounded(category_expense[i]),
+                'change_pct': _rounded(change[i])
+            } for i in order
+        ]
+    })
+
+@app.route('/cache_stats')
+@login_required
+def cache_stats():
+    return jsonify(insight_cache.stats())
 
 # Add a redirect from root to dashboard
 @app.route('/')
@@ -508,14 +1865,111 @@ def register():
     
     return render_template('register.html')
 
+def encode_cursor(transaction):
+    """Encode a transaction's (date, id) position as an opaque page cursor"""
+    raw = f'{transaction.date.isoformat()}|{transaction.id}'
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor):
+    """Decode a page cursor back into a (date, id) pair, raising ValueError if malformed"""
+    try:
+        date, transaction_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(date), int(transaction_id)
+    except (TypeError, UnicodeDecodeError, binascii.Error) as e:
+        raise ValueError('Invalid cursor') from e
+
+def parse_transaction_filters(args):
+    """Read category/type/date range filters from request args, raising ValueError on bad dates"""
+    filters = {
+        'category': args.get('category', '').strip(),
+        'type': args.get('type', '').strip(),
+        'start': args.get('start', '').strip(),
+        'end': args.get('end', '').strip()
+    }
+    for key in ('start', 'end'):
+        if filters[key]:
+            datetime.strptime(filters[key], '%Y-%m-%d')
+    return filters
+
+def apply_transaction_filters(query, filters):
+    """Apply parsed transaction filters to a Query or select()"""
+    if filters.get('category'):
+        query = query.filter(Transaction.category == filters['category'])
+    if filters.get('type'):
+        query = query.filter(Transaction.type == filters['type'])
+    if filters.get('start'):
+        query = query.filter(Transaction.date >= datetime.strptime(filters['start'], '%Y-%m-%d'))
+    if filters.get('end'):
+        query = query.filter(Transaction.date < datetime.strptime(filters['end'], '%Y-%m-%d') + timedelta(days=1))
+    return query
+
+def get_transactions_page(user_id, filters, cursor=None, limit=None):
+    """Return one page of transactions, newest first, and the cursor for the next page.
+
+    Pages are keyed on (date, id) so each request is an index range scan on
+    (user_id, date) no matter how deep into the history the user scrolls.
+    """
+    limit = limit or app.config['TRANSACTIONS_PAGE_SIZE']
+    query = apply_transaction_filters(Transaction.query.filter(Transaction.user_id == user_id), filters)
+    if cursor:
+        cursor_date, cursor_id = decode_cursor(cursor)
+        query = query.filter(db.or_(
+            Transaction.date < cursor_date,
+            db.and_(Transaction.date == cursor_date, Transaction.id < cursor_id)
+        ))
+
+    rows = query.order_by(Transaction.date.desc(), Transaction.id.desc()).limit(limit + 1).all()
+    page = rows[:limit]
+    next_cursor = encode_cursor(page[-1]) if len(rows) > limit else None
+    return page, next_cursor
+
 @app.route('/transactions')
 def transactions():
     if 'user_id' not in session:
         return redirect(url_for('login'))
     
-    transactions = Transaction.query.filter_by(user_id=session['user_id']).order_by(Transaction.date.desc()).all()
+    try:
+        filters = parse_transaction_filters(request.args)
+    except ValueError:
+        flash('Invalid date filter, showing all transactions.', 'warning')
+        filters = parse_transaction_filters({})
+    
+    transactions, next_cursor = get_transactions_page(session['user_id'], filters)
     goals = Goal.query.filter_by(user_id=session['user_id']).all()
-    return render_template('transactions.html', transactions=transactions, goals=goals)
+    categories = [
+        row.category for row in db.session.query(MonthlyCategoryTotal.category).filter(
+            MonthlyCategoryTotal.user_id == session['user_id']
+        ).distinct().order_by(MonthlyCategoryTotal.category)
+    ]
+    recurring_rules = RecurringRule.query.filter(
+        RecurringRule.user_id == session['user_id'],
+        RecurringRule.status != 'dismissed'
+    ).order_by(RecurringRule.status, RecurringRule.next_due).all()
+    return render_template('transactions.html',
+                         transactions=transactions,
+                         goals=goals,
+                         filters=filters,
+                         categories=categories,
+                         next_cursor=next_cursor,
+                         recurring_rules=recurring_rules)
+
+@app.route('/api/transactions')
+def transactions_page():
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    
+    try:
+        filters = parse_transaction_filters(request.args)
+        transactions, next_cursor = get_transactions_page(
+            session['user_id'], filters, cursor=request.args.get('cursor')
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({
+        'transactions': [serialize_transaction(t) for t in transactions],
+        'next_cursor': next_cursor
+    })
 
 @app.route('/add_transaction', methods=['POST'])
 @login_required
@@ -524,6 +1978,7 @@ def add_transaction():
     category = request.form.get('category')
     type = request.form.get('type')
     goal_id = request.form.get('goal_id')
+    goal = None
     
     # Create new transaction
     transaction = Transaction(
@@ -539,24 +1994,404 @@ def add_transaction():
         goal = Goal.query.get(goal_id)
         if goal and goal.user_id == session['user_id']:
             goal.current_amount += amount
-            transaction.note = f"Contribution to goal: {goal.name}"
+            transaction.goal_id = goal.id
+        else:
+            goal = None
+    
+    # Update the rollup and, for expenses, the month's budget
+    db.session.add(transaction)
+    apply_transaction_totals(transaction)
+    db.session.commit()
+    insight_cache.invalidate(session['user_id'])
+    
+    flash('Transaction added successfully!', 'success')
+    user = db.session.get(User, session['user_id'])
+    for alert in evaluate_alerts(user, category if type == 'expense' else None, transaction.date, goal):
+        flash(alert.message, 'warning' if alert.kind == 'budget' else 'success')
+    return redirect(url_for('transactions'))
+
+@app.route('/update_transaction/<int:transaction_id>', methods=['POST'])
+@login_required
+def update_transaction(transaction_id):
+    transaction = Transaction.query.get_or_404(transaction_id)
+    if transaction.user_id != session['user_id']:
+        abort(403)
+    
+    try:
+        amount = float(request.form.get('amount', transaction.amount))
+        date = datetime.strptime(request.form['date'], '%Y-%m-%d') if request.form.get('date') else transaction.date
+    except ValueError:
+        flash('Please enter a valid amount and date.', 'danger')
+        return redirect(url_for('transactions'))
+    type = request.form.get('type', transaction.type)
+    if amount <= 0 or type not in ('income', 'expense'):
+        flash('Please enter a valid amount and type.', 'danger')
+        return redirect(url_for('transactions'))
+    
+    # Move the totals from the old values to the new ones in the same DB transaction
+    apply_transaction_totals(transaction, -1)
+    apply_goal_contribution(transaction, -1)
+    transaction.amount = amount
+    transaction.category = request.form.get('category') or transaction.category
+    transaction.type = type
+    # Keep the time of day when only the date changes
+    if date.date() != transaction.date.date():
+        transaction.date = datetime.combine(date.date(), transaction.date.time())
+    apply_transaction_totals(transaction)
+    apply_goal_contribution(transaction)
+    db.session.commit()
+    insight_cache.invalidate(session['user_id'])
+    # Edited rows cannot be folded into the forecast incrementally
+    insight_cache.discard_model(session['user_id'], 'forecast')
+    
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify(serialize_transaction(transaction))
+    flash('Transaction updated successfully!', 'success')
+    if transaction.type == 'expense':
+        user = db.session.get(User, session['user_id'])
+        for alert in evaluate_alerts(user, transaction.category, transaction.date):
+            flash(alert.message, 'warning')
+    return redirect(url_for('transactions'))
+
+@app.route('/delete_transaction/<int:transaction_id>', methods=['POST'])
+@login_required
+def delete_transaction(transaction_id):
+    transaction = Transaction.query.get_or_404(transaction_id)
+    if transaction.user_id != session['user_id']:
+        abort(403)
+    
+    apply_transaction_totals(transaction, -1)
+    apply_goal_contribution(transaction, -1)
+    db.session.delete(transaction)
+    db.session.commit()
+    insight_cache.invalidate(session['user_id'])
+    insight_cache.discard_model(session['user_id'], 'forecast')
+    
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify({'deleted': transaction_id})
+    flash('Transaction deleted successfully!', 'success')
+    return redirect(url_for('transactions'))
+
+def apply_goal_contribution(transaction, sign=1):
+    """Add (sign=1) or take back (sign=-1) a transaction's contribution to its goal; only income counts"""
+    if transaction.goal_id is None or transaction.type != 'income':
+        return
+    db.session.execute(Goal.__table__.update().where(Goal.id == transaction.goal_id).values(
+        current_amount=db.func.coalesce(Goal.current_amount, 0) + sign * transaction.amount
+    ))
+
+def apply_batch_totals(user_id, rows):
+    """Update the rollup and Budget.spent from a batch of inserted transaction rows, one statement per group"""
+    rollup_totals = {}
+    budget_totals = {}
+    for row in rows:
+        rollup_key = (row['date'].strftime('%Y-%m'), row['category'], row['type'])
+        total, count = rollup_totals.get(rollup_key, (0.0, 0))
+        rollup_totals[rollup_key] = (total + row['amount'], count + 1)
+        if row['type'] == 'expense':
+            budget_key = (month_start(row['date']), row['category'])
+            budget_totals[budget_key] = budget_totals.get(budget_key, 0.0) + row['amount']
+
+    for (year_month, category, type_), (total, count) in rollup_totals.items():
+        apply_rollup_delta(user_id, datetime.strptime(year_month, '%Y-%m'), category, type_, total, count)
+    for (month, category), total in budget_totals.items():
+        apply_budget_delta(user_id, month, category, total)
+    if rows:
+        first_date, last_date = min(row['date'] for row in rows), max(row['date'] for row in rows)
+        invalidate_report_snapshots(user_id, first_date, last_date)
+        invalidate_year_columns(user_id, first_date, last_date)
+
+IMPORT_DATE_FORMATS = ['%Y-%m-%d', '%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S', '%m/%d/%Y']
+OFX_TAG_RE = re.compile(r'<(/?\w+)>([^<\r\n]*)')
+
+def iter_csv_transactions(stream):
+    """Yield raw rows from a CSV export with date, amount, category and optional type/goal columns"""
+    reader = csv.DictReader(stream)
+    for row in reader:
+        yield {(key or '').strip().lower(): (value or '').strip() for key, value in row.items()}
+
+def iter_ofx_transactions(stream):
+    """Yield raw rows from the <STMTTRN> blocks of an OFX/QFX statement, one line at a time"""
+    current = None
+    for line in stream:
+        for tag, value in OFX_TAG_RE.findall(line):
+            tag = tag.upper()
+            if tag == 'STMTTRN':
+                current = {}
+            elif tag == '/STMTTRN' and current is not None:
+                posted = current.get('DTPOSTED', '')
+                yield {
+                    'date': f'{posted[0:4]}-{posted[4:6]}-{posted[6:8]}' if len(posted) >= 8 else posted,
+                    'amount': current.get('TRNAMT', ''),
+                    'category': current.get('NAME') or current.get('MEMO') or 'Imported',
+                    'type': ''
+                }
+                current = None
+            elif current is not None:
+                current[tag] = value.strip()
+
+def parse_import_row(raw, goals_by_key):
+    """Validate one raw import row and return Transaction column values, raising ValueError if invalid"""
+    for fmt in IMPORT_DATE_FORMATS:
+        try:
+            date = datetime.strptime(raw.get('date', ''), fmt)
+            break
+        except ValueError:
+            continue
+    else:
+        raise ValueError(f"invalid date {raw.get('date')!r}")
+
+    try:
+        amount = float(raw.get('amount', '').replace(',', '').replace('$', ''))
+    except ValueError:
+        raise ValueError(f"invalid amount {raw.get('amount')!r}")
+
+    # Signed bank amounts carry the type when no explicit column is present
+    type = raw.get('type', '').lower() or ('income' if amount > 0 else 'expense')
+    if type not in ('income', 'expense'):
+        raise ValueError(f"invalid type {raw.get('type')!r}")
+    amount = abs(amount)
+    if amount == 0:
+        raise ValueError('amount must not be zero')
+
+    category = raw.get('category', '')[:50]
+    if not category:
+        raise ValueError('missing category')
+
+    goal_id = None
+    if raw.get('goal'):
+        goal_id = goals_by_key.get(raw['goal'].lower())
+        if goal_id is None:
+            raise ValueError(f"unknown goal {raw['goal']!r}")
+
+    return {'amount': amount, 'category': category, 'type': type, 'date': date}, goal_id
+
+def import_transactions(user_id, raw_rows, batch_size=None, max_errors=100):
+    """Validate and bulk insert streamed rows in chunks, returning import statistics.
+
+    Each chunk is inserted with a single executemany, then the rollup,
+    Budget.spent and goal balances are updated once per chunk from the
+    chunk's grouped totals before committing.
+    """
+    batch_size = batch_size or app.config['IMPORT_BATCH_SIZE']
+    goals_by_key = {}
+    for goal in Goal.query.filter_by(user_id=user_id):
+        goals_by_key[str(goal.id)] = goal.id
+        goals_by_key[goal.name.lower()] = goal.id
+
+    stats = {'imported': 0, 'rejected': 0, 'batches': 0, 'errors': []}
+    started = time.perf_counter()
+    batch = []
+
+    def flush(batch):
+        rows = [row for row, _ in batch]
+        db.session.execute(Transaction.__table__.insert(), rows)
+        apply_batch_totals(user_id, rows)
+
+        goal_totals = {}
+        for row, goal_id in batch:
+            if row['type'] == 'income' and goal_id is not None:
+                goal_totals[goal_id] = goal_totals.get(goal_id, 0.0) + row['amount']
+        for goal_id, total in goal_totals.items():
+            db.session.execute(Goal.__table__.update().where(Goal.id == goal_id).values(
+                current_amount=db.func.coalesce(Goal.current_amount, 0) + total
+            ))
+
+        db.session.commit()
+        insight_cache.invalidate(user_id)
+        stats['imported'] += len(batch)
+        stats['batches'] += 1
+
+    for line_number, raw in enumerate(raw_rows, start=1):
+        try:
+            row, goal_id = parse_import_row(raw, goals_by_key)
+        except ValueError as e:
+            stats['rejected'] += 1
+            if len(stats['errors']) < max_errors:
+                stats['errors'].append(f'Row {line_number}: {e}')
+            continue
+        row['user_id'] = user_id
+        # Only income counts toward a goal, so only income keeps the link
+        row['goal_id'] = goal_id if row['type'] == 'income' else None
+        batch.append((row, goal_id))
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+
+    stats['seconds'] = time.perf_counter() - started
+    stats['rows_per_second'] = stats['imported'] / stats['seconds'] if stats['seconds'] else 0.0
+    return stats
+
+def iter_import_file(stream, filename, format=None):
+    """Pick the streaming parser for an uploaded or local file"""
+    format = format or ('ofx' if filename.lower().endswith(('.ofx', '.qfx')) else 'csv')
+    if format == 'ofx':
+        return iter_ofx_transactions(stream)
+    return iter_csv_transactions(stream)
+
+@app.route('/import_transactions', methods=['POST'])
+@login_required
+def import_transactions_route():
+    upload = request.files.get('file')
+    if not upload or not upload.filename:
+        flash('Please choose a CSV or OFX file to import.', 'warning')
+        return redirect(url_for('transactions'))
+    
+    # Large files are saved and handed to a background worker
+    if (request.content_length or 0) > app.config['IMPORT_ASYNC_MIN_BYTES']:
+        os.makedirs(app.config['JOB_UPLOAD_DIR'], exist_ok=True)
+        path = os.path.join(app.config['JOB_UPLOAD_DIR'], f'{uuid.uuid4().hex}.upload')
+        upload.save(path)
+        job = enqueue_job('import_transactions', {
+            'user_id': session['user_id'],
+            'path': path,
+            'filename': upload.filename,
+            'format': request.form.get('format')
+        }, user_id=session['user_id'])
+        if request.accept_mimetypes.best == 'application/json':
+            return jsonify(job.to_dict()), 202
+        flash(f'Large import queued as job #{job.id}; the transactions will appear once it finishes.', 'info')
+        return redirect(url_for('transactions'))
+    
+    stream = io.TextIOWrapper(upload.stream, encoding='utf-8-sig', errors='replace', newline='')
+    try:
+        stats = import_transactions(session['user_id'], iter_import_file(stream, upload.filename, request.form.get('format')))
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Import failed: {e}', 'danger')
+        return redirect(url_for('transactions'))
     
-    # Update budget spent amount if it's an expense
-    if type == 'expense':
-        current_month = datetime.now().replace(day=1)
-        budget = Budget.query.filter_by(
-            user_id=session['user_id'],
-            category=category,
-            month=current_month
-        ).first()
-        
-        if budget:
-            budget.spent = (budget.spent or 0) + amount
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify(stats)
     
-    db.session.add(transaction)
+    flash(f"Imported {stats['imported']} transactions ({stats['rows_per_second']:.0f} rows/s), "
+          f"{stats['rejected']} rows rejected.", 'success' if not stats['rejected'] else 'warning')
+    for error in stats['errors'][:5]:
+        flash(error, 'warning')
+    return redirect(url_for('transactions'))
+
+def detect_recurring_rules(user_id=None, now=None):
+    """Propose RecurringRule rows from transaction history, returning how many were added.
+
+    Transactions are read in one streaming pass ordered by user, type,
+    category and date, so only one (user, type, category) group is held in
+    memory at a time. Streams already covered by a rule of any status
+    (including dismissed ones) are not proposed again.
+    """
+    now = now or datetime.now()
+    since = add_months(month_start(now), -app.config['RECURRING_DETECTION_MONTHS'])
+    existing = {}
+    rules = RecurringRule.query if user_id is None else RecurringRule.query.filter_by(user_id=user_id)
+    for rule in rules:
+        existing.setdefault((rule.user_id, rule.type, rule.category), []).append(rule.as_stream())
+
+    query = db.session.query(
+        Transaction.user_id, Transaction.id, Transaction.date, Transaction.amount, Transaction.category, Transaction.type
+    ).filter(Transaction.date >= since)
+    if user_id is not None:
+        query = query.filter(Transaction.user_id == user_id)
+    query = query.order_by(Transaction.user_id, Transaction.type, Transaction.category, Transaction.date)
+
+    proposed = []
+    groups = itertools.groupby(query.yield_per(EXPORT_FETCH_SIZE), key=lambda row: (row.user_id, row.type, row.category))
+    for key, group in groups:
+        streams, _ = forecasting.detect_recurring([row[1:] for row in group], now)
+        for stream in streams:
+            if any(forecasting.same_stream(rule, stream['category'], stream['type'], stream['amount'])
+                   for rule in existing.get(key, [])):
+                continue
+            last_date = datetime.fromisoformat(stream['last_date'])
+            proposed.append(RecurringRule(
+                user_id=key[0],
+                category=stream['category'],
+                type=stream['type'],
+                amount=round(stream['amount'], 2),
+                interval_days=stream['interval'],
+                day_of_month=stream['day'],
+                next_due=forecasting.next_due(last_date, stream['interval'], stream['day']),
+                occurrences=stream['occurrences']
+            ))
+
+    db.session.add_all(proposed)
     db.session.commit()
-    
-    flash('Transaction added successfully!', 'success')
+    for user in {rule.user_id for rule in proposed}:
+        insight_cache.invalidate(user)
+    return len(proposed)
+
+def materialize_recurring_rules(now=None, batch_size=None):
+    """Insert the transactions of every active rule that has come due, returning how many were created.
+
+    Rules are processed in batches, one commit per batch. Each rule's
+    next_due is advanced with a compare-and-set UPDATE inside the same DB
+    transaction as its rows, so overlapping scheduler runs never insert an
+    occurrence twice.
+    """
+    now = now or datetime.now()
+    batch_size = batch_size or app.config['RECURRING_BATCH_SIZE']
+    created = 0
+    while True:
+        rules = RecurringRule.query.filter(
+            RecurringRule.status == 'active', RecurringRule.next_due <= now
+        ).order_by(RecurringRule.next_due).limit(batch_size).all()
+        if not rules:
+            return created
+
+        rows_by_user = {}
+        for rule in rules:
+            dates = []
+            due = rule.next_due
+            while due <= now:
+                dates.append(due)
+                due = forecasting.next_due(due, rule.interval_days, rule.day_of_month)
+            claimed = db.session.execute(RecurringRule.__table__.update().where(
+                RecurringRule.id == rule.id, RecurringRule.next_due == rule.next_due
+            ).values(next_due=due, occurrences=RecurringRule.occurrences + len(dates)))
+            if claimed.rowcount != 1:
+                continue  # another runner got there first
+            rows_by_user.setdefault(rule.user_id, []).extend(
+                {'amount': rule.amount, 'category': rule.category, 'type': rule.type, 'date': date, 'user_id': rule.user_id}
+                for date in dates
+            )
+
+        for user_id, rows in rows_by_user.items():
+            db.session.execute(Transaction.__table__.insert(), rows)
+            apply_batch_totals(user_id, rows)
+        db.session.commit()
+        for user_id, rows in rows_by_user.items():
+            insight_cache.invalidate(user_id)
+            created += len(rows)
+
+@app.route('/recurring_rules/detect', methods=['POST'])
+@login_required
+def detect_recurring_rules_route():
+    proposed = detect_recurring_rules(session['user_id'])
+    if proposed:
+        flash(f'Found {proposed} new recurring payment{"s" if proposed != 1 else ""} to review.', 'success')
+    else:
+        flash('No new recurring payments found.', 'info')
+    return redirect(url_for('transactions'))
+
+@app.route('/recurring_rules/<int:rule_id>/<action>', methods=['POST'])
+@login_required
+def update_recurring_rule(rule_id, action):
+    if action not in ('activate', 'dismiss'):
+        abort(404)
+    rule = RecurringRule.query.filter_by(id=rule_id, user_id=session['user_id']).first_or_404()
+    if action == 'activate':
+        # Start from the next occurrence; earlier ones were entered by hand
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        while rule.next_due < today:
+            rule.next_due = forecasting.next_due(rule.next_due, rule.interval_days, rule.day_of_month)
+        rule.status = 'active'
+        flash(f'{rule.category} will now be added automatically.', 'success')
+    else:
+        rule.status = 'dismissed'
+        flash(f'{rule.category} will no longer be suggested.', 'info')
+    db.session.commit()
+    insight_cache.invalidate(session['user_id'])
+    insight_cache.discard_model(session['user_id'], 'forecast')
     return redirect(url_for('transactions'))
 
 @app.route('/forgot_password', methods=['GET', 'POST'])
@@ -579,85 +2414,307 @@ def logout():
     session.pop('user_id', None)
     return redirect(url_for('login'))
 
-@app.route('/reports')
-def reports():
-    if 'user_id' not in session:
-        return redirect(url_for('login'))
-    
-    transactions = Transaction.query.filter_by(user_id=session['user_id']).all()
-    
-    # Calculate current month's totals
-    current_month_year = datetime.now().strftime('%Y-%m')
-    monthly_income = 0.0
-    monthly_expenses = 0.0
+REPORT_VERSION = 1  # bump when the report payload changes so stale snapshots are recomputed
+REPORT_DAILY_MAX_DAYS = 62  # longer periods are charted month by month
+ReportPeriod = namedtuple('ReportPeriod', 'key start end label')  # `end` is exclusive
+
+def parse_report_period(args, now=None):
+    """Resolve the /reports query arguments to a ReportPeriod; raises ValueError or KeyError on bad input.
+
+    period=month&month=YYYY-MM, period=quarter&quarter=YYYY-Qn, period=year&year=YYYY
+    or period=custom&start=YYYY-MM-DD&end=YYYY-MM-DD (inclusive); each defaults to now.
+    """
+    now = now or datetime.now()
+    kind = args.get('period', 'month')
+    if kind == 'month':
+        start = datetime.strptime(args['month'], '%Y-%m') if args.get('month') else month_start(now)
+        return ReportPeriod(f'month:{start:%Y-%m}', start, add_months(start, 1), f'{start:%B %Y}')
+    if kind == 'quarter':
+        if args.get('quarter'):
+            year, quarter = map(int, args['quarter'].upper().split('-Q'))
+        else:
+            year, quarter = now.year, (now.month - 1) // 3 + 1
+        if not 1 <= quarter <= 4:
+            raise ValueError(f'Invalid quarter {quarter}')
+        start = datetime(year, quarter * 3 - 2, 1)
+        return ReportPeriod(f'quarter:{year}-Q{quarter}', start, add_months(start, 3), f'Q{quarter} {year}')
+    if kind == 'year':
+        year = int(args.get('year') or now.year)
+        return ReportPeriod(f'year:{year}', datetime(year, 1, 1), datetime(year + 1, 1, 1), str(year))
+    if kind == 'custom':
+        start = datetime.strptime(args['start'], '%Y-%m-%d')
+        last_day = datetime.strptime(args['end'], '%Y-%m-%d')
+        if last_day < start:
+            raise ValueError('The report range ends before it starts')
+        return ReportPeriod(f'custom:{start:%Y-%m-%d}:{last_day:%Y-%m-%d}', start, last_day + timedelta(days=1),
+                            f'{start:%b %d, %Y} - {last_day:%b %d, %Y}')
+    raise ValueError(f'Unknown report period {kind}')
+
+def report_month_keys(period):
+    month_keys = []
+    month = month_start(period.start)
+    while month < period.end:
+        month_keys.append(month.strftime('%Y-%m'))
+        month = add_months(month, 1)
+    return month_keys
+
+def report_statements(user_id, period):
+    """The report's two independent queries: (year_month, category, type, total) rows and, for
+    periods short enough to chart by day, (day, type, total) rows (else None)"""
+    # Whole months come from the rollup; other ranges are grouped from the transactions
+    if period.start.day == 1 and period.end.day == 1:
+        totals = db.select(
+            MonthlyCategoryTotal.year_month, MonthlyCategoryTotal.category, MonthlyCategoryTotal.type,
+            MonthlyCategoryTotal.total
+        ).where(
+            MonthlyCategoryTotal.user_id == user_id,
+            MonthlyCategoryTotal.year_month.in_(report_month_keys(period))
+        )
+    else:
+        year_col = db.extract('year', Transaction.date)
+        month_col = db.extract('month', Transaction.date)
+        totals = db.select(
+            year_col, month_col, Transaction.category, Transaction.type, db.func.sum(Transaction.amount)
+        ).where(
+            Transaction.user_id == user_id,
+            Transaction.date >= period.start,
+            Transaction.date < period.end
+        ).group_by(year_col, month_col, Transaction.category, Transaction.type)
+
+    days = None
+    if (period.end - period.start).days <= REPORT_DAILY_MAX_DAYS:
+        date_col = db.func.date(Transaction.date)
+        days = db.select(
+            date_col, Transaction.type, db.func.sum(Transaction.amount)
+        ).where(
+            Transaction.user_id == user_id,
+            Transaction.date >= period.start,
+            Transaction.date < period.end
+        ).group_by(date_col, Transaction.type)
+    return totals, days
+
+def compute_report(user_id, period):
+    """Totals, category breakdown and an income/expense series for one period, grouped in SQL"""
+    totals_statement, days_statement = report_statements(user_id, period)
+    return build_report(
+        period, db.session.execute(totals_statement).all(),
+        db.session.execute(days_statement).all() if days_statement is not None else None
+    )
+
+def build_report(period, total_rows, day_rows):
+    """The report payload from the rows of the report_statements() queries"""
+    month_keys = report_month_keys(period)
+    # Rollup rows already carry year_month; rows grouped from transactions carry the year and month
+    rows = [
+        row if len(row) == 4 else (f'{int(row[0])}-{int(row[1]):02d}', row[2], row[3], float(row[4] or 0))
+        for row in total_rows
+    ]
+    totals = analytics.monthly_totals(rows, month_keys)
+
+    num_days = (period.end - period.start).days
+    if day_rows is not None:
+        granularity = 'day'
+        labels = [(period.start + timedelta(days=i)).strftime('%Y-%m-%d') for i in range(num_days)]
+        # Position of each day within the period, 1-based as daily_totals() expects
+        income_series, expense_series = analytics.daily_totals(
+            [labels.index(str(day)[:10]) + 1 for day, _, _ in day_rows],
+            [type_ for _, type_, _ in day_rows],
+            [float(total or 0) for _, _, total in day_rows],
+            num_days
+        )
+    else:
+        granularity = 'month'
+        labels = month_keys
+        income_series, expense_series = totals.income, totals.expense
 
-    # Filter transactions for the current month and aggregate daily
-    daily_data = {}
-    transactions_current_month = [t for t in transactions if t.date.strftime('%Y-%m') == current_month_year]
+    # Category breakdown, largest first
+    amounts = totals.category_expense.sum(axis=1)
+    percentages = analytics.shares(amounts)
+    income, expenses = float(totals.income.sum()), float(totals.expense.sum())
+    return {
+        'version': REPORT_VERSION,
+        'period': period.key,
+        'label': period.label,
+        'start': period.start.strftime('%Y-%m-%d'),
+        'end': (period.end - timedelta(days=1)).strftime('%Y-%m-%d'),
+        'granularity': granularity,
+        'labels': labels,
+        'income_series': income_series.tolist(),
+        'expense_series': expense_series.tolist(),
+        'income': income,
+        'expenses': expenses,
+        'savings': income - expenses,
+        'categories': [
+            {
+                'name': str(totals.categories[i]),
+                'amount': float(amounts[i]),
+                'percentage': float(percentages[i])
+            } for i in analytics.top_indices(amounts, len(amounts))
+        ]
+    }
 
-    for transaction in transactions_current_month:
-        day_key = transaction.date.strftime('%Y-%m-%d')
-        if day_key not in daily_data:
-            daily_data[day_key] = {'income': 0.0, 'expense': 0.0}
-        daily_data[day_key][transaction.type] += float(transaction.amount)
+def get_report(user_id, period, now=None):
+    """The period's report; closed periods are computed once and then served from their snapshot"""
+    closed = period.end <= (now or datetime.now())
+    snapshot = None
+    if closed:
+        # A snapshot is kept until a backdated write drops it, so it is only read and built on the
+        # primary; a lagging replica could serve a dropped snapshot or miss the write
+        use_primary()
+        snapshot = ReportSnapshot.query.filter_by(user_id=user_id, period_key=period.key).first()
+        if snapshot is not None:
+            report = json.loads(snapshot.payload)
+            if report.get('version') == REPORT_VERSION:
+                return report
 
-        if transaction.type == 'income':
-            monthly_income += float(transaction.amount)
+    report = compute_report(user_id, period)
+    if closed:
+        if snapshot is not None:
+            snapshot.payload = json.dumps(report)
+            snapshot.created_at = datetime.utcnow()
         else:
-            monthly_expenses += float(transaction.amount)
+            try:
+                with db.session.begin_nested():
+                    db.session.add(ReportSnapshot(
+                        user_id=user_id, period_key=period.key, start=period.start, end=period.end,
+                        payload=json.dumps(report)
+                    ))
+            except IntegrityError:
+                # A concurrent request stored the same snapshot
+                pass
+        db.session.commit()
+    return report
 
-    # Generate all days in the current month for labels
-    year, month = map(int, current_month_year.split('-'))
-    num_days = calendar.monthrange(year, month)[1]
-    daily_labels = [f'{year}-{month:02d}-{day:02d}' for day in range(1, num_days + 1)]
+def invalidate_report_snapshots(user_id, first_date, last_date):
+    """Drop the snapshots of closed periods that a backdated write falls into.
 
-    # Prepare daily income and expense data, filling in 0 for days with no transactions
-    daily_income_data = [daily_data.get(day, {'income': 0.0})['income'] for day in daily_labels]
-    daily_expense_data = [daily_data.get(day, {'expense': 0.0})['expense'] for day in daily_labels]
+    Closed periods end at midnight on or before today, so writes dated
+    today or later can never touch one and skip the DELETE.
+    """
+    if first_date >= datetime.combine(datetime.now().date(), datetime.min.time()):
+        return
+    db.session.execute(ReportSnapshot.__table__.delete().where(
+        ReportSnapshot.user_id == user_id,
+        ReportSnapshot.start <= last_date,
+        ReportSnapshot.end > first_date
+    ))
 
-    monthly_savings = monthly_income - monthly_expenses
+@app.route('/reports')
+@read_replica
+def reports():
+    if 'user_id' not in session:
+        return redirect(url_for('login'))
+    
+    try:
+        period = parse_report_period(request.args)
+    except (KeyError, ValueError):
+        if request.accept_mimetypes.best == 'application/json':
+            return jsonify({'error': 'Invalid report period'}), 400
+        flash('Invalid report period; showing the current month instead.', 'warning')
+        period = parse_report_period({})
+    report = get_report(session['user_id'], period)
+    
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify(report)
+    return render_template('reports.html', report=report, period=request.args.get('period', 'month'))
 
-    # Calculate category breakdown for current month
-    category_breakdown = []
-    category_totals = {}
+EXPORT_FETCH_SIZE = 1000
+EXPORT_MIMETYPES = {'csv': 'text/csv', 'json': 'application/json'}
 
-    for transaction in transactions_current_month: # Use current month transactions
-        if transaction.type == 'expense':
-            category_totals[transaction.category] = category_totals.get(transaction.category, 0.0) + float(transaction.amount)
+def stream_csv(header, rows):
+    """Yield CSV text in chunks so large exports never build the whole file in memory"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    for count, row in enumerate(rows, start=1):
+        writer.writerow(row)
+        if count % EXPORT_FETCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
 
-    total_expenses = sum(category_totals.values())
+def stream_json_array(items):
+    """Yield a JSON array one element at a time"""
+    yield '['
+    for index, item in enumerate(items):
+        yield (',' if index else '') + json.dumps(item)
+    yield ']'
 
-    for category, amount in category_totals.items():
-        percentage = (amount / total_expenses * 100) if total_expenses > 0 else 0.0
-        category_breakdown.append({
-            'name': str(category),
-            'amount': float(amount),
-            'percentage': float(percentage)
-        })
+def export_response(chunks, format, filename):
+    return Response(
+        stream_with_context(chunks),
+        mimetype=EXPORT_MIMETYPES[format],
+        headers={'Content-Disposition': f'attachment; filename={filename}.{format}'}
+    )
+
+@app.route('/export/transactions.<format>')
+@login_required
+def export_transactions(format):
+    if format not in EXPORT_MIMETYPES:
+        abort(404)
+    try:
+        filters = parse_transaction_filters(request.args)
+    except ValueError:
+        return jsonify({'error': 'Invalid date filter'}), 400
+    
+    # yield_per streams rows from a server-side cursor in fixed-size batches
+    statement = apply_transaction_filters(
+        db.select(Transaction.id, Transaction.date, Transaction.category, Transaction.type, Transaction.amount)
+        .where(Transaction.user_id == session['user_id']),
+        filters
+    ).order_by(Transaction.date, Transaction.id).execution_options(yield_per=EXPORT_FETCH_SIZE)
+    rows = (
+        (t.id, t.date.strftime('%Y-%m-%d %H:%M:%S'), t.category, t.type, float(t.amount))
+        for t in db.session.execute(statement)
+    )
+    
+    if format == 'csv':
+        chunks = stream_csv(['id', 'date', 'category', 'type', 'amount'], rows)
+    else:
+        chunks = stream_json_array(
+            {'id': id, 'date': date, 'category': category, 'type': type_, 'amount': amount}
+            for id, date, category, type_, amount in rows
+        )
+    return export_response(chunks, format, 'transactions')
 
-    # Sort category breakdown by amount
-    category_breakdown.sort(key=lambda x: x['amount'], reverse=True)
-
-    # Prepare data for category chart
-    category_labels = [str(item['name']) for item in category_breakdown]
-    category_data = [float(item['amount']) for item in category_breakdown]
-
-    # Get current month and year for display
-    current_month_name = datetime.now().strftime('%B')
-    current_year = datetime.now().strftime('%Y')
-    month_year_label = f'{current_month_name} {current_year}'
-
-    return render_template('reports.html',
-                         daily_labels=daily_labels,
-                         daily_income_data=daily_income_data,
-                         daily_expense_data=daily_expense_data,
-                         monthly_income=monthly_income,
-                         monthly_expenses=monthly_expenses,
-                         monthly_savings=monthly_savings,
-                         category_breakdown=category_breakdown,
-                         category_labels=category_labels,
-                         category_data=category_data,
-                         month_year_label=month_year_label)
+@app.route('/export/reports.<format>')
+@login_required
+def export_reports(format):
+    if format not in EXPORT_MIMETYPES:
+        abort(404)
+    
+    statement = db.select(
+        MonthlyCategoryTotal.year_month, MonthlyCategoryTotal.category, MonthlyCategoryTotal.type,
+        MonthlyCategoryTotal.total, MonthlyCategoryTotal.count
+    ).where(
+        MonthlyCategoryTotal.user_id == session['user_id']
+    ).order_by(
+        MonthlyCategoryTotal.year_month, MonthlyCategoryTotal.type, MonthlyCategoryTotal.category
+    ).execution_options(yield_per=EXPORT_FETCH_SIZE)
+    rows = db.session.execute(statement)
+    
+    if format == 'csv':
+        chunks = stream_csv(
+            ['month', 'category', 'type', 'amount', 'transactions'],
+            ((r.year_month, r.category, r.type, float(r.total), r.count) for r in rows)
+        )
+        return export_response(chunks, format, 'monthly_report')
+    
+    def months():
+        # Rows arrive ordered by month, so each month is assembled from a single group
+        for year_month, month_rows in itertools.groupby(rows, key=lambda r: r.year_month):
+            report = {'month': year_month, 'income': 0.0, 'expenses': 0.0, 'categories': {}}
+            for r in month_rows:
+                if r.type == 'income':
+                    report['income'] += float(r.total)
+                else:
+                    report['expenses'] += float(r.total)
+                    report['categories'][r.category] = float(r.total)
+            report['savings'] = report['income'] - report['expenses']
+            yield report
+    
+    return export_response(stream_json_array(months()), format, 'monthly_report')
 
 @app.route('/goals')
 @login_required
@@ -683,6 +2740,7 @@ def add_goal():
     
     db.session.add(new_goal)
     db.session.commit()
+    insight_cache.invalidate(session['user_id'])
     flash('Goal added successfully!', 'success')
     return redirect(url_for('goals'))
 
@@ -696,7 +2754,10 @@ def update_goal(goal_id):
     current_amount = float(request.form.get('current_amount'))
     goal.current_amount = current_amount
     db.session.commit()
+    insight_cache.invalidate(session['user_id'])
     flash('Goal progress updated!', 'success')
+    for alert in evaluate_alerts(db.session.get(User, session['user_id']), goal=goal):
+        flash(alert.message, 'success')
     return redirect(url_for('goals'))
 
 @app.route('/delete_goal/<int:goal_id>', methods=['POST'])
@@ -706,38 +2767,40 @@ def delete_goal(goal_id):
     if goal.user_id != session['user_id']:
         abort(403)
     
+    # The contributions stay as ordinary income
+    Transaction.query.filter_by(goal_id=goal.id).update({'goal_id': None})
     db.session.delete(goal)
     db.session.commit()
+    insight_cache.invalidate(session['user_id'])
     flash('Goal deleted successfully!', 'success')
     return redirect(url_for('goals'))
 
 @app.route('/budget')
 @login_required
+@read_replica
 def budget():
-    # Get all budget categories for the current user
-    categories = Budget.query.filter_by(user_id=session['user_id']).all()
-    
-    # Calculate spent amounts for each budget category
-    for category in categories:
-        spent = Transaction.query.filter_by(
-            user_id=session['user_id'],
-            category=category.category,
-            type='expense'
-        ).filter(
-            Transaction.date >= category.month,
-            Transaction.date < category.month.replace(month=category.month.month + 1)
-        ).with_entities(db.func.sum(Transaction.amount)).scalar() or 0
-        
-        category.spent = spent
-    
+    # Only the budgets of the active period; closed periods come from their snapshots
+    categories = get_current_budgets(session['user_id'])
+    history = db.session.scalars(budget_history_statement(session['user_id'])).all()
+    return render_budget_page(categories, history)
+
+def budget_history_statement(user_id, now=None):
+    """Snapshots of the closed periods that started within the last BUDGET_HISTORY_MONTHS months"""
+    since = add_months(month_start(now or datetime.now()), -app.config['BUDGET_HISTORY_MONTHS'])
+    return db.select(BudgetSnapshot).where(
+        BudgetSnapshot.user_id == user_id,
+        BudgetSnapshot.period_start >= since
+    ).order_by(BudgetSnapshot.period_start.desc(), BudgetSnapshot.category)
+
+def render_budget_page(categories, history):
     # Calculate totals with safe handling of None values
-    total_budget = sum(category.limit or 0 for category in categories)
+    total_budget = sum(category.available or 0 for category in categories)
     total_spent = sum(category.spent or 0 for category in categories)
     remaining_budget = total_budget - total_spent
     
     # Prepare data for the chart
     category_names = [category.category for category in categories]
-    budget_amounts = [float(category.limit or 0) for category in categories]
+    budget_amounts = [float(category.available or 0) for category in categories]
     spent_amounts = [float(category.spent or 0) for category in categories]
     
     return render_template('budget.html',
@@ -747,24 +2810,37 @@ def budget():
                          remaining_budget=remaining_budget,
                          category_names=category_names,
                          budget_amounts=budget_amounts,
-                         spent_amounts=spent_amounts)
+                         spent_amounts=spent_amounts,
+                         history=history,
+                         format_budget_period=format_budget_period)
 
 @app.route('/add_budget_category', methods=['POST'])
 @login_required
 def add_budget_category():
     category = request.form.get('category')
     limit = float(request.form.get('limit', 0))
+    period_months = int(request.form.get('period_months', 1))
+    if period_months not in (1, 3, 12):
+        abort(400)
     
-    new_category = Budget(
+    if BudgetTemplate.query.filter_by(user_id=session['user_id'], category=category, active=True).first():
+        flash(f'There is already a budget for {category}; edit it instead.', 'warning')
+        return redirect(url_for('budget'))
+    
+    # The template rolls the budget forward; the first period starts this month
+    template = BudgetTemplate(
+        user_id=session['user_id'],
         category=category,
         limit=limit,
-        spent=0.0,
-        month=datetime.now().replace(day=1),
-        user_id=session['user_id']
+        period_months=period_months,
+        carry_over='carry_over' in request.form,
+        start_month=month_start(datetime.now())
     )
-    
-    db.session.add(new_category)
+    db.session.add(template)
+    db.session.flush()
+    open_budget_period(template, template.start_month)
     db.session.commit()
+    insight_cache.invalidate(session['user_id'])
     flash('Budget category added successfully!', 'success')
     return redirect(url_for('budget'))
 
@@ -775,9 +2851,12 @@ def update_budget_category(category_id):
     if category.user_id != session['user_id']:
         abort(403)
     
-    budget = float(request.form.get('budget'))
-    category.budget = budget
+    category.limit = float(request.form.get('limit'))
+    # Later periods use the new limit too
+    if category.template_id is not None:
+        db.session.get(BudgetTemplate, category.template_id).limit = category.limit
     db.session.commit()
+    insight_cache.invalidate(session['user_id'])
     flash('Budget category updated!', 'success')
     return redirect(url_for('budget'))
 
@@ -788,8 +2867,12 @@ def delete_budget_category(category_id):
     if category.user_id != session['user_id']:
         abort(403)
     
+    # Stop the budget rolling forward; closed periods keep their snapshots
+    if category.template_id is not None:
+        db.session.get(BudgetTemplate, category.template_id).active = False
     db.session.delete(category)
     db.session.commit()
+    insight_cache.invalidate(session['user_id'])
     flash('Budget category deleted successfully!', 'success')
     return redirect(url_for('budget'))
 
@@ -842,127 +2925,351 @@ def settings():
     return render_template('settings.html', user=user)
 
 @app.route('/ai_query', methods=['POST'])
+@read_replica
 def ai_query():
     if 'user_id' not in session:
         return jsonify({'error': 'Not authenticated'}), 401
         
-    query = request.json.get('query')
-    
-    # Get user's financial data
+    query = (request.get_json(silent=True) or {}).get('query') or ''
     user_id = session['user_id']
     
-    # Get recent transactions
-    recent_transactions = Transaction.query.filter_by(user_id=user_id)\
-        .order_by(Transaction.date.desc())\
-        .limit(10).all()
-    
-    # Get savings goals
-    savings_goals = Goal.query.filter_by(user_id=user_id).all()
-    
-    # Get current month's budgets
-    current_month = datetime.now().replace(day=1)
-    budgets = Budget.query.filter_by(
-        user_id=user_id,
-        month=current_month
-    ).all()
-    
-    # Get debts
-    debts = Debt.query.filter_by(user_id=user_id).all()
+    # Questions about amounts ("how much did I spend on Dining in March vs
+    # February") run as one aggregate statement compiled once per question shape
+    shape, literals = nlquery.lex(query, get_ai_context(user_id, ('categories',))['categories'])
+    plan = get_query_plan(shape)
+    if plan.query is not None:
+        params, labels = nlquery.bind(plan.query, literals, datetime.now())
+        rows = db.session.execute(plan.statement, dict(params, user_id=user_id)).all()
+        return jsonify({
+            'response': nlquery.answer(plan.query, literals, labels, rows)
+        })
     
-    # Calculate total income and expenses
-    total_income = sum(t.amount for t in recent_transactions if t.type == 'income')
-    total_expenses = sum(t.amount for t in recent_transactions if t.type == 'expense')
+    # Anything else gets a canned answer; only the slices of the user's data that the matched intent needs are
+    # fetched, each cached until the user's next write
+    intent = assistant.route(query)
+    context = get_ai_context(user_id, intent.slices if intent else ())
     
-    # Prepare context for AI
-    context = {
-        'recent_transactions': [
-            {
-                'date': t.date.strftime('%Y-%m-%d'),
-                'category': t.category,
-                'type': t.type,
-                'amount': float(t.amount)
-            } for t in recent_transactions
-        ],
-        'savings_goals': [
+    return jsonify({
+        'response': assistant.respond(intent, context)
+    })
+
+def ai_summary_slice(rows):
+    total_income = sum(amount for type_, amount in rows if type_ == 'income')
+    total_expenses = sum(amount for type_, amount in rows if type_ == 'expense')
+    return {
+        'total_income': float(total_income),
+        'total_expenses': float(total_expenses),
+        'net_balance': float(total_income - total_expenses)
+    }
+
+# Each context slice is one statement plus a function shaping its rows, so the
+# sync and async views share them
+AI_CONTEXT_SLICES = {
+    # Every category the user has transactions or budgets in, for nlquery.lex()
+    'categories': (
+        lambda user_id: db.union(
+            db.select(MonthlyCategoryTotal.category).where(MonthlyCategoryTotal.user_id == user_id),
+            db.select(Budget.category).where(Budget.user_id == user_id)
+        ),
+        lambda rows: sorted(category for category, in rows)
+    ),
+    'summary': (
+        lambda user_id: db.select(Transaction.type, Transaction.amount).where(
+            Transaction.user_id == user_id
+        ).order_by(Transaction.date.desc()).limit(10),
+        ai_summary_slice
+    ),
+    'savings_goals': (
+        lambda user_id: db.select(Goal.name, Goal.target_amount, Goal.current_amount, Goal.target_date).where(
+            Goal.user_id == user_id
+        ),
+        lambda rows: [
             {
-                'name': g.name,
-                'target_amount': float(g.target_amount),
-                'current_amount': float(g.current_amount),
-                'target_date': g.target_date.strftime('%Y-%m-%d')
-            } for g in savings_goals
-        ],
-        'budgets': [
+                'name': name,
+                'target_amount': float(target_amount),
+                'current_amount': float(current_amount),
+                'target_date': target_date.strftime('%Y-%m-%d')
+            } for name, target_amount, current_amount, target_date in rows
+        ]
+    ),
+    'budgets': (
+        lambda user_id: current_budgets_statement(user_id).with_only_columns(
+            Budget.category, Budget.limit, Budget.carried_over, Budget.spent
+        ),
+        lambda rows: [
             {
-                'category': b.category,
-                'amount': float(b.amount),
-                'spent': float(b.spent) if hasattr(b, 'spent') else 0
-            } for b in budgets
-        ],
-        'debts': [
+                'category': category,
+                'limit': float(limit),
+                'available': float(limit) + float(carried_over or 0),
+                'spent': float(spent or 0)
+            } for category, limit, carried_over, spent in rows
+        ]
+    ),
+    'debts': (
+        lambda user_id: db.select(Debt.name, Debt.balance, Debt.interest_rate, Debt.minimum_payment).where(
+            Debt.user_id == user_id
+        ),
+        lambda rows: [
             {
-                'name': d.name,
-                'balance': float(d.balance),
-                'interest_rate': float(d.interest_rate),
-                'minimum_payment': float(d.minimum_payment)
-            } for d in debts
-        ],
-        'summary': {
-            'total_income': float(total_income),
-            'total_expenses': float(total_expenses),
-            'net_balance': float(total_income - total_expenses)
-        }
+                'name': name,
+                'balance': float(balance),
+                'interest_rate': float(interest_rate),
+                'minimum_payment': float(minimum_payment)
+            } for name, balance, interest_rate, minimum_payment in rows
+        ]
+    ),
+}
+
+def get_ai_context(user_id, slices):
+    """{slice: data} for the named slices, served from the insight cache when it has them"""
+    def compute(name):
+        statement, shape = AI_CONTEXT_SLICES[name]
+        return shape(db.session.execute(statement(user_id)).all())
+    return {
+        name: insight_cache.get_or_compute(user_id, f'ai:{name}', lambda name=name: compute(name))
+        for name in slices
     }
-    
-    # Generate response based on query and context
-    response = generate_ai_response(query, context)
-    
+
+QueryPlan = namedtuple('QueryPlan', 'query statement')
+query_plan_cache = LRUCacheBackend(app.config['QUERY_PLAN_CACHE_SIZE'])
+
+NLQUERY_AGGREGATES = {
+    'sum': lambda value: db.func.sum(value),
+    'count': lambda value: db.func.count(value),
+    'avg': lambda value: db.func.avg(value),
+    'max': lambda value: db.func.max(value),
+}
+
+def compile_query(query):
+    """One parameterized statement for an nlquery.Query; run it with the parameters from nlquery.bind() plus user_id"""
+    if query.source == 'budget':
+        # Measured against what is available, like /budget and the alerts: the limit plus any carry-over
+        available = (Budget.limit + db.func.coalesce(Budget.carried_over, 0)).label('available')
+        statement = db.select(Budget.category, available, Budget.spent).where(
+            Budget.user_id == db.bindparam('user_id'),
+            Budget.month <= db.bindparam('now'),
+            Budget.period_end > db.bindparam('now')
+        )
+        if query.category is not None:
+            statement = statement.where(Budget.category == db.bindparam('category'))
+        return statement.order_by(Budget.category)
+
+    if query.source == 'goal':
+        return db.select(
+            db.func.count(Goal.id), db.func.sum(Goal.target_amount), db.func.sum(Goal.current_amount)
+        ).where(Goal.user_id == db.bindparam('user_id'))
+
+    # One column per period (conditional aggregation), so a comparison is still a single
+    # scan of the (user_id, date) index over the window the periods span
+    value = Transaction.id if query.measure == 'count' else Transaction.amount
+    columns = [
+        NLQUERY_AGGREGATES[query.measure](db.case((db.and_(
+            Transaction.date >= db.bindparam(f'start_{i}'), Transaction.date < db.bindparam(f'end_{i}')
+        ), value))).label(f'period_{i}')
+        for i in range(len(query.periods))
+    ]
+    filters = [
+        Transaction.user_id == db.bindparam('user_id'),
+        Transaction.date >= db.bindparam('window_start'),
+        Transaction.date < db.bindparam('window_end')
+    ]
+    if query.type is not None:
+        filters.append(Transaction.type == db.bindparam('type'))
+    if query.category is not None:
+        filters.append(Transaction.category == db.bindparam('category'))
+    if query.group_by:
+        return db.select(Transaction.category, *columns).where(*filters).group_by(
+            Transaction.category
+        ).order_by(columns[0].desc()).limit(nlquery.TOP_CATEGORIES)
+    return db.select(*columns).where(*filters)
+
+def get_query_plan(shape):
+    """The parsed and compiled plan for a question shape; shapes that are not about amounts cache as QueryPlan(None, None)"""
+    plan = query_plan_cache.get(shape)
+    if plan is None:
+        query = nlquery.parse(shape)
+        plan = QueryPlan(query, compile_query(query) if query is not None else None)
+        query_plan_cache.set(shape, plan)
+    return plan
+
+# Async serving mode: with ASYNC_VIEWS set, the read-heavy endpoints below replace
+# their sync views and run their independent queries concurrently over an asyncio
+# engine. Writes and the heavier insight/forecast code stay on the sync session.
+ASYNC_DRIVERS = {'mysql': 'mysql+aiomysql', 'sqlite': 'sqlite+aiosqlite', 'postgresql': 'postgresql+asyncpg'}
+
+def async_database_url(url):
+    """The asyncio-driver form of a database URL ('mysql+pymysql://...' -> 'mysql+aiomysql://...')"""
+    scheme, rest = url.split('://', 1)
+    return f"{ASYNC_DRIVERS.get(scheme.split('+', 1)[0], scheme)}://{rest}"
+
+# Pooled connections belong to the event loop that opened them, so each loop gets
+# its own engines ({bind key: engine}, None for the primary). asgi.py registers the
+# server's loop; any other loop (Flask runs async views on a fresh one under a WSGI
+# server) has its engines disposed after the view.
+async_engines = weakref.WeakKeyDictionary()
+async_server_loops = weakref.WeakSet()
+
+def get_async_engine():
+    """The running loop's engine for the request's replica, or for the primary"""
+    from sqlalchemy.ext.asyncio import create_async_engine
+    key = g.get('db_replica') if has_app_context() else None
+    engines = async_engines.setdefault(asyncio.get_running_loop(), {})
+    engine = engines.get(key)
+    if engine is None:
+        if key is None:
+            url = app.config['ASYNC_DATABASE_URL'] or async_database_url(app.config['SQLALCHEMY_DATABASE_URI'])
+        else:
+            url = async_database_url(app.config['SQLALCHEMY_BINDS'][key]['url'])
+        engine = engines[key] = create_async_engine(url, **engine_options(url, asyncio=True))
+        watch_pool(engine.sync_engine)
+    return engine
+
+async def async_fetch(statement, params=None):
+    """All rows of a Core statement, on a connection of its own so calls can run under asyncio.gather()"""
+    async with get_async_engine().connect() as connection:
+        return (await connection.execute(statement, params or {})).all()
+
+async def async_scalars(statement):
+    """ORM objects selected by a statement, loaded in a short-lived AsyncSession of their own"""
+    from sqlalchemy.ext.asyncio import AsyncSession
+    async with AsyncSession(get_async_engine(), expire_on_commit=False) as async_session:
+        return (await async_session.scalars(statement)).all()
+
+def async_view(view):
+    @wraps(view)
+    async def wrapper(*args, **kwargs):
+        # Every async view is read-only
+        use_replica()
+        try:
+            return await view(*args, **kwargs)
+        finally:
+            loop = asyncio.get_running_loop()
+            if loop not in async_server_loops and loop in async_engines:
+                for engine in async_engines.pop(loop).values():
+                    await engine.dispose()
+    return wrapper
+
+@async_view
+async def async_dashboard():
+    if 'user_id' not in session:
+        return redirect(url_for('login'))
+
+    users = await async_scalars(db.select(User).where(User.id == session['user_id']))
+    return render_template('dashboard.html', user=users[0] if users else None)
+
+async def async_dashboard_summary_widget(user_id):
+    return dashboard_summary_payload(*await asyncio.gather(
+        *(async_fetch(statement) for statement in dashboard_summary_statements(user_id))
+    ))
+
+ASYNC_DASHBOARD_WIDGETS = {
+    'summary': async_dashboard_summary_widget,
+}
+
+@async_view
+async def async_dashboard_widget(widget):
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    if widget not in DASHBOARD_WIDGETS:
+        return jsonify({'error': f'Unknown widget {widget}'}), 404
+
+    if widget in ASYNC_DASHBOARD_WIDGETS:
+        payload = await ASYNC_DASHBOARD_WIDGETS[widget](session['user_id'])
+    else:
+        # Widgets built on the insight cache and forecast model run in a thread off the event loop
+        payload = await asyncio.to_thread(DASHBOARD_WIDGETS[widget], session['user_id'])
+    return widget_response(payload)
+
+async def get_report_async(user_id, period, now=None):
+    if period.end <= (now or datetime.now()):
+        use_primary()
+        rows = await async_fetch(db.select(ReportSnapshot.payload).where(
+            ReportSnapshot.user_id == user_id, ReportSnapshot.period_key == period.key
+        ))
+        if rows:
+            report = json.loads(rows[0].payload)
+            if report.get('version') == REPORT_VERSION:
+                return report
+        # Storing a new snapshot is a write; leave it to the sync path
+        return await asyncio.to_thread(get_report, user_id, period, now)
+
+    totals_statement, days_statement = report_statements(user_id, period)
+    if days_statement is None:
+        return build_report(period, await async_fetch(totals_statement), None)
+    return build_report(period, *await asyncio.gather(async_fetch(totals_statement), async_fetch(days_statement)))
+
+@async_view
+async def async_reports():
+    if 'user_id' not in session:
+        return redirect(url_for('login'))
+
+    try:
+        period = parse_report_period(request.args)
+    except (KeyError, ValueError):
+        if request.accept_mimetypes.best == 'application/json':
+            return jsonify({'error': 'Invalid report period'}), 400
+        flash('Invalid report period; showing the current month instead.', 'warning')
+        period = parse_report_period({})
+    report = await get_report_async(session['user_id'], period)
+
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify(report)
+    return render_template('reports.html', report=report, period=request.args.get('period', 'month'))
+
+@async_view
+async def async_budget():
+    if 'user_id' not in session:
+        flash('Please log in to access this page.', 'warning')
+        return redirect(url_for('login'))
+
+    categories, history = await asyncio.gather(
+        async_scalars(current_budgets_statement(session['user_id'])),
+        async_scalars(budget_history_statement(session['user_id']))
+    )
+    return render_budget_page(categories, history)
+
+async def get_ai_context_async(user_id, slices):
+    async def compute(name):
+        statement, shape = AI_CONTEXT_SLICES[name]
+        return shape(await async_fetch(statement(user_id)))
+    values = await asyncio.gather(*(
+        insight_cache.get_or_compute_async(user_id, f'ai:{name}', lambda name=name: compute(name))
+        for name in slices
+    ))
+    return dict(zip(slices, values))
+
+@async_view
+async def async_ai_query():
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+
+    query = (request.get_json(silent=True) or {}).get('query') or ''
+    user_id = session['user_id']
+
+    categories = (await get_ai_context_async(user_id, ('categories',)))['categories']
+    shape, literals = nlquery.lex(query, categories)
+    plan = get_query_plan(shape)
+    if plan.query is not None:
+        params, labels = nlquery.bind(plan.query, literals, datetime.now())
+        rows = await async_fetch(plan.statement, dict(params, user_id=user_id))
+        return jsonify({
+            'response': nlquery.answer(plan.query, literals, labels, rows)
+        })
+
+    intent = assistant.route(query)
+    context = await get_ai_context_async(user_id, intent.slices if intent else ())
     return jsonify({
-        'response': response
+        'response': assistant.respond(intent, context)
     })
 
-def generate_ai_response(query, context):
-    query = query.lower()
-    
-    # Check for spending-related questions
-    if any(word in query for word in ['spend', 'expense', 'cost', 'money']):
-        if context['summary']['total_expenses'] > context['summary']['total_income']:
-            return f"Your expenses (${context['summary']['total_expenses']:.2f}) are higher than your income (${context['summary']['total_income']:.2f}). Consider reviewing your spending habits."
-        else:
-            return f"Your spending looks healthy! You've spent ${context['summary']['total_expenses']:.2f} out of ${context['summary']['total_income']:.2f} income."
-    
-    # Check for savings-related questions
-    elif any(word in query for word in ['save', 'savings', 'goal']):
-        if context['savings_goals']:
-            goals_status = []
-            for goal in context['savings_goals']:
-                progress = (goal['current_amount'] / goal['target_amount']) * 100
-                goals_status.append(f"{goal['name']}: {progress:.1f}% complete")
-            return f"Your savings goals:\n" + "\n".join(goals_status)
-        else:
-            return "You haven't set any savings goals yet. Consider setting some to help track your progress!"
-    
-    # Check for budget-related questions
-    elif any(word in query for word in ['budget', 'limit']):
-        if context['budgets']:
-            budget_status = []
-            for budget in context['budgets']:
-                usage = (budget['spent'] / budget['amount']) * 100
-                status = "over" if usage > 100 else "under"
-                budget_status.append(f"{budget['category']}: {usage:.1f}% of budget ({status})")
-            return "Your budget status:\n" + "\n".join(budget_status)
-        else:
-            return "You haven't set any budgets yet. Setting budgets can help you manage your spending better!"
-    
-    # Check for debt-related questions
-    elif any(word in query for word in ['debt', 'loan', 'credit']):
-        if context['debts']:
-            total_debt = sum(d['balance'] for d in context['debts'])
-            return f"You have {len(context['debts'])} active debts totaling ${total_debt:.2f}. Consider focusing on paying off high-interest debts first."
-        else:
-            return "You don't have any active debts recorded. That's great!"
-    
-    # Default response
-    return "I can help you analyze your spending, savings goals, budgets, and debts. What would you like to know about?"
+if app.config['ASYNC_VIEWS']:
+    app.view_functions.update({
+        'dashboard': async_dashboard,
+        'dashboard_widget': async_dashboard_widget,
+        'reports': async_reports,
+        'budget': async_budget,
+        'ai_query': async_ai_query,
+    })
 
 def create_test_user():
     try:
@@ -1052,24 +3359,502 @@ def create_test_data():
             )
             db.session.add(goal)
 
-        # Create sample budgets for current month
-        current_month = datetime.now().replace(day=1)
+        # Create sample monthly budget templates starting this month
         for category in expense_categories:
-            budget = Budget(
+            db.session.add(BudgetTemplate(
+                user_id=test_user.id,
                 category=category,
                 limit=round(random.uniform(200, 1000), 2),
-                spent=0.0,
-                month=current_month,
-                user_id=test_user.id
-            )
-            db.session.add(budget)
+                start_month=month_start(datetime.now())
+            ))
 
-        db.session.commit()
+        db.session.flush()
+        rebuild_monthly_rollups(test_user.id)
+        roll_budgets_forward(user_id=test_user.id)
         print("Test data created successfully!")
     except Exception as e:
         print(f"Error creating test data: {e}")
         db.session.rollback()
 
+# Background jobs: handlers are registered by kind and run by `flask worker`
+# or by JOB_EMBEDDED_WORKERS threads inside the web process.
+JOB_HANDLERS = {}
+
+def job_handler(kind, max_attempts=None):
+    """Register the decorated function as the handler for a job kind; it receives the decoded payload"""
+    def register(f):
+        JOB_HANDLERS[kind] = (f, max_attempts)
+        return f
+    return register
+
+def enqueue_job(kind, payload=None, user_id=None, delay=0, unique=False):
+    """Queue a job and return it; with unique=True a job of the same kind already queued for the user is reused"""
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f'Unknown job kind {kind}')
+    if unique:
+        existing = Job.query.filter_by(kind=kind, user_id=user_id, status='queued').first()
+        if existing:
+            return existing
+    max_attempts = JOB_HANDLERS[kind][1] or app.config['JOB_MAX_ATTEMPTS']
+    job = Job(
+        kind=kind,
+        payload=json.dumps(payload or {}),
+        user_id=user_id,
+        max_attempts=max_attempts,
+        run_after=datetime.utcnow() + timedelta(seconds=delay)
+    )
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+def claim_next_job(worker_id):
+    """Atomically move the oldest runnable job to 'running' for this worker and return it (or None)"""
+    now = datetime.utcnow()
+    jobs = Job.__table__
+    # Jobs whose worker died mid-run go back to the queue, or fail once out of attempts
+    stale = (jobs.c.status == 'running') & (jobs.c.locked_at < now - timedelta(seconds=app.config['JOB_LOCK_TIMEOUT']))
+    db.session.execute(jobs.update().where(stale & (jobs.c.attempts >= jobs.c.max_attempts)).values(
+        status='failed', finished_at=now, last_error='Worker lock timed out'
+    ))
+    db.session.execute(jobs.update().where(stale).values(status='queued', locked_by=None))
+
+    candidates = db.session.query(Job.id).filter(
+        Job.status == 'queued', Job.run_after <= now
+    ).order_by(Job.run_after, Job.id).limit(10).all()
+    for (job_id,) in candidates:
+        claimed = db.session.execute(jobs.update().where(
+            jobs.c.id == job_id, jobs.c.status == 'queued'
+        ).values(status='running', locked_by=worker_id, locked_at=now, attempts=jobs.c.attempts + 1))
+        if claimed.rowcount == 1:
+            db.session.commit()
+            return db.session.get(Job, job_id)
+    db.session.commit()
+    return None
+
+def run_job(job):
+    """Run a claimed job, recording its result or scheduling a retry with exponential backoff"""
+    job_id = job.id
+    try:
+        handler = JOB_HANDLERS.get(job.kind, (None, None))[0]
+        if handler is None:
+            raise LookupError(f'No handler registered for job kind {job.kind}')
+        result = handler(json.loads(job.payload))
+    except Exception:
+        db.session.rollback()
+        job = db.session.get(Job, job_id)
+        job.last_error = traceback.format_exc()
+        job.locked_by = None
+        if job.attempts < job.max_attempts:
+            job.status = 'queued'
+            job.run_after = datetime.utcnow() + timedelta(seconds=app.config['JOB_RETRY_DELAY'] * 2 ** (job.attempts - 1))
+        else:
+            job.status = 'failed'
+            job.finished_at = datetime.utcnow()
+        app.logger.warning('Job %d (%s) failed on attempt %d/%d', job.id, job.kind, job.attempts, job.max_attempts)
+    else:
+        job = db.session.get(Job, job_id)
+        job.status = 'succeeded'
+        job.result = json.dumps(result) if result is not None else None
+        job.finished_at = datetime.utcnow()
+    db.session.commit()
+    return job
+
+def run_worker(worker_id, poll_interval=1.0, burst=False, stop=None):
+    """Claim and run jobs until `stop` is set; in burst mode return once the queue is empty"""
+    processed = 0
+    while stop is None or not stop.is_set():
+        with app.app_context():
+            job = claim_next_job(worker_id)
+            if job is not None:
+                run_job(job)
+                processed += 1
+                continue
+        if burst:
+            break
+        if stop is not None:
+            stop.wait(poll_interval)
+        else:
+            time.sleep(poll_interval)
+    return processed
+
+_embedded_workers = []
+_embedded_workers_lock = threading.Lock()
+
+@app.before_request
+def start_embedded_workers():
+    if not app.config['JOB_EMBEDDED_WORKERS'] or _embedded_workers:
+        return
+    with _embedded_workers_lock:
+        for i in range(app.config['JOB_EMBEDDED_WORKERS'] - len(_embedded_workers)):
+            worker_id = f'{socket.gethostname()}:{os.getpid()}:embedded-{i}'
+            thread = threading.Thread(target=run_worker, args=(worker_id,), name=worker_id, daemon=True)
+            thread.start()
+            _embedded_workers.append(thread)
+
+def schedule_insight_precompute(user_id):
+    enqueue_job('precompute_insights', {'user_id': user_id}, user_id=user_id, unique=True)
+
+if app.config['PRECOMPUTE_INSIGHTS']:
+    insight_cache.invalidation_listeners.append(schedule_insight_precompute)
+
+@job_handler('precompute_insights')
+def precompute_insights_job(payload):
+    get_cached_insights(payload['user_id'])
+    get_forecast_model(payload['user_id'])
+
+@job_handler('rebuild_rollups')
+def rebuild_rollups_job(payload):
+    rows = rebuild_monthly_rollups(payload.get('user_id'))
+    db.session.commit()
+    if payload.get('user_id') is not None:
+        insight_cache.invalidate(payload['user_id'])
+    return {'rows': rows}
+
+# Imports commit batch by batch, so retrying a half-finished import would duplicate rows
+@job_handler('import_transactions', max_attempts=1)
+def import_transactions_job(payload):
+    try:
+        with open(payload['path'], encoding='utf-8-sig', errors='replace', newline='') as stream:
+            stats = import_transactions(payload['user_id'], iter_import_file(stream, payload['filename'], payload.get('format')))
+    finally:
+        os.remove(payload['path'])
+    return stats
+
+@job_handler('reconcile_budgets')
+def reconcile_budgets_job(payload):
+    fixed = reconcile_budget_spent(payload.get('user_id'))
+    db.session.commit()
+    return {'fixed': fixed}
+
+@job_handler('roll_budgets')
+def roll_budgets_job(payload):
+    frozen, opened = roll_budgets_forward(user_id=payload.get('user_id'))
+    return {'frozen': frozen, 'opened': opened}
+
+@job_handler('export_analytics')
+def export_analytics_job(payload):
+    return {'written': export_year_columns(payload['user_id'], rewrite=payload.get('rewrite', False))}
+
+@job_handler('detect_recurring')
+def detect_recurring_job(payload):
+    return {'proposed': detect_recurring_rules(payload.get('user_id'))}
+
+@job_handler('materialize_recurring')
+def materialize_recurring_job(payload):
+    return {'created': materialize_recurring_rules()}
+
+@app.route('/jobs')
+@login_required
+def jobs():
+    recent = Job.query.filter_by(user_id=session['user_id']).order_by(Job.created_at.desc()).limit(20)
+    return jsonify({'jobs': [job.to_dict() for job in recent]})
+
+@app.route('/jobs/<int:job_id>')
+@login_required
+def job_status(job_id):
+    job = Job.query.filter_by(id=job_id, user_id=session['user_id']).first_or_404()
+    return jsonify(job.to_dict())
+
+@app.cli.command('worker')
+@click.option('--threads', type=int, default=1, show_default=True, help='Worker threads in this process.')
+@click.option('--poll-interval', type=float, default=1.0, show_default=True, help='Seconds to wait when the queue is empty.')
+@click.option('--burst', is_flag=True, help='Exit once the queue is empty.')
+def worker_command(threads, poll_interval, burst):
+    """Run queued background jobs."""
+    prefix = f'{socket.gethostname()}:{os.getpid()}'
+    stop = threading.Event()
+    workers = [
+        threading.Thread(target=run_worker, args=(f'{prefix}:{i}', poll_interval, burst, stop), daemon=True)
+        for i in range(threads)
+    ]
+    for thread in workers:
+        thread.start()
+    try:
+        for thread in workers:
+            while thread.is_alive():
+                thread.join(0.5)
+    except KeyboardInterrupt:
+        stop.set()
+        click.echo('Stopping after the current jobs finish...')
+        for thread in workers:
+            thread.join()
+
+@app.cli.command('enqueue-job')
+@click.argument('kind', type=click.Choice(sorted(JOB_HANDLERS)))
+@click.option('--user', 'username', help='User the job is for.')
+@click.option('--payload', default='{}', help='JSON payload.')
+def enqueue_job_command(kind, username, payload):
+    """Queue a background job."""
+    payload = json.loads(payload)
+    user_id = None
+    if username:
+        user = User.query.filter_by(username=username).first()
+        if not user:
+            raise click.ClickException(f'User {username} not found')
+        user_id = payload.setdefault('user_id', user.id)
+    job = enqueue_job(kind, payload, user_id=user_id)
+    click.echo(f'Queued job {job.id} ({kind})')
+
+# Notifications: thresholds crossed by a write are logged in AlertLog and
+# sent by a 'deliver_alerts' job, as one digest when several are pending.
+class FileAlertSender:
+    """Appends each message to a local file; the default for development"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def send(self, to, subject, body):
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.write(f'To: {to}\nSubject: {subject}\nDate: {datetime.utcnow().isoformat()}\n\n{body}\n\n')
+
+class SMTPAlertSender:
+    """Sends email over SMTP; point it at `python -m aiosmtpd -n -l localhost:1025` to test locally"""
+
+    def __init__(self, host, port, sender):
+        self.host = host
+        self.port = port
+        self.sender = sender
+
+    def send(self, to, subject, body):
+        message = EmailMessage()
+        message['From'] = self.sender
+        message['To'] = to
+        message['Subject'] = subject
+        message.set_content(body)
+        with smtplib.SMTP(self.host, self.port, timeout=10) as smtp:
+            smtp.send_message(message)
+
+def create_alert_sender():
+    if app.config['ALERT_SENDER'] == 'smtp':
+        return SMTPAlertSender(app.config['ALERT_SMTP_HOST'], app.config['ALERT_SMTP_PORT'], app.config['ALERT_FROM'])
+    return FileAlertSender(app.config['ALERT_FILE_PATH'])
+
+alert_sender = create_alert_sender()
+
+def record_alerts(user_id, kind, subject_id, period, percent, thresholds, describe):
+    """Log each threshold `percent` has reached that has not fired yet this period, and return the new alerts"""
+    reached = [threshold for threshold in sorted(thresholds) if percent >= threshold]
+    if not reached:
+        return []
+    fired = {threshold for (threshold,) in db.session.query(AlertLog.threshold).filter_by(
+        user_id=user_id, kind=kind, subject_id=subject_id, period=period
+    )}
+    alerts = []
+    for threshold in reached:
+        if threshold in fired:
+            continue
+        alert = AlertLog(user_id=user_id, kind=kind, subject_id=subject_id, period=period,
+                         threshold=threshold, message=describe(threshold))
+        try:
+            with db.session.begin_nested():
+                db.session.add(alert)
+        except IntegrityError:
+            # A concurrent request logged this threshold first
+            continue
+        alerts.append(alert)
+    # Jumping past several thresholds at once only needs the highest one announced
+    for alert in alerts[:-1]:
+        alert.status = 'skipped'
+    return alerts[-1:]
+
+def evaluate_alerts(user, category=None, date=None, goal=None):
+    """Check only the budget (user, category, month of `date`) and the goal a write touched.
+
+    New alerts are committed and, for users with email notifications on,
+    queued for delivery; they are also returned so the caller can show them.
+    """
+    alerts = []
+    if user.budget_alerts and category and date:
+        budget = Budget.query.filter(
+            Budget.user_id == user.id,
+            Budget.category == category,
+            Budget.month <= date,
+            Budget.period_end > date
+        ).first()
+        if budget and budget.available > 0:
+            spent = budget.spent or 0.0
+            usage = f'${spent:,.2f} of ${budget.available:,.2f} spent in {format_budget_period(budget.month, budget.period_end)}'
+            alerts += record_alerts(
+                user.id, 'budget', budget.id, budget.month.strftime('%Y-%m'), spent * 100 / budget.available,
+                app.config['ALERT_BUDGET_THRESHOLDS'],
+                lambda threshold: (f'You are over your {category} budget: {usage}.' if threshold >= 100
+                                   else f'You have used {threshold}% of your {category} budget: {usage}.')
+            )
+    if user.goal_updates and goal is not None and goal.target_amount > 0:
+        alerts += record_alerts(
+            user.id, 'goal', goal.id, '', (goal.current_amount or 0) * 100 / goal.target_amount,
+            app.config['ALERT_GOAL_THRESHOLDS'],
+            lambda threshold: (f'Goal reached: you have saved ${goal.target_amount:,.2f} for {goal.name}!' if threshold >= 100
+                               else f'{goal.name} is {threshold}% of the way to ${goal.target_amount:,.2f}.')
+        )
+    if not alerts:
+        return []
+    
+    if not user.email_notifications:
+        for alert in alerts:
+            alert.status = 'skipped'
+    db.session.commit()
+    if user.email_notifications:
+        # The delay lets a burst of alerts go out together as one digest
+        enqueue_job('deliver_alerts', {'user_id': user.id}, user_id=user.id,
+                    delay=app.config['ALERT_DELIVERY_DELAY'], unique=True)
+    return alerts
+
+@job_handler('deliver_alerts')
+def deliver_alerts_job(payload):
+    user = db.session.get(User, payload['user_id'])
+    pending = AlertLog.query.filter_by(user_id=user.id, status='pending').order_by(AlertLog.id).all()
+    if not pending:
+        return {'sent': 0}
+    if not user.email_notifications:
+        for alert in pending:
+            alert.status = 'skipped'
+        db.session.commit()
+        return {'sent': 0}
+    
+    if len(pending) >= app.config['ALERT_DIGEST_MIN']:
+        alert_sender.send(user.email, f'{len(pending)} new budget and goal alerts',
+                          '\n'.join(f'- {alert.message}' for alert in pending))
+        for alert in pending:
+            alert.status = 'sent'
+            alert.sent_at = datetime.utcnow()
+        db.session.commit()
+        return {'sent': len(pending), 'digest': True}
+    
+    for alert in pending:
+        alert_sender.send(user.email, alert.message, alert.message)
+        # Commit per message so a retry after a failed send skips the ones already sent
+        alert.status = 'sent'
+        alert.sent_at = datetime.utcnow()
+        db.session.commit()
+    return {'sent': len(pending), 'digest': False}
+
+@app.cli.command('rebuild-rollups')
+@click.option('--user', 'username', help='Only rebuild rollups for this username.')
+def rebuild_rollups_command(username):
+    """Regenerate the monthly category rollup table from transactions."""
+    user_id = None
+    if username:
+        user = User.query.filter_by(username=username).first()
+        if not user:
+            raise click.ClickException(f'User {username} not found')
+        user_id = user.id
+    rows = rebuild_monthly_rollups(user_id)
+    db.session.commit()
+    if user_id is not None:
+        insight_cache.invalidate(user_id)
+    click.echo(f'Rebuilt {rows} monthly rollup rows')
+
+@app.cli.command('reconcile-budgets')
+@click.option('--user', 'username', help='Only reconcile this username.')
+def reconcile_budgets_command(username):
+    """Recompute Budget.spent from transactions and correct any drift."""
+    user_id = None
+    if username:
+        user = User.query.filter_by(username=username).first()
+        if not user:
+            raise click.ClickException(f'User {username} not found')
+        user_id = user.id
+    fixed = reconcile_budget_spent(user_id)
+    db.session.commit()
+    click.echo(f'Corrected spent on {fixed} budgets')
+
+@app.cli.command('roll-budgets')
+def roll_budgets_command():
+    """Freeze ended budget periods and open the current period of every budget template."""
+    frozen, opened = roll_budgets_forward()
+    click.echo(f'Froze {frozen} closed budget periods, opened {opened} new ones')
+
+@app.cli.command('export-analytics')
+@click.option('--user', 'username', help='Only export this username (defaults to everyone).')
+@click.option('--rewrite', is_flag=True, help='Rewrite years that already have a file.')
+def export_analytics_command(username, rewrite):
+    """Write the yearly .npy analytics files for closed years."""
+    users = User.query
+    if username:
+        users = users.filter_by(username=username)
+        if not users.first():
+            raise click.ClickException(f'User {username} not found')
+    written = 0
+    for (user_id,) in users.with_entities(User.id):
+        written += export_year_columns(user_id, rewrite=rewrite)
+    click.echo(f'Wrote {written} yearly analytics files to {app.config["ANALYTICS_CACHE_DIR"]}')
+
+@app.cli.command('detect-recurring')
+@click.option('--user', 'username', help='Only scan this user (defaults to everyone).')
+def detect_recurring_command(username):
+    """Propose recurring transaction rules from transaction history."""
+    user_id = None
+    if username:
+        user = User.query.filter_by(username=username).first()
+        if not user:
+            raise click.ClickException(f'User {username} not found')
+        user_id = user.id
+    click.echo(f'Proposed {detect_recurring_rules(user_id)} recurring rules')
+
+@app.cli.command('materialize-recurring')
+@click.option('--batch-size', type=int, help='Rules per commit.')
+def materialize_recurring_command(batch_size):
+    """Create the transactions of active recurring rules that have come due."""
+    click.echo(f'Created {materialize_recurring_rules(batch_size=batch_size)} recurring transactions')
+
+@app.cli.command('copy-to-replicas')
+def copy_to_replicas_command():
+    """Copy a SQLite primary onto its SQLite replicas, standing in for replication when testing locally."""
+    primary = make_url(app.config['SQLALCHEMY_DATABASE_URI'])
+    replicas = [make_url(url) for url in app.config['DATABASE_REPLICA_URLS']]
+    if not replicas:
+        raise click.ClickException('DATABASE_REPLICA_URLS is not set')
+    if any(url.get_backend_name() != 'sqlite' or not url.database for url in [primary] + replicas):
+        raise click.ClickException('copy-to-replicas only works with SQLite database files')
+    # Drop pooled connections so no replica connection outlives the copy
+    for engine in db.engines.values():
+        engine.dispose()
+    source = sqlite3.connect(primary.database)
+    try:
+        for url in replicas:
+            target = sqlite3.connect(url.database)
+            try:
+                source.backup(target)
+            finally:
+                target.close()
+            click.echo(f'Copied {primary.database} to {url.database}')
+    finally:
+        source.close()
+
+@app.cli.command('run-scheduler')
+@click.option('--interval', type=int, default=300, show_default=True, help='Seconds between runs.')
+def run_scheduler_command(interval):
+    """Materialize due recurring transactions and roll budgets forward in a loop (run one scheduler per deployment)."""
+    while True:
+        # Roll budgets first so recurring expenses on the 1st land in the new period
+        frozen, opened = roll_budgets_forward()
+        if opened:
+            click.echo(f'{datetime.now():%Y-%m-%d %H:%M:%S} opened {opened} budget periods, froze {frozen}')
+        created = materialize_recurring_rules()
+        if created:
+            click.echo(f'{datetime.now():%Y-%m-%d %H:%M:%S} created {created} recurring transactions')
+        db.session.remove()
+        time.sleep(interval)
+
+@app.cli.command('import-transactions')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--user', 'username', required=True, help='Username to import the transactions for.')
+@click.option('--format', 'format', type=click.Choice(['csv', 'ofx']), help='File format (defaults to the file extension).')
+@click.option('--batch-size', type=int, help='Rows per bulk insert.')
+def import_transactions_command(path, username, format, batch_size):
+    """Stream a CSV or OFX bank export into a user's transactions."""
+    user = User.query.filter_by(username=username).first()
+    if not user:
+        raise click.ClickException(f'User {username} not found')
+    with open(path, encoding='utf-8-sig', errors='replace', newline='') as stream:
+        stats = import_transactions(user.id, iter_import_file(stream, path, format), batch_size)
+    for error in stats['errors']:
+        click.echo(error, err=True)
+    click.echo(f"Imported {stats['imported']} rows in {stats['batches']} batches, "
+               f"rejected {stats['rejected']}, {stats['seconds']:.1f}s ({stats['rows_per_second']:.0f} rows/s)")
+
 @app.route('/add_debt', methods=['POST'])
 @login_required
 def add_debt():
@@ -1091,6 +3876,7 @@ def add_debt():
         
         db.session.add(new_debt)
         db.session.commit()
+        insight_cache.invalidate(session['user_id'])
         
         return jsonify({'success': True, 'message': 'Debt added successfully'})
     except Exception as e:
@@ -1115,6 +3901,7 @@ def update_debt(debt_id):
                 debt.next_payment_date = debt.next_payment_date + timedelta(days=30)
         
         db.session.commit()
+        insight_cache.invalidate(session['user_id'])
         return jsonify({'success': True, 'message': 'Debt updated successfully'})
     except Exception as e:
         db.session.rollback()
@@ -1127,6 +3914,7 @@ def delete_debt(debt_id):
         debt = Debt.query.filter_by(id=debt_id, user_id=session['user_id']).first_or_404()
         db.session.delete(debt)
         db.session.commit()
+        insight_cache.invalidate(session['user_id'])
         return jsonify({'success': True, 'message': 'Debt deleted successfully'})
     except Exception as e:
         db.session.rollback()
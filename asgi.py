@@ -0,0 +1,22 @@
+"""ASGI entry point: the Flask app with its async views enabled.
+
+    uvicorn asgi:app --workers 4
+
+Async views share the worker's pooled asyncio engines (one for the primary
+and one per read replica), bound to the server's event loop; see the async
+serving section of app.py.
+"""
+import asyncio
+import os
+
+os.environ.setdefault('ASYNC_VIEWS', '1')
+
+from asgiref.wsgi import WsgiToAsgi  # noqa: E402
+from app import app as flask_app, async_server_loops  # noqa: E402
+
+wsgi_to_asgi = WsgiToAsgi(flask_app)
+
+
+async def app(scope, receive, send):
+    async_server_loops.add(asyncio.get_running_loop())
+    await wsgi_to_asgi(scope, receive, send)
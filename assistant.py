@@ -0,0 +1,102 @@
+"""Intent routing and answers for the /ai_query assistant.
+
+INTENTS lists, in priority order, the keywords that select each intent and
+the context slices its answer needs. IntentIndex compiles every keyword
+into one character trie, so route() finds the winning intent in one pass
+over the query, looking at most one keyword length ahead from each
+character, however many keywords there are. A keyword matches
+anywhere in the query, like the substring checks it replaced ('spend'
+matches 'overspending').
+
+respond() only reads the slices its intent asked for; app.py fetches them.
+"""
+from collections import namedtuple
+
+Intent = namedtuple('Intent', 'name keywords slices')
+
+INTENTS = (
+    Intent('spending', ('spend', 'expense', 'cost', 'money'), ('summary',)),
+    Intent('savings', ('save', 'savings', 'goal'), ('savings_goals',)),
+    Intent('budget', ('budget', 'limit'), ('budgets',)),
+    Intent('debt', ('debt', 'loan', 'credit'), ('debts',)),
+)
+DEFAULT_RESPONSE = "I can help you analyze your spending, savings goals, budgets, and debts. What would you like to know about?"
+
+_END = ''  # trie key holding the priority of the keyword that ends at a node
+
+
+class IntentIndex:
+    """Character trie over the keywords of a list of intents"""
+
+    def __init__(self, intents):
+        self.intents = tuple(intents)
+        self.root = {}
+        self.depth = max((len(keyword) for intent in self.intents for keyword in intent.keywords), default=0)
+        for priority, intent in enumerate(self.intents):
+            for keyword in intent.keywords:
+                node = self.root
+                for char in keyword.lower():
+                    node = node.setdefault(char, {})
+                node[_END] = min(node.get(_END, priority), priority)
+
+    def route(self, query):
+        """The highest-priority intent with a keyword in the query, or None"""
+        query = query.lower()
+        best = len(self.intents)
+        for start in range(len(query)):
+            node = self.root
+            for char in query[start:start + self.depth]:
+                node = node.get(char)
+                if node is None:
+                    break
+                best = min(best, node.get(_END, best))
+            if best == 0:
+                break
+        return self.intents[best] if best < len(self.intents) else None
+
+
+index = IntentIndex(INTENTS)
+
+
+def route(query):
+    return index.route(query)
+
+
+def respond(intent, context):
+    """The answer for a routed intent, given the context slices it declared"""
+    if intent is None:
+        return DEFAULT_RESPONSE
+
+    if intent.name == 'spending':
+        summary = context['summary']
+        if summary['total_expenses'] > summary['total_income']:
+            return f"Your expenses (${summary['total_expenses']:.2f}) are higher than your income (${summary['total_income']:.2f}). Consider reviewing your spending habits."
+        return f"Your spending looks healthy! You've spent ${summary['total_expenses']:.2f} out of ${summary['total_income']:.2f} income."
+
+    if intent.name == 'savings':
+        if not context['savings_goals']:
+            return "You haven't set any savings goals yet. Consider setting some to help track your progress!"
+        goals_status = []
+        for goal in context['savings_goals']:
+            progress = goal['current_amount'] / goal['target_amount'] * 100 if goal['target_amount'] else 0.0
+            goals_status.append(f"{goal['name']}: {progress:.1f}% complete")
+        return "Your savings goals:\n" + "\n".join(goals_status)
+
+    if intent.name == 'budget':
+        if not context['budgets']:
+            return "You haven't set any budgets yet. Setting budgets can help you manage your spending better!"
+        budget_status = []
+        for budget in context['budgets']:
+            # Against the limit plus carry-over, as on /budget
+            usage = budget['spent'] / budget['available'] * 100 if budget['available'] else 0.0
+            status = "over" if usage > 100 else "under"
+            budget_status.append(f"{budget['category']}: {usage:.1f}% of budget ({status})")
+        return "Your budget status:\n" + "\n".join(budget_status)
+
+    if intent.name == 'debt':
+        if not context['debts']:
+            return "You don't have any active debts recorded. That's great!"
+        total_debt = sum(d['balance'] for d in context['debts'])
+        return f"You have {len(context['debts'])} active debts totaling ${total_debt:.2f}. Consider focusing on paying off high-interest debts first."
+
+    return DEFAULT_RESPONSE
@@ -0,0 +1,137 @@
+"""Time /ai_query over a stream of assistant questions against a synthetic dataset.
+
+Usage:
+    python benchmarks/ai_query_benchmark.py --queries 10000 --users 50
+
+Reports latency percentiles and SQL statements per request for the full
+endpoint. Questions whose form has not been asked before (and so is parsed
+and compiled) are reported apart from repeats, which reuse the cached plan
+and context. The cost of lexing, parsing and intent routing alone is
+reported as well. The database is a throwaway SQLite file unless
+--database-url is given.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+parser.add_argument('--queries', type=int, default=10_000, help='number of questions to send')
+parser.add_argument('--users', type=int, default=50, help='number of synthetic users')
+parser.add_argument('--years', type=int, default=2, help='years of history per user')
+parser.add_argument('--seed', type=int, default=42, help='random seed for data and question order')
+parser.add_argument('--database-url', help='load an existing empty database instead of SQLite')
+args = parser.parse_args()
+
+if args.database_url:
+    os.environ['DATABASE_URL'] = args.database_url
+else:
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'ai_query_benchmark.db')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sqlalchemy import event  # noqa: E402
+from sqlalchemy.engine import Engine  # noqa: E402
+import assistant  # noqa: E402
+import nlquery  # noqa: E402
+from app import app, db  # noqa: E402
+from synthetic_data import INCOME_CATEGORIES, expense_categories, seed_and_rollup  # noqa: E402
+
+QUESTIONS = [
+    'How much did I spend this month?',
+    'How much did I spend on Dining in March vs February?',
+    'How much did I spend on Groceries in May vs April?',
+    'How many Transportation expenses last month?',
+    'How many transactions did I make this month?',
+    'How many transactions in the last 3 months?',
+    'What did I earn last year?',
+    'Spending by category over the last 3 months',
+    'How much is left in my Dining budget?',
+    'Is my spending too high?',
+    'What did groceries cost me?',
+    'How are my savings goals going?',
+    'Will I reach my goal in time?',
+    'Am I within my budget?',
+    'Which budget limit did I go over?',
+    'What about my debts?',
+    'Should I pay off my credit card or my loan first?',
+    'Give me some advice',
+    'hello',
+]
+
+statements = 0
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _count_statement(*_):
+    global statements
+    statements += 1
+
+
+def percentiles(values):
+    cuts = statistics.quantiles(values, n=100, method='inclusive') if len(values) > 1 else values * 99
+    return cuts[49], cuts[94], cuts[98]
+
+
+def report(name, latencies, counts):
+    if not latencies:
+        return
+    p50, p95, p99 = percentiles(latencies)
+    print(f'{name:<24} {len(latencies):>7} {p50:>9.3f} {p95:>9.3f} {p99:>9.3f} {statistics.mean(counts):>8.2f}')
+
+
+def main():
+    global statements
+    rng = random.Random(args.seed)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        user_ids, written = seed_and_rollup(users=args.users, years=args.years, seed=args.seed)
+        db.session.remove()
+    print(f'Seeded {written:,} transactions for {len(user_ids)} users')
+
+    jobs = [(rng.choice(user_ids), rng.choice(QUESTIONS)) for _ in range(args.queries)]
+
+    categories = expense_categories(6) + INCOME_CATEGORIES
+    start = time.perf_counter()
+    for _, question in jobs:
+        if nlquery.parse(nlquery.lex(question, categories)[0]) is None:
+            assistant.route(question)
+    parsing_us = (time.perf_counter() - start) * 1e6 / len(jobs)
+
+    clients = {}
+    for user_id in user_ids:
+        clients[user_id] = app.test_client()
+        with clients[user_id].session_transaction() as session:
+            session['user_id'] = user_id
+
+    seen = set()
+    results = {'first': ([], []), 'repeat': ([], [])}
+    errors = 0
+    start = time.perf_counter()
+    for user_id, question in jobs:
+        statements = 0
+        began = time.perf_counter()
+        response = clients[user_id].post('/ai_query', json={'query': question})
+        elapsed = (time.perf_counter() - began) * 1000
+        errors += response.status_code >= 400
+        latencies, counts = results['repeat' if question in seen else 'first']
+        latencies.append(elapsed)
+        counts.append(statements)
+        seen.add(question)
+    wall = time.perf_counter() - start
+
+    print(f'\n{len(jobs)} queries in {wall:.1f}s ({len(jobs) / wall:.0f} q/s), {errors} errors')
+    print(f"{'':<24} {'queries':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'SQL/req':>8}")
+    report('new question form', *results['first'])
+    report('repeated form', *results['repeat'])
+    report('all', results['first'][0] + results['repeat'][0], results['first'][1] + results['repeat'][1])
+    print(f'lexing, parsing and routing alone: {parsing_us:.2f} us per query')
+    if errors:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
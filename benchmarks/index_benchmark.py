@@ -0,0 +1,166 @@
+"""Compare query plans and timings of the hot app.py queries with and without
+the composite indexes declared on the models.
+
+Usage:
+    python benchmarks/index_benchmark.py --rows 2000000 --users 200
+
+The database is a throwaway SQLite file unless --database-url is given.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+parser.add_argument('--rows', type=int, default=2_000_000, help='number of transactions to seed')
+parser.add_argument('--users', type=int, default=200, help='number of users to spread them over')
+parser.add_argument('--years', type=int, default=5, help='years of history to generate')
+parser.add_argument('--repeat', type=int, default=20, help='timed runs per query')
+parser.add_argument('--database-url', help='benchmark an existing empty database instead of SQLite')
+args = parser.parse_args()
+
+if args.database_url:
+    os.environ['DATABASE_URL'] = args.database_url
+else:
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'index_benchmark.db')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app import app, db, User, Transaction, Budget, Goal, Debt, month_start, add_months  # noqa: E402
+
+EXPENSE_CATEGORIES = ['Groceries', 'Dining', 'Transportation', 'Entertainment', 'Shopping', 'Bills']
+INCOME_CATEGORIES = ['Salary', 'Freelance', 'Investments', 'Gifts']
+INDEXED_TABLES = [Transaction.__table__, Budget.__table__, Goal.__table__, Debt.__table__]
+
+
+def seed(connection):
+    """Insert users, transactions and budgets in large executemany batches"""
+    connection.execute(User.__table__.insert(), [
+        {'username': f'bench{i}', 'email': f'bench{i}@example.com', 'password': 'x'}
+        for i in range(1, args.users + 1)
+    ])
+    now = datetime.now()
+    span = args.years * 365 * 24 * 3600
+    batch = []
+    for _ in range(args.rows):
+        is_income = random.random() < 0.2
+        batch.append({
+            'amount': round(random.uniform(100, 3000) if is_income else random.uniform(5, 300), 2),
+            'category': random.choice(INCOME_CATEGORIES if is_income else EXPENSE_CATEGORIES),
+            'type': 'income' if is_income else 'expense',
+            'date': now - timedelta(seconds=random.randrange(span)),
+            'user_id': random.randint(1, args.users)
+        })
+        if len(batch) == 50_000:
+            connection.execute(Transaction.__table__.insert(), batch)
+            batch = []
+    if batch:
+        connection.execute(Transaction.__table__.insert(), batch)
+
+    current_month = month_start(now)
+    connection.execute(Budget.__table__.insert(), [
+        {'category': category, 'limit': 500.0, 'spent': 0.0,
+         'month': add_months(current_month, -offset), 'user_id': user_id}
+        for user_id in range(1, args.users + 1)
+        for category in EXPENSE_CATEGORIES
+        for offset in range(args.years * 12)
+    ])
+
+
+def hot_queries(user_id):
+    """The query shapes issued by the dashboard, budget and transaction views"""
+    current_month = month_start(datetime.now())
+    window_start = add_months(current_month, -5)
+    year_col = db.extract('year', Transaction.date)
+    month_col = db.extract('month', Transaction.date)
+    return {
+        'recent transactions': db.select(Transaction).where(
+            Transaction.user_id == user_id
+        ).order_by(Transaction.date.desc()).limit(5),
+        'biggest expense': db.select(Transaction).where(
+            Transaction.user_id == user_id, Transaction.type == 'expense'
+        ).order_by(Transaction.amount.desc()).limit(1),
+        'six month category totals': db.select(
+            year_col, month_col, Transaction.type, Transaction.category, db.func.sum(Transaction.amount)
+        ).where(
+            Transaction.user_id == user_id, Transaction.date >= window_start
+        ).group_by(year_col, month_col, Transaction.type, Transaction.category),
+        'category month spend': db.select(db.func.sum(Transaction.amount)).where(
+            Transaction.user_id == user_id,
+            Transaction.category == 'Dining',
+            Transaction.type == 'expense',
+            Transaction.date >= current_month,
+            Transaction.date < add_months(current_month, 1)
+        ),
+        'current month budgets': db.select(Budget).where(
+            Budget.user_id == user_id,
+            Budget.month >= current_month,
+            Budget.month < add_months(current_month, 1)
+        ),
+    }
+
+
+def explain(connection, statement):
+    compiled = statement.compile(connection, compile_kwargs={'literal_binds': True})
+    prefix = 'EXPLAIN QUERY PLAN ' if connection.dialect.name == 'sqlite' else 'EXPLAIN '
+    rows = connection.exec_driver_sql(prefix + str(compiled)).fetchall()
+    return [' | '.join(str(value) for value in row) for row in rows]
+
+
+def measure(connection, label, user_id):
+    print(f'\n=== {label} ===')
+    results = {}
+    for name, statement in hot_queries(user_id).items():
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            connection.execute(statement).fetchall()
+            timings.append((time.perf_counter() - start) * 1000)
+        results[name] = statistics.median(timings)
+        print(f'{name}: median {results[name]:.2f} ms')
+        for line in explain(connection, statement):
+            print(f'    {line}')
+    return results
+
+
+def main():
+    random.seed(42)
+    user_id = random.randint(1, args.users)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        engine = db.engine
+        with engine.begin() as connection:
+            for table in INDEXED_TABLES:
+                for index in table.indexes:
+                    index.drop(connection)
+            start = time.perf_counter()
+            seed(connection)
+            print(f'Seeded {args.rows:,} transactions for {args.users} users in {time.perf_counter() - start:.1f}s')
+
+        with engine.connect() as connection:
+            before = measure(connection, 'without composite indexes', user_id)
+
+        with engine.begin() as connection:
+            start = time.perf_counter()
+            for table in INDEXED_TABLES:
+                for index in table.indexes:
+                    index.create(connection)
+            if connection.dialect.name == 'sqlite':
+                connection.exec_driver_sql('ANALYZE')
+            print(f'\nCreated indexes in {time.perf_counter() - start:.1f}s')
+
+        with engine.connect() as connection:
+            after = measure(connection, 'with composite indexes', user_id)
+
+    print('\n=== summary (median ms) ===')
+    for name in before:
+        speedup = before[name] / after[name] if after[name] else float('inf')
+        print(f'{name:<28} {before[name]:>10.2f} {after[name]:>10.2f}   x{speedup:.1f}')
+
+
+if __name__ == '__main__':
+    main()
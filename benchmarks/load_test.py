@@ -0,0 +1,208 @@
+"""Drive the main pages concurrently against a synthetic dataset and report
+latency percentiles, SQL statements per request and peak RSS.
+
+Usage:
+    python benchmarks/load_test.py --users 200 --years 5 --requests 200 --concurrency 8
+    python benchmarks/load_test.py --write-baseline benchmarks/baseline.json
+    python benchmarks/load_test.py --baseline benchmarks/baseline.json --tolerance 0.25
+
+The database is a throwaway SQLite file unless --database-url is given (an
+empty local MySQL database works too). With --baseline the run exits
+non-zero when an endpoint's p95 regresses by more than --tolerance or it
+issues more SQL statements per request than the baseline did.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+parser.add_argument('--users', type=int, default=100, help='number of synthetic users')
+parser.add_argument('--years', type=int, default=3, help='years of history per user')
+parser.add_argument('--transactions-per-month', type=int, default=60, help='day-to-day expenses per user per month')
+parser.add_argument('--categories', type=int, default=6, help='number of expense categories')
+parser.add_argument('--requests', type=int, default=100, help='requests per endpoint')
+parser.add_argument('--concurrency', type=int, default=4, help='worker threads issuing requests')
+parser.add_argument('--seed', type=int, default=42, help='random seed for data and request order')
+parser.add_argument('--database-url', help='load an existing empty database instead of SQLite')
+parser.add_argument('--write-baseline', metavar='PATH', help='write the results as a JSON baseline')
+parser.add_argument('--baseline', metavar='PATH', help='compare against a JSON baseline')
+parser.add_argument('--tolerance', type=float, default=0.25, help='allowed relative p95 regression')
+args = parser.parse_args()
+
+if args.database_url:
+    os.environ['DATABASE_URL'] = args.database_url
+else:
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'load_test.db')
+os.environ.setdefault('ANALYTICS_CACHE_DIR', tempfile.mkdtemp())
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sqlalchemy import event  # noqa: E402
+from sqlalchemy.engine import Engine  # noqa: E402
+from app import app, db  # noqa: E402
+from synthetic_data import seed_and_rollup  # noqa: E402
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+AI_QUERIES = [
+    'How much did I spend this month?',
+    'How are my savings goals going?',
+    'Am I within my budget?',
+    'What about my debts?',
+    'Give me some advice',
+]
+ENDPOINTS = {
+    'dashboard': ('GET', '/dashboard'),
+    'dashboard summary widget': ('GET', '/api/v1/dashboard/summary'),
+    'dashboard monthly_trend widget': ('GET', '/api/v1/dashboard/monthly_trend'),
+    'dashboard insights widget': ('GET', '/api/v1/dashboard/insights'),
+    'dashboard forecast widget': ('GET', '/api/v1/dashboard/forecast'),
+    'reports': ('GET', '/reports'),
+    'yearly analytics': ('GET', '/api/v1/analytics/yearly'),
+    'yearly category analytics': ('GET', '/api/v1/analytics/yearly/categories'),
+    'budget': ('GET', '/budget'),
+    'transactions': ('GET', '/transactions'),
+    'ai_query': ('POST', '/ai_query'),
+}
+
+# The test client runs each request on the calling thread, so a thread-local
+# counter attributes statements to the request that issued them.
+_local = threading.local()
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _count_statement(*_):
+    _local.statements = getattr(_local, 'statements', 0) + 1
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def run_request(job):
+    name, user_id, query = job
+    method, path = ENDPOINTS[name]
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = user_id
+    _local.statements = 0
+    start = time.perf_counter()
+    if method == 'POST':
+        response = client.post(path, json={'query': query})
+    else:
+        response = client.get(path)
+    elapsed = (time.perf_counter() - start) * 1000
+    return name, elapsed, _local.statements, response.status_code
+
+
+def percentile(values, pct):
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method='inclusive')[pct - 1]
+
+
+def summarize(results):
+    summary = {}
+    for name in ENDPOINTS:
+        rows = [r for r in results if r[0] == name]
+        latencies = [r[1] for r in rows]
+        statements = [r[2] for r in rows]
+        summary[name] = {
+            'requests': len(rows),
+            'errors': sum(1 for r in rows if r[3] >= 400),
+            'p50_ms': round(percentile(latencies, 50), 2),
+            'p95_ms': round(percentile(latencies, 95), 2),
+            'p99_ms': round(percentile(latencies, 99), 2),
+            'queries_mean': round(statistics.mean(statements), 2),
+            'queries_max': max(statements),
+        }
+    return summary
+
+
+def compare(baseline, summary):
+    """Print per-endpoint deltas against a baseline and return the regressions"""
+    regressions = []
+    print(f'\n=== against baseline {args.baseline} ===')
+    for name, current in summary.items():
+        previous = baseline['endpoints'].get(name)
+        if previous is None:
+            print(f'{name:<32} (not in baseline)')
+            continue
+        change = (current['p95_ms'] - previous['p95_ms']) / previous['p95_ms'] if previous['p95_ms'] else 0.0
+        print(f"{name:<32} p95 {previous['p95_ms']:>9.2f} -> {current['p95_ms']:>9.2f} ms ({change:+.0%})"
+              f"   queries {previous['queries_max']} -> {current['queries_max']}")
+        if change > args.tolerance:
+            regressions.append(f'{name}: p95 up {change:.0%}')
+        if current['queries_max'] > previous['queries_max']:
+            regressions.append(f"{name}: {current['queries_max']} statements per request, was {previous['queries_max']}")
+    return regressions
+
+
+def main():
+    rng = random.Random(args.seed)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        start = time.perf_counter()
+        user_ids, written = seed_and_rollup(
+            users=args.users, years=args.years, transactions_per_month=args.transactions_per_month,
+            categories=args.categories, seed=args.seed
+        )
+        db.session.remove()
+    print(f'Seeded {written:,} transactions for {len(user_ids)} users in {time.perf_counter() - start:.1f}s')
+
+    jobs = [(name, rng.choice(user_ids), rng.choice(AI_QUERIES)) for name in ENDPOINTS for _ in range(args.requests)]
+    rng.shuffle(jobs)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(run_request, jobs))
+    wall = time.perf_counter() - start
+
+    summary = summarize(results)
+    print(f'\n{len(jobs)} requests in {wall:.1f}s ({len(jobs) / wall:.0f} req/s) with {args.concurrency} workers')
+    print(f"{'endpoint':<32} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'queries':>8} {'errors':>7}")
+    for name, row in summary.items():
+        print(f"{name:<32} {row['p50_ms']:>9.2f} {row['p95_ms']:>9.2f} {row['p99_ms']:>9.2f}"
+              f" {row['queries_mean']:>8.1f} {row['errors']:>7}")
+    rss = peak_rss_mb()
+    print(f'peak RSS: {rss} MB' if rss is not None else 'peak RSS: unavailable on this platform')
+
+    report = {
+        'config': {key: value for key, value in vars(args).items()
+                   if key not in ('database_url', 'write_baseline', 'baseline', 'tolerance')},
+        'database': app.config['SQLALCHEMY_DATABASE_URI'].split(':', 1)[0],
+        'throughput_rps': round(len(jobs) / wall, 1),
+        'peak_rss_mb': rss,
+        'endpoints': summary,
+    }
+    if args.write_baseline:
+        with open(args.write_baseline, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print(f'Wrote baseline to {args.write_baseline}')
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get('config') != report['config']:
+            print('warning: baseline was recorded with different options')
+        regressions = compare(baseline, summary)
+        if regressions:
+            print('\nRegressions:\n  ' + '\n  '.join(regressions))
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
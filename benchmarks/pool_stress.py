@@ -0,0 +1,105 @@
+"""Hammer the connection pool from many threads and report how checkouts queued.
+
+Usage:
+    python benchmarks/pool_stress.py --threads 32 --pool-size 5 --max-overflow 10
+    python benchmarks/pool_stress.py --threads 64 --pool-size 4 --max-overflow 0 --pool-timeout 1
+
+Each thread checks a connection out of the app's pool, runs a small query,
+optionally holds the connection for --hold-ms to mimic a slow request, and
+gives it back. Reports throughput, checkout wait percentiles, timeouts and
+the peak number of connections in use and in overflow, as the pool metrics
+on /metrics would show them. The database is a throwaway SQLite file unless
+--database-url is given; point it at MySQL to see real connection costs.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+parser.add_argument('--threads', type=int, default=32, help='worker threads checking out connections')
+parser.add_argument('--checkouts', type=int, default=200, help='checkouts per thread')
+parser.add_argument('--hold-ms', type=float, default=2.0, help='time each connection is held after its query')
+parser.add_argument('--pool-size', type=int, default=5, help='DB_POOL_SIZE')
+parser.add_argument('--max-overflow', type=int, default=10, help='DB_MAX_OVERFLOW')
+parser.add_argument('--pool-timeout', type=float, default=30.0, help='DB_POOL_TIMEOUT in seconds')
+parser.add_argument('--no-pre-ping', action='store_true', help='disable DB_POOL_PRE_PING')
+parser.add_argument('--database-url', help='use an existing database instead of SQLite')
+args = parser.parse_args()
+
+if args.database_url:
+    os.environ['DATABASE_URL'] = args.database_url
+else:
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'pool_stress.db')
+os.environ['DB_POOL_SIZE'] = str(args.pool_size)
+os.environ['DB_MAX_OVERFLOW'] = str(args.max_overflow)
+os.environ['DB_POOL_TIMEOUT'] = str(args.pool_timeout)
+os.environ['DB_POOL_PRE_PING'] = '0' if args.no_pre_ping else '1'
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sqlalchemy import text  # noqa: E402
+from app import PoolTimeoutError, app, db, pool_metrics  # noqa: E402
+
+
+def percentile(cuts, p):
+    return cuts[p - 1] if cuts else 0.0
+
+
+def main():
+    with app.app_context():
+        engine = db.engine
+    waits = []
+    peaks = {'in_use': 0, 'overflow': 0}
+    timeouts = 0
+    lock = threading.Lock()
+
+    def worker(_):
+        nonlocal timeouts
+        local_waits, local_timeouts = [], 0
+        for _ in range(args.checkouts):
+            began = time.perf_counter()
+            try:
+                connection = engine.connect()
+            except PoolTimeoutError:
+                local_timeouts += 1
+                continue
+            local_waits.append(time.perf_counter() - began)
+            with connection:
+                connection.execute(text('SELECT 1')).scalar()
+                pool = engine.pool
+                with lock:
+                    peaks['in_use'] = max(peaks['in_use'], pool.checkedout())
+                    peaks['overflow'] = max(peaks['overflow'], pool.overflow())
+                if args.hold_ms:
+                    time.sleep(args.hold_ms / 1000)
+        with lock:
+            waits.extend(local_waits)
+            timeouts += local_timeouts
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as executor:
+        list(executor.map(worker, range(args.threads)))
+    wall = time.perf_counter() - start
+
+    cuts = statistics.quantiles(waits, n=100, method='inclusive') if len(waits) > 1 else waits * 99
+    with app.app_context():
+        metrics = pool_metrics.snapshot(pool_metrics.pool_names()).get('default', {})
+
+    print(f'{args.threads} threads, pool_size={args.pool_size} max_overflow={args.max_overflow} '
+          f'pool_timeout={args.pool_timeout}s pre_ping={not args.no_pre_ping}')
+    print(f'{len(waits):,} checkouts in {wall:.2f}s ({len(waits) / wall:,.0f}/s), {timeouts} timeouts')
+    print(f'checkout wait ms: p50 {percentile(cuts, 50) * 1000:.3f}  p95 {percentile(cuts, 95) * 1000:.3f}  '
+          f'p99 {percentile(cuts, 99) * 1000:.3f}  max {max(waits, default=0) * 1000:.3f}')
+    print(f'peak in use {peaks["in_use"]}, peak overflow {max(peaks["overflow"], 0)}')
+    print(f"pool metrics: {metrics.get('checkouts', 0):,} checkouts, {metrics.get('timeouts', 0)} timeouts, "
+          f"{metrics.get('connects', 0)} connections opened, {metrics.get('invalidations', 0)} invalidated")
+    if timeouts:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""Deterministic synthetic data for the benchmarks.
+
+Generates users with several years of history shaped like real accounts:
+a monthly salary and rent, recurring bills, day-to-day spending spread over
+a configurable number of categories, plus budgets, goals and debts. The
+same seed always produces the same rows.
+
+Must be called inside an app context. Rows go in through executemany
+batches; seed_and_rollup() also rebuilds the monthly rollups and budget
+spent totals afterwards, and freezes the past budget months into snapshots.
+"""
+import random
+from datetime import datetime, timedelta
+
+from app import (db, User, Transaction, Budget, Goal, Debt, month_start, add_months, rebuild_monthly_rollups,
+                 reconcile_budget_spent, freeze_closed_budgets)
+
+BASE_EXPENSE_CATEGORIES = ['Groceries', 'Dining', 'Transportation', 'Entertainment', 'Shopping', 'Bills',
+                           'Utilities', 'Healthcare', 'Education', 'Travel', 'Insurance', 'Personal Care']
+INCOME_CATEGORIES = ['Salary', 'Freelance', 'Investments', 'Gifts']
+BATCH_SIZE = 50_000
+
+
+def expense_categories(count):
+    """The first `count` expense categories, padded with numbered ones past the base list"""
+    names = BASE_EXPENSE_CATEGORIES[:count]
+    names += [f'Category {i}' for i in range(len(names) + 1, count + 1)]
+    return names
+
+
+def _user_transactions(rng, start, end, categories, per_month):
+    salary = round(rng.uniform(2500, 8000), 2)
+    rent = round(salary * rng.uniform(0.2, 0.35), 2)
+    month = month_start(start)
+    while month < end:
+        # Recurring rows: salary on the 25th, rent on the 1st and a utility bill mid-month
+        yield salary, 'Salary', 'income', month.replace(day=25)
+        yield rent, 'Bills', 'expense', month
+        yield round(rng.uniform(40, 120), 2), 'Bills', 'expense', month.replace(day=15)
+        if rng.random() < 0.15:
+            yield round(rng.uniform(100, 1500), 2), rng.choice(INCOME_CATEGORIES[1:]), 'income', \
+                month + timedelta(days=rng.randrange(28))
+
+        # Day-to-day spending, slightly seasonal (more in December)
+        count = int(per_month * (1.3 if month.month == 12 else 1.0))
+        next_month = add_months(month, 1)
+        seconds = int((next_month - month).total_seconds())
+        for _ in range(count):
+            yield round(rng.lognormvariate(3.3, 0.8), 2), rng.choice(categories), 'expense', \
+                month + timedelta(seconds=rng.randrange(seconds))
+        month = next_month
+
+
+def seed_database(connection, users=100, years=3, transactions_per_month=60, categories=6, seed=42):
+    """Insert the synthetic dataset and return (user_ids, transactions written)"""
+    rng = random.Random(seed)
+    names = expense_categories(categories)
+    now = datetime.now()
+    start = add_months(month_start(now), -12 * years)
+    current_month = month_start(now)
+
+    first_id = (connection.execute(db.select(db.func.max(User.id))).scalar() or 0) + 1
+    user_ids = list(range(first_id, first_id + users))
+    connection.execute(User.__table__.insert(), [
+        {'id': user_id, 'username': f'load{user_id}', 'email': f'load{user_id}@example.com', 'password': 'x'}
+        for user_id in user_ids
+    ])
+
+    written = 0
+    batch = []
+    for user_id in user_ids:
+        for amount, category, type_, date in _user_transactions(rng, start, now, names, transactions_per_month):
+            if date > now:
+                continue
+            batch.append({'amount': amount, 'category': category, 'type': type_, 'date': date, 'user_id': user_id})
+            if len(batch) == BATCH_SIZE:
+                connection.execute(Transaction.__table__.insert(), batch)
+                written += len(batch)
+                batch = []
+    if batch:
+        connection.execute(Transaction.__table__.insert(), batch)
+        written += len(batch)
+
+    connection.execute(Budget.__table__.insert(), [
+        {'category': category, 'limit': round(rng.uniform(100, 800), 2), 'spent': 0.0,
+         'month': add_months(current_month, -offset), 'user_id': user_id}
+        for user_id in user_ids
+        for category in names[:6]
+        for offset in range(min(12, 12 * years))
+    ])
+    connection.execute(Goal.__table__.insert(), [
+        {'name': f'Goal {i + 1}', 'target_amount': round(rng.uniform(1000, 20000), 2),
+         'current_amount': round(rng.uniform(0, 1000), 2),
+         'target_date': add_months(current_month, rng.randint(3, 36)), 'user_id': user_id}
+        for user_id in user_ids
+        for i in range(rng.randint(0, 4))
+    ])
+    debts = []
+    for user_id in user_ids:
+        for i in range(rng.randint(0, 3)):
+            original = round(rng.uniform(1000, 50000), 2)
+            paid = round(original * rng.random(), 2)
+            debts.append({
+                'name': f'Debt {i + 1}', 'type': rng.choice(['credit_card', 'loan', 'mortgage']),
+                'balance': round(original - paid, 2), 'original_amount': original, 'paid_amount': paid,
+                'interest_rate': round(rng.uniform(2, 25), 1), 'minimum_payment': round(original * 0.02, 2),
+                'next_payment_date': current_month + timedelta(days=rng.randrange(28)), 'user_id': user_id
+            })
+    if debts:
+        connection.execute(Debt.__table__.insert(), debts)
+    return user_ids, written
+
+
+def seed_and_rollup(**options):
+    """seed_database() in its own transaction, followed by a full rollup and Budget.spent rebuild"""
+    with db.engine.begin() as connection:
+        user_ids, written = seed_database(connection, **options)
+    rebuild_monthly_rollups()
+    reconcile_budget_spent(include_closed=True)
+    freeze_closed_budgets(datetime.now())
+    db.session.commit()
+    return user_ids, written
@@ -0,0 +1,295 @@
+"""Cashflow forecasting from recurring streams plus per-category seasonal baselines.
+
+A model is a JSON-serializable dict, so it can live in any InsightCache
+backend. fit() builds one from a user's recent transactions. update()
+folds new transactions in and refits only the series they touched.
+project() turns a model into month-by-month balances with confidence bands.
+
+Transactions are passed around as (id, date, amount, category, type) rows.
+"""
+import calendar
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import numpy as np
+
+MODEL_VERSION = 1
+PERIODS = (7.0, 14.0, 30.44, 91.31, 365.25)  # weekly, fortnightly, monthly, quarterly, yearly (days)
+CALENDAR_PERIODS = {30.44: 1, 91.31: 3, 365.25: 12}  # periods that fall on the same day of the month
+MIN_OCCURRENCES = 3
+AMOUNT_TOLERANCE = 0.1  # relative spread allowed within one recurring stream
+REGULAR_SHARE = 0.75  # share of gaps that must match the period
+
+
+def month_key(dt):
+    return dt.strftime('%Y-%m')
+
+
+def shift_month(key, months):
+    """'YYYY-MM' moved by a whole number of months"""
+    year, month = map(int, key.split('-'))
+    index = year * 12 + month - 1 + months
+    return f'{index // 12}-{index % 12 + 1:02d}'
+
+
+def _month_bounds(key):
+    start = datetime.strptime(key, '%Y-%m')
+    return start, datetime.strptime(shift_month(key, 1), '%Y-%m')
+
+
+def _interval_tolerance(period):
+    return max(3.0, period * 0.15)
+
+
+def next_due(date, interval, day):
+    """The occurrence after `date`; month-based periods land on `day` (clamped to the month's length)"""
+    months = CALENDAR_PERIODS.get(interval)
+    if months is None:
+        return date + timedelta(days=interval)
+    year, month = divmod(date.year * 12 + date.month - 1 + months, 12)
+    return date.replace(year=year, month=month + 1, day=min(day, calendar.monthrange(year, month + 1)[1]))
+
+
+def _series_key(type_, category):
+    return f'{type_}|{category}'
+
+
+def _amount_clusters(items):
+    """Split (date, amount, id) items into runs of similar amounts"""
+    clusters = []
+    for item in sorted(items, key=lambda item: item[1]):
+        if clusters and item[1] <= clusters[-1][0][1] * (1 + AMOUNT_TOLERANCE) + 0.01:
+            clusters[-1].append(item)
+        else:
+            clusters.append([item])
+    return clusters
+
+
+def detect_recurring(rows, now):
+    """Find regular streams in the rows and return (streams, ids of the rows they explain)"""
+    groups = defaultdict(list)
+    for id_, date, amount, category, type_ in rows:
+        groups[(type_, category)].append((date, float(amount), id_))
+
+    streams, matched = [], set()
+    for (type_, category), items in groups.items():
+        for cluster in _amount_clusters(items):
+            if len(cluster) < MIN_OCCURRENCES:
+                continue
+            cluster.sort()
+            days = np.array([(date - cluster[0][0]).total_seconds() / 86400 for date, _, _ in cluster])
+            gaps = np.diff(days)
+            median_gap = float(np.median(gaps))
+            period = min(PERIODS, key=lambda p: abs(p - median_gap))
+            tolerance = _interval_tolerance(period)
+            if abs(median_gap - period) > tolerance or np.mean(np.abs(gaps - period) <= tolerance) < REGULAR_SHARE:
+                continue
+            last_date = cluster[-1][0]
+            # A stream that has missed more than one beat has stopped
+            if (now - last_date).days > period * 1.5 + tolerance:
+                continue
+            amounts = np.array([amount for _, amount, _ in cluster])
+            streams.append({
+                'type': type_,
+                'category': category,
+                'amount': float(np.median(amounts)),
+                'stddev': float(amounts.std()),
+                'interval': period,
+                'day': int(np.median([date.day for date, _, _ in cluster])),
+                'last_date': last_date.isoformat(),
+                'occurrences': len(cluster)
+            })
+            matched.update(id_ for _, _, id_ in cluster)
+    return streams, matched
+
+
+def same_stream(stream, category, type_, amount):
+    return (stream['type'] == type_ and stream['category'] == category
+            and abs(amount - stream['amount']) <= stream['amount'] * AMOUNT_TOLERANCE + 0.01)
+
+
+def _match_stream(streams, date, amount, category, type_):
+    for stream in streams:
+        if not same_stream(stream, category, type_, amount):
+            continue
+        gap = (date - datetime.fromisoformat(stream['last_date'])).total_seconds() / 86400
+        if abs(gap - stream['interval']) <= _interval_tolerance(stream['interval']):
+            return stream
+    return None
+
+
+def _fit_baseline(series, fitted_month):
+    """Level, 12 seasonal factors and residual spread of one series over its completed months"""
+    first = min(series)
+    if first >= fitted_month:
+        return {'level': 0.0, 'seasonal': [1.0] * 12, 'sigma': 0.0}
+    keys = []
+    key = first
+    while key < fitted_month:
+        keys.append(key)
+        key = shift_month(key, 1)
+    values = np.array([series.get(key, 0.0) for key in keys])
+    calendar_months = np.array([int(key[5:]) - 1 for key in keys])
+
+    level = float(values[-12:].mean())
+    seasonal = np.ones(12)
+    mean = values.mean()
+    if len(values) >= 13 and mean > 0:
+        # Shrink each month's ratio towards 1 by how often that month has been seen
+        sums = np.bincount(calendar_months, weights=values, minlength=12)
+        seen = np.bincount(calendar_months, minlength=12)
+        ratios = np.divide(sums, seen * mean, out=np.ones(12), where=seen > 0)
+        seasonal = 1 + (ratios - 1) * seen / (seen + 1)
+    residuals = values - level * seasonal[calendar_months]
+    sigma = float(residuals.std(ddof=1)) if len(values) > 1 else level * 0.5
+    return {'level': level, 'seasonal': seasonal.tolist(), 'sigma': sigma}
+
+
+def fit(rows, now, history_start, balance, rules=()):
+    """Build a model from the rows dated on or after history_start (a datetime).
+
+    `rules` are streams the user has confirmed; they replace any detected
+    stream they overlap, and the rows they explain stay out of the baselines.
+    """
+    rows = sorted(rows, key=lambda row: (row[1], row[0]))
+    rules = [dict(rule) for rule in rules]
+    streams, matched = detect_recurring(rows, now)
+    streams = rules + [
+        stream for stream in streams
+        if not any(same_stream(rule, stream['category'], stream['type'], stream['amount']) for rule in rules)
+    ]
+    matched.update(
+        id_ for id_, _, amount, category, type_ in rows
+        if any(same_stream(rule, category, type_, float(amount)) for rule in rules)
+    )
+    model = {
+        'version': MODEL_VERSION,
+        'fitted_month': month_key(now),
+        'history_start': month_key(history_start),
+        'balance': float(balance),
+        'current_totals': {'income': 0.0, 'expense': 0.0},
+        'streams': streams,
+        'series': {},
+        'baselines': {}
+    }
+    for id_, date, amount, category, type_ in rows:
+        _add_to_totals(model, date, float(amount), type_)
+        if id_ not in matched:
+            _add_to_series(model, date, float(amount), category, type_)
+    for key, series in model['series'].items():
+        model['baselines'][key] = _fit_baseline(series, model['fitted_month'])
+    return model
+
+
+def _add_to_totals(model, date, amount, type_):
+    if month_key(date) == model['fitted_month']:
+        model['current_totals']['income' if type_ == 'income' else 'expense'] += amount
+
+
+def _add_to_series(model, date, amount, category, type_):
+    key = _series_key(type_, category)
+    series = model['series'].setdefault(key, {})
+    series[month_key(date)] = series.get(month_key(date), 0.0) + amount
+    return key
+
+
+def update(model, rows):
+    """Fold new transactions into the model in place, refitting only the baselines they change"""
+    touched = set()
+    for id_, date, amount, category, type_ in sorted(rows, key=lambda row: (row[1], row[0])):
+        amount = float(amount)
+        model['balance'] += amount if type_ == 'income' else -amount
+        if month_key(date) < model['history_start']:
+            continue
+        _add_to_totals(model, date, amount, type_)
+        stream = _match_stream(model['streams'], date, amount, category, type_)
+        if stream is not None:
+            stream['amount'] = (stream['amount'] * stream['occurrences'] + amount) / (stream['occurrences'] + 1)
+            stream['occurrences'] += 1
+            stream['last_date'] = date.isoformat()
+            continue
+        key = _add_to_series(model, date, amount, category, type_)
+        # Current-month rows do not change a baseline fitted on completed months
+        if month_key(date) < model['fitted_month'] or key not in model['baselines']:
+            touched.add(key)
+    for key in touched:
+        model['baselines'][key] = _fit_baseline(model['series'][key], model['fitted_month'])
+    return model
+
+
+def _recurring_by_month(streams, now, month_keys):
+    """Expected recurring income/expense (and variance) for each month, counting only dates after now"""
+    income, expense, variance = np.zeros(len(month_keys)), np.zeros(len(month_keys)), np.zeros(len(month_keys))
+    bounds = [_month_bounds(key) for key in month_keys]
+    horizon_end = bounds[-1][1]
+    for stream in streams:
+        due = next_due(datetime.fromisoformat(stream['last_date']), stream['interval'], stream['day'])
+        while due < horizon_end:
+            if due > now:
+                index = next(i for i, (start, end) in enumerate(bounds) if start <= due < end)
+                (income if stream['type'] == 'income' else expense)[index] += stream['amount']
+                variance[index] += stream['stddev'] ** 2
+            due = next_due(due, stream['interval'], stream['day'])
+    return income, expense, variance
+
+
+def project(model, now, horizon, z=1.28):
+    """Month-by-month projection from the current month through `horizon` further months.
+
+    For the current month, 'income' and 'expenses' are the actual totals so
+    far plus what is still expected. Balances start from today's balance and
+    carry a +/- z-sigma band that widens as the monthly uncertainties add up.
+    """
+    month_keys = [shift_month(model['fitted_month'], i) for i in range(horizon + 1)]
+    recurring_income, recurring_expense, variance = _recurring_by_month(model['streams'], now, month_keys)
+
+    income, expense = recurring_income.copy(), recurring_expense.copy()
+    keys = list(model['baselines'])
+    if keys:
+        calendar_months = np.array([int(key[5:]) - 1 for key in month_keys])
+        levels = np.array([model['baselines'][key]['level'] for key in keys])
+        seasonal = np.array([model['baselines'][key]['seasonal'] for key in keys])
+        sigmas = np.array([model['baselines'][key]['sigma'] for key in keys])
+        expected = levels[:, None] * seasonal[:, calendar_months]  # (series x month)
+        spread = np.repeat(sigmas[:, None] ** 2, len(month_keys), axis=1)
+
+        # Only the rest of the current month is still to come
+        start, end = _month_bounds(month_keys[0])
+        remaining_share = max((end - now).total_seconds(), 0) / (end - start).total_seconds()
+        so_far = np.array([model['series'][key].get(month_keys[0], 0.0) for key in keys])
+        expected[:, 0] = np.maximum(expected[:, 0] - so_far, 0.0)
+        spread[:, 0] *= remaining_share
+
+        is_income = np.array([key.startswith('income|') for key in keys])
+        income += expected[is_income].sum(axis=0)
+        expense += expected[~is_income].sum(axis=0)
+        variance += spread.sum(axis=0)
+
+    net = income - expense
+    balance = model['balance'] + np.cumsum(net)
+    band = z * np.sqrt(np.cumsum(variance))
+    monthly_band = z * np.sqrt(variance)
+    income[0] += model['current_totals']['income']
+    expense[0] += model['current_totals']['expense']
+
+    return {
+        'opening_balance': round(model['balance'], 2),
+        'months': [
+            {
+                'month': key,
+                'income': round(float(income[i]), 2),
+                'expenses': round(float(expense[i]), 2),
+                'recurring_income': round(float(recurring_income[i]), 2),
+                'recurring_expenses': round(float(recurring_expense[i]), 2),
+                'expenses_low': round(float(max(expense[i] - monthly_band[i], 0.0)), 2),
+                'expenses_high': round(float(expense[i] + monthly_band[i]), 2),
+                'balance': round(float(balance[i]), 2),
+                'balance_low': round(float(balance[i] - band[i]), 2),
+                'balance_high': round(float(balance[i] + band[i]), 2)
+            } for i, key in enumerate(month_keys)
+        ],
+        'recurring': [
+            {key: stream[key] for key in ('type', 'category', 'amount', 'interval', 'day', 'last_date')}
+            for stream in sorted(model['streams'], key=lambda stream: -stream['amount'])
+        ]
+    }
@@ -0,0 +1,37 @@
+"""add report snapshots for closed periods
+
+Revision ID: 2c8a4f7e1b53
+Revises: 9d1e5c3b7f64
+Create Date: 2026-10-18 21:10:42.286190
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2c8a4f7e1b53'
+down_revision = '9d1e5c3b7f64'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('report_snapshot',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('period_key', sa.String(length=40), nullable=False),
+        sa.Column('start', sa.DateTime(), nullable=False),
+        sa.Column('end', sa.DateTime(), nullable=False),
+        sa.Column('payload', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'period_key', name='uq_report_snapshot_user_period')
+    )
+    op.create_index('ix_report_snapshot_user_start', 'report_snapshot', ['user_id', 'start'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_report_snapshot_user_start', table_name='report_snapshot')
+    op.drop_table('report_snapshot')
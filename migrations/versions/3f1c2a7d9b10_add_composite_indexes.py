@@ -0,0 +1,46 @@
+"""add composite indexes for hot user queries
+
+Revision ID: 3f1c2a7d9b10
+Revises:
+Create Date: 2026-10-18 09:12:44.118203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c2a7d9b10'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ('transaction', 'ix_transaction_user_date', ['user_id', 'date']),
+    ('transaction', 'ix_transaction_user_type_date', ['user_id', 'type', 'date']),
+    ('transaction', 'ix_transaction_user_type_amount', ['user_id', 'type', 'amount']),
+    ('transaction', 'ix_transaction_user_category_type_date', ['user_id', 'category', 'type', 'date']),
+    ('budget', 'ix_budget_user_month_category', ['user_id', 'month', 'category']),
+    ('goal', 'ix_goal_user_target_date', ['user_id', 'target_date']),
+    ('debt', 'ix_debt_user_next_payment_date', ['user_id', 'next_payment_date']),
+]
+
+
+def _existing_indexes(table):
+    inspector = sa.inspect(op.get_bind())
+    return {index['name'] for index in inspector.get_indexes(table)}
+
+
+def upgrade():
+    # Databases bootstrapped with db.create_all() may already carry these
+    # indexes from the model definitions, so only create the missing ones.
+    for table, name, columns in INDEXES:
+        if name not in _existing_indexes(table):
+            op.create_index(name, table, columns, unique=False)
+
+
+def downgrade():
+    for table, name, columns in reversed(INDEXES):
+        if name in _existing_indexes(table):
+            op.drop_index(name, table_name=table)
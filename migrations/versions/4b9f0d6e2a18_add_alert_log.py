@@ -0,0 +1,40 @@
+"""add budget and goal alert log
+
+Revision ID: 4b9f0d6e2a18
+Revises: e7b3a91c4d02
+Create Date: 2026-10-18 19:03:27.118406
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4b9f0d6e2a18'
+down_revision = 'e7b3a91c4d02'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('alert_log',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(length=10), nullable=False),
+        sa.Column('subject_id', sa.Integer(), nullable=False),
+        sa.Column('period', sa.String(length=7), nullable=False),
+        sa.Column('threshold', sa.Integer(), nullable=False),
+        sa.Column('message', sa.String(length=255), nullable=False),
+        sa.Column('status', sa.String(length=10), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('sent_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'kind', 'subject_id', 'period', 'threshold', name='uq_alert_log')
+    )
+    op.create_index('ix_alert_log_user_status', 'alert_log', ['user_id', 'status'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_alert_log_user_status', table_name='alert_log')
+    op.drop_table('alert_log')
@@ -0,0 +1,29 @@
+"""link goal contributions to their transactions
+
+Revision ID: 6e0a9c4f2b87
+Revises: 2c8a4f7e1b53
+Create Date: 2026-10-19 10:04:17.520934
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6e0a9c4f2b87'
+down_revision = '2c8a4f7e1b53'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Contributions made before this revision were not linked and stay unlinked
+    with op.batch_alter_table('transaction') as batch_op:
+        batch_op.add_column(sa.Column('goal_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_transaction_goal_id', 'goal', ['goal_id'], ['id'])
+
+
+def downgrade():
+    with op.batch_alter_table('transaction') as batch_op:
+        batch_op.drop_constraint('fk_transaction_goal_id', type_='foreignkey')
+        batch_op.drop_column('goal_id')
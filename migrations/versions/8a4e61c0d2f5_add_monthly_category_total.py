@@ -0,0 +1,63 @@
+"""add monthly category rollup table
+
+Revision ID: 8a4e61c0d2f5
+Revises: 3f1c2a7d9b10
+Create Date: 2026-10-18 11:40:02.530671
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8a4e61c0d2f5'
+down_revision = '3f1c2a7d9b10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    rollup = op.create_table('monthly_category_total',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('year_month', sa.String(length=7), nullable=False),
+        sa.Column('category', sa.String(length=50), nullable=False),
+        sa.Column('type', sa.String(length=10), nullable=False),
+        sa.Column('total', sa.Float(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'year_month', 'category', 'type', name='uq_monthly_category_total')
+    )
+
+    # Backfill from existing transactions (same grouping as `flask rebuild-rollups`)
+    transaction = sa.table('transaction',
+        sa.column('user_id', sa.Integer),
+        sa.column('category', sa.String),
+        sa.column('type', sa.String),
+        sa.column('amount', sa.Float),
+        sa.column('date', sa.DateTime)
+    )
+    year_col = sa.extract('year', transaction.c.date)
+    month_col = sa.extract('month', transaction.c.date)
+    grouped = sa.select(
+        transaction.c.user_id, year_col, month_col, transaction.c.category, transaction.c.type,
+        sa.func.sum(transaction.c.amount), sa.func.count()
+    ).group_by(transaction.c.user_id, year_col, month_col, transaction.c.category, transaction.c.type)
+    rows = [
+        {
+            'user_id': user_id,
+            'year_month': f'{int(year)}-{int(month):02d}',
+            'category': category,
+            'type': type_,
+            'total': float(total or 0),
+            'count': count
+        }
+        for user_id, year, month, category, type_, total, count in op.get_bind().execute(grouped)
+    ]
+    if rows:
+        op.bulk_insert(rollup, rows)
+
+
+def downgrade():
+    op.drop_table('monthly_category_total')
@@ -0,0 +1,111 @@
+"""add budget templates, multi-month periods and period snapshots
+
+Revision ID: 9d1e5c3b7f64
+Revises: 4b9f0d6e2a18
+Create Date: 2026-10-18 20:21:09.734552
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d1e5c3b7f64'
+down_revision = '4b9f0d6e2a18'
+branch_labels = None
+depends_on = None
+
+
+def _month_start(dt):
+    return datetime(dt.year, dt.month, 1)
+
+
+def _next_month(dt):
+    return datetime(dt.year + dt.month // 12, dt.month % 12 + 1, 1)
+
+
+def upgrade():
+    op.create_table('budget_template',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('category', sa.String(length=50), nullable=False),
+        sa.Column('limit', sa.Float(), nullable=False),
+        sa.Column('period_months', sa.Integer(), nullable=False),
+        sa.Column('carry_over', sa.Boolean(), nullable=False),
+        sa.Column('start_month', sa.DateTime(), nullable=False),
+        sa.Column('active', sa.Boolean(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_budget_template_active_user', 'budget_template', ['active', 'user_id'], unique=False)
+    op.create_table('budget_snapshot',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('budget_id', sa.Integer(), nullable=False),
+        sa.Column('category', sa.String(length=50), nullable=False),
+        sa.Column('period_start', sa.DateTime(), nullable=False),
+        sa.Column('period_end', sa.DateTime(), nullable=False),
+        sa.Column('limit', sa.Float(), nullable=False),
+        sa.Column('carried_over', sa.Float(), nullable=False),
+        sa.Column('spent', sa.Float(), nullable=False),
+        sa.Column('frozen_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('budget_id')
+    )
+    op.create_index('ix_budget_snapshot_user_period_start', 'budget_snapshot', ['user_id', 'period_start'], unique=False)
+
+    with op.batch_alter_table('budget') as batch_op:
+        batch_op.add_column(sa.Column('period_end', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('carried_over', sa.Float(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('template_id', sa.Integer(), nullable=True))
+
+    # Existing budgets cover one calendar month; the latest one per category
+    # becomes a monthly template so it keeps rolling forward.
+    connection = op.get_bind()
+    budget = sa.table('budget', sa.column('id', sa.Integer), sa.column('user_id', sa.Integer),
+                      sa.column('category', sa.String), sa.column('limit', sa.Float), sa.column('month', sa.DateTime),
+                      sa.column('period_end', sa.DateTime), sa.column('template_id', sa.Integer))
+    template = sa.Table('budget_template', sa.MetaData(), sa.Column('id', sa.Integer, primary_key=True),
+                        sa.Column('user_id', sa.Integer), sa.Column('category', sa.String), sa.Column('limit', sa.Float),
+                        sa.Column('period_months', sa.Integer), sa.Column('carry_over', sa.Boolean),
+                        sa.Column('start_month', sa.DateTime), sa.Column('active', sa.Boolean),
+                        sa.Column('created_at', sa.DateTime))
+    latest = {}
+    rows = connection.execute(sa.select(budget.c.id, budget.c.user_id, budget.c.category, budget.c.limit, budget.c.month))
+    for id_, user_id, category, limit, month in rows.fetchall():
+        connection.execute(budget.update().where(budget.c.id == id_).values(
+            month=_month_start(month), period_end=_next_month(month)
+        ))
+        key = (user_id, category)
+        if key not in latest or month > latest[key][2]:
+            latest[key] = (id_, limit, month)
+    for (user_id, category), (budget_id, limit, month) in latest.items():
+        template_id = connection.execute(template.insert().values(
+            user_id=user_id, category=category, limit=limit, period_months=1, carry_over=False,
+            start_month=_month_start(month), active=True, created_at=datetime.utcnow()
+        )).inserted_primary_key[0]
+        connection.execute(budget.update().where(budget.c.id == budget_id).values(template_id=template_id))
+
+    with op.batch_alter_table('budget') as batch_op:
+        batch_op.alter_column('period_end', existing_type=sa.DateTime(), nullable=False)
+        batch_op.create_foreign_key('fk_budget_template_id', 'budget_template', ['template_id'], ['id'])
+        batch_op.create_unique_constraint('uq_budget_template_month', ['template_id', 'month'])
+        batch_op.create_index('ix_budget_user_period_end', ['user_id', 'period_end'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('budget') as batch_op:
+        batch_op.drop_index('ix_budget_user_period_end')
+        batch_op.drop_constraint('uq_budget_template_month', type_='unique')
+        batch_op.drop_constraint('fk_budget_template_id', type_='foreignkey')
+        batch_op.drop_column('template_id')
+        batch_op.drop_column('carried_over')
+        batch_op.drop_column('period_end')
+    op.drop_index('ix_budget_snapshot_user_period_start', table_name='budget_snapshot')
+    op.drop_table('budget_snapshot')
+    op.drop_index('ix_budget_template_active_user', table_name='budget_template')
+    op.drop_table('budget_template')
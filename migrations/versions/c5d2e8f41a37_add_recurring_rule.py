@@ -0,0 +1,42 @@
+"""add recurring transaction rules
+
+Revision ID: c5d2e8f41a37
+Revises: 8a4e61c0d2f5
+Create Date: 2026-10-18 17:05:19.402113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5d2e8f41a37'
+down_revision = '8a4e61c0d2f5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('recurring_rule',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('category', sa.String(length=50), nullable=False),
+        sa.Column('type', sa.String(length=10), nullable=False),
+        sa.Column('amount', sa.Float(), nullable=False),
+        sa.Column('interval_days', sa.Float(), nullable=False),
+        sa.Column('day_of_month', sa.Integer(), nullable=False),
+        sa.Column('next_due', sa.DateTime(), nullable=False),
+        sa.Column('status', sa.String(length=10), nullable=False),
+        sa.Column('occurrences', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_recurring_rule_status_next_due', 'recurring_rule', ['status', 'next_due'], unique=False)
+    op.create_index('ix_recurring_rule_user_status', 'recurring_rule', ['user_id', 'status'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_recurring_rule_user_status', table_name='recurring_rule')
+    op.drop_index('ix_recurring_rule_status_next_due', table_name='recurring_rule')
+    op.drop_table('recurring_rule')
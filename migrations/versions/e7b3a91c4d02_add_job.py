@@ -0,0 +1,45 @@
+"""add background job queue
+
+Revision ID: e7b3a91c4d02
+Revises: c5d2e8f41a37
+Create Date: 2026-10-18 18:12:44.530917
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7b3a91c4d02'
+down_revision = 'c5d2e8f41a37'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('job',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(length=50), nullable=False),
+        sa.Column('payload', sa.Text(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('status', sa.String(length=10), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('max_attempts', sa.Integer(), nullable=False),
+        sa.Column('run_after', sa.DateTime(), nullable=False),
+        sa.Column('locked_by', sa.String(length=100), nullable=True),
+        sa.Column('locked_at', sa.DateTime(), nullable=True),
+        sa.Column('result', sa.Text(), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_job_status_run_after', 'job', ['status', 'run_after'], unique=False)
+    op.create_index('ix_job_user_created_at', 'job', ['user_id', 'created_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_job_user_created_at', table_name='job')
+    op.drop_index('ix_job_status_run_after', table_name='job')
+    op.drop_table('job')
@@ -0,0 +1,276 @@
+"""Plain-English questions about a user's money as small structured queries.
+
+lex() splits a question into a shape and its literals. The shape keeps the
+words but swaps month names, years, numbers and the user's own category
+names for placeholders, so "Dining in March vs February" and "Groceries in
+May vs April" share one shape. parse() turns a shape into a Query whose
+literal fields are indices into the literals. It looks at nothing else, so
+callers can cache its result (and the SQL compiled from it) per shape.
+bind() resolves a Query and its literals into statement parameters, and
+answer() words the result rows.
+"""
+import calendar
+import re
+from collections import namedtuple
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+CATEGORY, MONTH, YEAR, NUMBER = '<category>', '<month>', '<year>', '<number>'
+PLACEHOLDERS = (CATEGORY, MONTH, YEAR, NUMBER)
+MAX_PERIODS = 6
+TOP_CATEGORIES = 5
+MAX_LOOKBACK = {'last_months': 120, 'last_days': 3660}
+
+# source is 'transactions', 'budget' or 'goal'; measure is 'sum', 'count', 'avg', 'max' or
+# 'remaining'; type is 'income', 'expense' or None for both; category is the index of the
+# category literal or None; periods is a tuple of Period
+Query = namedtuple('Query', 'source measure type category group_by periods')
+# kind is 'month' (month literal, year literal or None), 'year' (year literal),
+# 'months_ago' (n), 'years_ago' (n), 'last_months' (number literal) or 'last_days' (number literal)
+Period = namedtuple('Period', 'kind args')
+
+MONTHS = {name.lower(): i for i, name in enumerate(calendar.month_name) if name}
+MONTHS.update({name.lower(): i for i, name in enumerate(calendar.month_abbr) if name})
+MONTHS['sept'] = 9
+
+INCOME_WORDS = {'earn', 'earned', 'earning', 'earnings', 'income', 'receive', 'received'}
+# 'make' is only about income in money questions: "how much did I make", not "transactions I made"
+MAKE_WORDS = {'make', 'made'}
+EXPENSE_WORDS = {'spend', 'spent', 'spending', 'expense', 'expenses', 'cost', 'costs'}
+COUNT_WORDS = {'many', 'count', 'number'}
+AVERAGE_WORDS = {'average', 'avg', 'mean', 'typical'}
+MAX_WORDS = {'biggest', 'largest', 'max', 'maximum', 'highest'}
+REMAINING_WORDS = {'left', 'remaining', 'remain'}
+TRANSACTION_WORDS = {'transaction', 'transactions'}
+GROUP_WORDS = {'by', 'per', 'each', 'top', 'which', 'most'}
+THIS_WORDS = {'this', 'current'}
+LAST_WORDS = {'last', 'previous', 'past'}
+
+
+@lru_cache(maxsize=1024)
+def _pattern(names):
+    """Tokenizer for one user's lower-cased category names (longest first, so 'car insurance' beats 'car')"""
+    categories = '|'.join(re.escape(name) for name in sorted(names, key=len, reverse=True)) or '(?!)'
+    return re.compile(rf'(?<![a-z0-9])({categories})(?![a-z0-9])|([a-z]+|\d+)')
+
+
+def lex(text, categories=()):
+    """(shape, literals) of a question; categories are the names that count as category literals"""
+    names = {category.lower(): category for category in categories if category}
+    shape, literals = [], []
+    for match in _pattern(tuple(sorted(names))).finditer(text.lower()):
+        category, word = match.groups()
+        if category:
+            shape.append(CATEGORY)
+            literals.append(names[category])
+        elif word in MONTHS:
+            shape.append(MONTH)
+            literals.append(MONTHS[word])
+        elif word.isdigit():
+            is_year = len(word) == 4 and 1900 <= int(word) <= 2100
+            shape.append(YEAR if is_year else NUMBER)
+            literals.append(int(word))
+        else:
+            shape.append(word)
+    return tuple(shape), literals
+
+
+def _slot(shape, position):
+    """Index into the literals of the placeholder at shape[position]"""
+    return sum(1 for token in shape[:position] if token in PLACEHOLDERS)
+
+
+def _periods(shape):
+    periods = []
+    i = 0
+    while i < len(shape):
+        token = shape[i]
+        following = shape[i + 1] if i + 1 < len(shape) else None
+        if token == MONTH:
+            year = _slot(shape, i + 1) if following == YEAR else None
+            periods.append(Period('month', (_slot(shape, i), year)))
+            i += 2 if year is not None else 1
+            continue
+        if token == YEAR:
+            periods.append(Period('year', (_slot(shape, i),)))
+        elif token in THIS_WORDS | LAST_WORDS and following in ('month', 'year'):
+            kind = 'months_ago' if following == 'month' else 'years_ago'
+            periods.append(Period(kind, (0 if token in THIS_WORDS else 1,)))
+            i += 1
+        elif token in LAST_WORDS and following == NUMBER and i + 2 < len(shape) \
+                and shape[i + 2] in ('months', 'month', 'days', 'day'):
+            kind = 'last_months' if shape[i + 2].startswith('month') else 'last_days'
+            periods.append(Period(kind, (_slot(shape, i + 1),)))
+            i += 2
+        i += 1
+    return tuple(periods[:MAX_PERIODS]) or (Period('months_ago', (0,)),)
+
+
+def parse(shape):
+    """The Query a question shape asks for, or None if it is not a question about amounts"""
+    words = set(shape)
+    category = _slot(shape, shape.index(CATEGORY)) if CATEGORY in words else None
+
+    if words & {'budget', 'budgets'} and words & REMAINING_WORDS:
+        return Query('budget', 'remaining', 'expense', category, False, ())
+    if words & {'goal', 'goals'} and words & (REMAINING_WORDS | {'need'}):
+        return Query('goal', 'remaining', None, None, False, ())
+
+    if words & COUNT_WORDS:
+        measure = 'count'
+    elif words & AVERAGE_WORDS:
+        measure = 'avg'
+    elif words & MAX_WORDS:
+        measure = 'max'
+    else:
+        measure = 'sum'
+
+    group_by = category is None and bool(words & {'category', 'categories'}) and bool(words & GROUP_WORDS)
+    if words & INCOME_WORDS or (words & MAKE_WORDS and ('money' in words or {'how', 'much'} <= words)):
+        type_ = 'income'
+    elif words & EXPENSE_WORDS or group_by:
+        type_ = 'expense'
+    elif category is not None:
+        type_ = None
+    elif words & TRANSACTION_WORDS and measure != 'sum':
+        # Counts, averages and maxima over every transaction; a sum of income and expenses means nothing
+        type_ = None
+    else:
+        return None
+    return Query('transactions', measure, type_, category, group_by, _periods(shape))
+
+
+def _add_months(dt, months):
+    index = dt.year * 12 + dt.month - 1 + months
+    return dt.replace(year=index // 12, month=index % 12 + 1)
+
+
+def _resolve(period, literals, now):
+    """(start, end, label) of a period; end is exclusive"""
+    this_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    if period.kind == 'month':
+        month_slot, year_slot = period.args
+        month = literals[month_slot]
+        if year_slot is not None:
+            year = literals[year_slot]
+        else:
+            # A bare month name means its latest occurrence
+            year = now.year if month <= now.month else now.year - 1
+        start = datetime(year, month, 1)
+        return start, _add_months(start, 1), f'in {calendar.month_name[month]} {year}'
+    if period.kind == 'year':
+        year = literals[period.args[0]]
+        return datetime(year, 1, 1), datetime(year + 1, 1, 1), f'in {year}'
+    if period.kind == 'months_ago':
+        months = period.args[0]
+        start = _add_months(this_month, -months)
+        return start, _add_months(start, 1), 'this month' if months == 0 else 'last month'
+    if period.kind == 'years_ago':
+        years = period.args[0]
+        return datetime(now.year - years, 1, 1), datetime(now.year - years + 1, 1, 1), \
+            'this year' if years == 0 else 'last year'
+    count = min(max(literals[period.args[0]], 1), MAX_LOOKBACK[period.kind])
+    if period.kind == 'last_months':
+        return _add_months(this_month, 1 - count), _add_months(this_month, 1), f'over the last {count} months'
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    return today - timedelta(days=count - 1), today + timedelta(days=1), f'over the last {count} days'
+
+
+def bind(query, literals, now):
+    """(parameters, period labels) for running a Query's statement"""
+    params = {}
+    if query.type is not None:
+        params['type'] = query.type
+    if query.category is not None:
+        params['category'] = literals[query.category]
+    if query.source == 'budget':
+        params['now'] = now
+    labels = []
+    for i, period in enumerate(query.periods):
+        params[f'start_{i}'], params[f'end_{i}'], label = _resolve(period, literals, now)
+        labels.append(label)
+    if query.periods:
+        params['window_start'] = min(params[f'start_{i}'] for i in range(len(query.periods)))
+        params['window_end'] = max(params[f'end_{i}'] for i in range(len(query.periods)))
+    return params, labels
+
+
+def _money(value):
+    return f'${value:.2f}'
+
+
+def _describe(query, category, value, label):
+    """One clause such as 'You spent $12.00 on Dining in March 2026'"""
+    if query.measure == 'count':
+        noun = {'income': 'income payments', 'expense': 'expenses'}.get(query.type, 'transactions')
+        return f"You had {int(value or 0)} {category + ' ' if category else ''}{noun} {label}"
+    if query.measure in ('avg', 'max'):
+        adjective = 'average' if query.measure == 'avg' else 'largest'
+        noun = {'income': 'income payment', 'expense': 'expense'}.get(query.type, 'transaction')
+        subject = f"Your {adjective} {category + ' ' if category else ''}{noun} {label}"
+        return f"{subject} was {_money(value)}" if value is not None else f"{subject}: none recorded"
+    if query.type == 'income':
+        return f"You earned {_money(value or 0)}{' from ' + category if category else ''} {label}"
+    if query.type == 'expense':
+        return f"You spent {_money(value or 0)}{' on ' + category if category else ''} {label}"
+    return f"{category} came to {_money(value or 0)} {label}"
+
+
+def _amount(query, value):
+    return str(int(value or 0)) if query.measure == 'count' else _money(value or 0)
+
+
+def _compare(query, values, labels):
+    """' and $X in February 2026, $Y more' for the later periods of a comparison"""
+    others = [f'{_amount(query, value)} {label}' for value, label in zip(values[1:], labels[1:])]
+    if len(others) == 1:
+        text = ' and ' + others[0]
+    else:
+        text = ', ' + ', '.join(others[:-1]) + ', and ' + others[-1]
+    if len(values) == 2 and query.measure != 'count':
+        first, second = values[0] or 0, values[1] or 0
+        if first != second:
+            text += f", {_money(abs(first - second))} {'more' if first > second else 'less'}"
+            if second:
+                text += f' ({(first - second) * 100 / second:+.1f}%)'
+    return text
+
+
+def answer(query, literals, labels, rows):
+    """The reply to a bound Query given the rows its statement returned"""
+    category = literals[query.category] if query.category is not None else None
+
+    if query.source == 'budget':
+        if not rows:
+            return f"You don't have {'a ' + category if category else 'any'} budget{'' if category else 's'} for this period."
+        lines = []
+        # available is the period's limit plus whatever was carried over from the last one
+        for name, available, spent in rows:
+            left = (available or 0) - (spent or 0)
+            lines.append(f"{name}: {_money(left)} left of {_money(available or 0)} available" if left >= 0
+                         else f"{name}: {_money(-left)} over the {_money(available or 0)} available")
+        return "Your budgets this period:\n" + "\n".join(lines)
+
+    if query.source == 'goal':
+        count, target, current = rows[0]
+        if not count:
+            return "You haven't set any savings goals yet. Consider setting some to help track your progress!"
+        return f"You need {_money(max((target or 0) - (current or 0), 0))} more to reach your {count} savings goal{'s' if count != 1 else ''}."
+
+    if query.group_by:
+        if not rows:
+            return f"You have no {'income' if query.type == 'income' else 'spending'} recorded {labels[0]}."
+        parts = []
+        for name, *values in rows:
+            part = f'{name} {_amount(query, values[0])}'
+            if len(values) > 1:
+                part += ' (' + ', '.join(f'{_amount(query, value)} {label}'
+                                         for value, label in zip(values[1:], labels[1:])) + ')'
+            parts.append(part)
+        return f"Your top categories {labels[0]}: " + ', '.join(parts) + '.'
+
+    values = list(rows[0]) if rows else [None] * len(labels)
+    text = _describe(query, category, values[0], labels[0])
+    if len(values) > 1:
+        text += _compare(query, values, labels)
+    return text + '.'